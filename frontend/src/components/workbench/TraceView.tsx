@@ -339,6 +339,13 @@ export const TraceView: React.FC<TraceViewProps> = ({ traceId }) => {
           if (exists) return prev;
           return [...prev, data.log];
         });
+      } else if (data.type === 'log_batch' && Array.isArray(data.logs)) {
+        // Batched entries from bulk ingest (one message per trace_id)
+        setLogs((prev) => {
+          const seen = new Set(prev.map(log => log.log_id));
+          const fresh = data.logs.filter((log: any) => !seen.has(log.log_id));
+          return fresh.length ? [...prev, ...fresh] : prev;
+        });
       }
     },
     onError: (error) => {
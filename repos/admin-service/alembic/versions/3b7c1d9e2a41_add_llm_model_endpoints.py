@@ -0,0 +1,28 @@
+"""add llm_models.endpoints replica pool
+
+Revision ID: 3b7c1d9e2a41
+Revises: f6a0bfbdf99b
+Create Date: 2026-10-16 10:12:03.418220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c1d9e2a41'
+down_revision: Union[str, None] = 'f6a0bfbdf99b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add replica endpoint pool to llm_models"""
+    op.add_column('llm_models', sa.Column('endpoints', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop replica endpoint pool"""
+    op.drop_column('llm_models', 'endpoints')
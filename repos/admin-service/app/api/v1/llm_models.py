@@ -12,13 +12,26 @@ import httpx
 from app.core.database import LLMModel, HealthStatus
 from app.core.security import require_admin, get_db
 from app.core.config import settings
+from app.core.redis_client import redis_client
 
 router = APIRouter()
 
+def normalize_replica_endpoints(primary: str, endpoints: Optional[List[str]]) -> Optional[List[str]]:
+    """Strip, de-duplicate and drop the primary endpoint from a replica list"""
+    primary = (primary or "").rstrip("/")
+    replicas: List[str] = []
+    for url in endpoints or []:
+        url = url.strip().rstrip("/")
+        if url and url != primary and url not in replicas:
+            replicas.append(url)
+    return replicas or None
+
 class LLMModelCreate(BaseModel):
     name: str
     provider: str
     endpoint: str
+    # Additional replicas of the same deployment; llm-proxy-service balances across all of them
+    endpoints: Optional[List[str]] = None
     api_key: str
     configuration: Optional[Dict[str, Any]] = None
 
@@ -26,6 +39,7 @@ class LLMModelUpdate(BaseModel):
     name: Optional[str] = None
     provider: Optional[str] = None
     endpoint: Optional[str] = None
+    endpoints: Optional[List[str]] = None
     api_key: Optional[str] = None
     configuration: Optional[Dict[str, Any]] = None
     is_active: Optional[bool] = None
@@ -37,6 +51,7 @@ class LLMModelResponse(BaseModel):
     name: str
     provider: str
     endpoint: str
+    endpoints: List[str] = []
     is_active: bool
     health_status: str
     last_health_check: Optional[datetime]
@@ -80,6 +95,7 @@ async def list_llm_models(
             name=model.name,
             provider=model.provider,
             endpoint=model.endpoint,
+            endpoints=model.endpoints or [],
             is_active=model.is_active,
             health_status=model.health_status.value,
             last_health_check=model.last_health_check,
@@ -113,6 +129,7 @@ async def create_llm_model(
         name=request.name,
         provider=request.provider,
         endpoint=request.endpoint,
+        endpoints=normalize_replica_endpoints(request.endpoint, request.endpoints),
         api_key_encrypted=request.api_key,  # TODO: Encrypt in production
         model_config=request.configuration,
         is_active=False,
@@ -123,11 +140,15 @@ async def create_llm_model(
     await db.commit()
     await db.refresh(model)
 
+    # Invalidate llm-proxy-service model cache
+    await redis_client.publish_llm_model_change("created", model.id, model.name)
+
     return LLMModelResponse(
         id=model.id,
         name=model.name,
         provider=model.provider,
         endpoint=model.endpoint,
+        endpoints=model.endpoints or [],
         is_active=model.is_active,
         health_status=model.health_status.value,
         last_health_check=model.last_health_check,
@@ -158,6 +179,7 @@ async def get_llm_model(
         name=model.name,
         provider=model.provider,
         endpoint=model.endpoint,
+        endpoints=model.endpoints or [],
         is_active=model.is_active,
         health_status=model.health_status.value,
         last_health_check=model.last_health_check,
@@ -191,6 +213,8 @@ async def update_llm_model(
         model.provider = request.provider
     if request.endpoint is not None:
         model.endpoint = request.endpoint
+    if request.endpoints is not None:
+        model.endpoints = normalize_replica_endpoints(model.endpoint, request.endpoints)
     if request.api_key is not None:
         model.api_key_encrypted = request.api_key  # TODO: Encrypt in production
     if request.configuration is not None:
@@ -212,11 +236,15 @@ async def update_llm_model(
     await db.commit()
     await db.refresh(model)
 
+    # Invalidate llm-proxy-service model cache
+    await redis_client.publish_llm_model_change("updated", model.id, model.name)
+
     return LLMModelResponse(
         id=model.id,
         name=model.name,
         provider=model.provider,
         endpoint=model.endpoint,
+        endpoints=model.endpoints or [],
         is_active=model.is_active,
         health_status=model.health_status.value,
         last_health_check=model.last_health_check,
@@ -249,6 +277,9 @@ async def delete_llm_model(
     await db.delete(model)
     await db.commit()
 
+    # Invalidate llm-proxy-service model cache
+    await redis_client.publish_llm_model_change("deleted", model_id, model_name)
+
     # Clean up real-time token usage data in llm-proxy-service
     try:
         async with httpx.AsyncClient() as client:
@@ -391,6 +422,7 @@ async def list_available_llm_models(
             name=model.name,
             provider=model.provider,
             endpoint=model.endpoint,
+            endpoints=model.endpoints or [],
             is_active=model.is_active,
             health_status=model.health_status.value,
             last_health_check=model.last_health_check,
@@ -406,6 +438,7 @@ class LLMModelInternalResponse(BaseModel):
     name: str
     provider: str
     endpoint: str
+    endpoints: List[str] = []
     api_key: str  # Include API key for internal use
     is_active: bool
     health_status: str
@@ -433,6 +466,7 @@ async def list_all_llm_models_internal(
             name=model.name,
             provider=model.provider,
             endpoint=model.endpoint,
+            endpoints=model.endpoints or [],
             api_key=model.api_key_encrypted,  # Include API key for health checks
             is_active=model.is_active,
             health_status=model.health_status.value,
@@ -497,6 +531,10 @@ async def update_llm_health_internal(
     await db.commit()
     await db.refresh(model)
 
+    # is_active may have changed - invalidate llm-proxy-service model cache
+    if is_active is not None:
+        await redis_client.publish_llm_model_change("health", model.id, model.name)
+
     return {
         "id": model.id,
         "health_status": model.health_status.value,
@@ -6,7 +6,7 @@ from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy import String, Integer, Boolean, DateTime, Text, Enum as SQLAlchemyEnum, JSON
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from enum import Enum as PyEnum
 
 from app.core.config import settings
@@ -33,6 +33,8 @@ class LLMModel(Base):
     name: Mapped[str] = mapped_column(String(100), unique=True, index=True)
     provider: Mapped[str] = mapped_column(String(100))
     endpoint: Mapped[str] = mapped_column(String(500))
+    # Additional replica endpoints; llm-proxy-service balances across endpoint + endpoints
+    endpoints: Mapped[Optional[List[str]]] = mapped_column(JSONB, nullable=True)
     api_key_encrypted: Mapped[Optional[str]] = mapped_column(Text)  # In production, encrypt this
     model_config: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONB, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -0,0 +1,57 @@
+"""
+Redis client for publishing cache invalidation events
+"""
+import redis.asyncio as redis
+from app.core.config import settings
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Subscribed by llm-proxy-service to invalidate its model config cache
+LLM_MODELS_CHANNEL = "llm_models:changed"
+
+
+class RedisClient:
+    """Redis client for notifying other services about LLM model changes"""
+
+    def __init__(self):
+        self.redis_client: redis.Redis = None
+
+    async def connect(self):
+        """Initialize Redis connection"""
+        try:
+            self.redis_client = await redis.from_url(
+                settings.REDIS_URL,
+                encoding="utf-8",
+                decode_responses=True
+            )
+            logger.info(f"Connected to Redis at {settings.REDIS_URL}")
+        except Exception as e:
+            logger.error(f"Failed to connect to Redis: {e}")
+            raise
+
+    async def close(self):
+        """Close Redis connection"""
+        if self.redis_client:
+            await self.redis_client.close()
+            logger.info("Redis connection closed")
+
+    async def publish_llm_model_change(self, action: str, model_id: int, model_name: str):
+        """
+        Publish an LLM model change event (create/update/delete/health)
+
+        Failures are logged and swallowed - subscribers fall back to their cache TTL.
+        """
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.publish(
+                LLM_MODELS_CHANNEL,
+                json.dumps({"action": action, "model_id": model_id, "name": model_name})
+            )
+        except Exception as e:
+            logger.error(f"Failed to publish LLM model change ({action} {model_name}): {e}")
+
+# Global Redis client instance
+redis_client = RedisClient()
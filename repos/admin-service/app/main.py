@@ -10,6 +10,7 @@ import logging
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
+from app.core.redis_client import redis_client
 from app.api.v1 import llm_models, statistics
 
 # Configure logging
@@ -23,12 +24,20 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Admin Service...")
     # NOTE: Database tables are created by Alembic migrations, not by ORM
     # Removed init_db() call to prevent schema conflicts with migrations
+
+    # Redis is used to publish LLM model change events
+    try:
+        await redis_client.connect()
+    except Exception as e:
+        logger.error(f"Redis unavailable, model change events disabled: {e}")
+
     logger.info("Admin Service started successfully")
 
     yield
 
     # Shutdown
     logger.info("Shutting down Admin Service...")
+    await redis_client.close()
 
 # Create FastAPI app
 app = FastAPI(
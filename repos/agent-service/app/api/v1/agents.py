@@ -14,6 +14,7 @@ import os
 
 from app.core.database import get_db, Agent, AgentFramework, AgentStatus, HealthStatus, DeploymentLog
 from app.core.security import get_current_user
+from app.core.redis_client import redis_client
 from sqlalchemy import select, and_, func
 
 logger = logging.getLogger(__name__)
@@ -486,11 +487,15 @@ async def update_agent(
             logger.info(f"[Update Agent] Skipping langchain_config for {agent.framework} framework")
 
     # Update fields
+    previous_trace_id = agent.trace_id
     for field, value in update_data.items():
         setattr(agent, field, value)
     
     await db.commit()
     await db.refresh(agent)
+
+    if "status" in update_data or "trace_id" in update_data:
+        await redis_client.publish_agent_change("update", agent.id, previous_trace_id, agent.trace_id)
     
     return AgentResponse(
         id=agent.id,
@@ -540,8 +545,10 @@ async def delete_agent(
         )
 
     # Delete agent from database
+    trace_id = agent.trace_id
     await db.delete(agent)
     await db.commit()
+    await redis_client.publish_agent_change("delete", agent_id, trace_id)
 
     # Delete associated LLM call records from llm-proxy-service
     llm_proxy_url = os.getenv('LLM_PROXY_SERVICE_URL', 'http://llm-proxy-service:8006')
@@ -641,9 +648,13 @@ async def update_agent_trace_id(
         )
 
     # Update trace_id
+    previous_trace_id = agent.trace_id
     agent.trace_id = trace_id
     await db.commit()
 
+    # LLM proxy caches trace_id -> agent; drop both the old and new mapping
+    await redis_client.publish_agent_change("trace_id", agent.id, previous_trace_id, trace_id)
+
     return {
         "id": agent.id,
         "name": agent.name,
@@ -988,6 +999,7 @@ async def deploy_agent(
     await db.refresh(agent)
 
     logger.info(f"[Deploy] Agent {agent_id} deployed successfully as {new_status}")
+    await redis_client.publish_agent_change("status", agent.id, agent.trace_id)
 
     return DeployResponse(
         agent_id=agent.id,
@@ -1065,6 +1077,7 @@ async def undeploy_agent(
     await db.refresh(agent)
 
     logger.info(f"[Undeploy] Agent {agent_id} undeployed successfully")
+    await redis_client.publish_agent_change("status", agent.id, agent.trace_id)
 
     return {
         "agent_id": agent.id,
@@ -0,0 +1,64 @@
+"""
+Redis client for publishing agent change events
+"""
+import redis.asyncio as redis
+from app.core.config import settings
+import json
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Subscribed by llm-proxy-service to drop trace_id -> agent lookups from its cache
+AGENTS_CHANGED_CHANNEL = "agents:changed"
+
+
+class RedisClient:
+    """Redis client for notifying other services about agent changes"""
+
+    def __init__(self):
+        self.redis_client: redis.Redis = None
+
+    async def connect(self):
+        """Initialize Redis connection"""
+        try:
+            self.redis_client = await redis.from_url(
+                settings.REDIS_URL,
+                encoding="utf-8",
+                decode_responses=True
+            )
+            logger.info(f"Connected to Redis at {settings.REDIS_URL}")
+        except Exception as e:
+            logger.error(f"Failed to connect to Redis: {e}")
+            raise
+
+    async def close(self):
+        """Close Redis connection"""
+        if self.redis_client:
+            await self.redis_client.close()
+            logger.info("Redis connection closed")
+
+    async def publish_agent_change(self, action: str, agent_id: int, *trace_ids: Optional[str]):
+        """
+        Publish an agent change that affects trace_id resolution
+
+        action is trace_id/status/delete; trace_ids are the agent's old and new
+        trace_ids. Failures are logged and swallowed - subscribers fall back to
+        their cache TTL.
+        """
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.publish(
+                AGENTS_CHANGED_CHANNEL,
+                json.dumps({
+                    "action": action,
+                    "agent_id": agent_id,
+                    "trace_ids": [trace_id for trace_id in trace_ids if trace_id]
+                })
+            )
+        except Exception as e:
+            logger.error(f"Failed to publish agent change ({action} agent_id={agent_id}): {e}")
+
+# Global Redis client instance
+redis_client = RedisClient()
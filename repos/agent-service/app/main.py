@@ -10,6 +10,7 @@ import logging
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
+from app.core.redis_client import redis_client
 from app.api.v1 import agents, registry, admin, internal, a2a_router
 from app.core.security import get_current_user
 
@@ -24,12 +25,20 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Agent Service...")
     # NOTE: Database tables are created by Alembic migrations, not by ORM
     # Removed init_db() call to prevent schema conflicts with migrations
+
+    # Redis is used to publish agent change events (trace_id lookup caches)
+    try:
+        await redis_client.connect()
+    except Exception as e:
+        logger.error(f"Redis unavailable, agent change events disabled: {e}")
+
     logger.info("Agent Service started successfully")
 
     yield
 
     # Shutdown
     logger.info("Shutting down Agent Service...")
+    await redis_client.close()
 
 # Create FastAPI app
 app = FastAPI(
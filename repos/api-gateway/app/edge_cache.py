@@ -0,0 +1,287 @@
+"""
+In-memory edge cache for idempotent gateway GETs
+
+Only routes that opt in are cached. Each rule is a path pattern, where "*"
+matches one path segment and a trailing slash is optional, mapped to a cache
+scope and a default TTL:
+
+- "public": one entry shared by every caller. Use this only for responses
+  that don't depend on who is asking.
+- "user": entries are keyed by the caller's Authorization and Cookie headers,
+  so a response is only ever served back to the same credentials.
+
+Backend Cache-Control is honoured. no-store is never cached. private is
+cached only under the "user" scope. no-cache is stored but revalidated on
+every request. s-maxage ("public" scope only) or max-age overrides the rule's
+TTL. Responses with Set-Cookie, or that Vary on anything besides
+Accept-Encoding, are not cached. Bodies are kept exactly as the backend sent
+them (still encoded), so Accept-Encoding is part of the key.
+
+Every entry has an ETag: the backend's, or a weak one derived from the body.
+A client If-None-Match that matches gets a 304 from the gateway. An expired
+entry that has a backend ETag is revalidated with If-None-Match, and kept if
+the backend answers 304.
+
+Entries are evicted least recently used first once the cache holds
+EDGE_CACHE_MAX_BYTES. Larger bodies than EDGE_CACHE_MAX_ENTRY_BYTES are
+streamed through uncached. EDGE_CACHE_ROUTES (JSON) is merged over the
+built-in rules; null removes a rule:
+
+    EDGE_CACHE_ROUTES='{"/api/hub/agents": {"scope": "user", "ttl": 10}}'
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# Built-in cacheable routes (path pattern -> scope and default TTL in seconds)
+CACHE_ROUTES: Dict[str, Dict[str, Any]] = {
+    '/api/admin/public/llm-models': {"scope": "public", "ttl": 30},
+    '/api/v1/a2a/*/.well-known/agent-card.json': {"scope": "public", "ttl": 30},
+}
+
+EDGE_CACHE_MAX_BYTES = int(os.getenv("EDGE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+EDGE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("EDGE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+CACHE_SCOPES = ("public", "user")
+
+# Fixed per-entry bookkeeping charged against EDGE_CACHE_MAX_BYTES
+_ENTRY_OVERHEAD = 256
+
+# Response headers recomputed for every cached response
+_UNSTORED_HEADERS = {b"content-length", b"age", b"x-cache"}
+# x-cache value -> counter
+_OUTCOME_COUNTERS = {"HIT": "hits", "MISS": "misses", "REVALIDATED": "revalidated"}
+# Headers that go with a 304 (RFC 9110 15.4.5)
+_NOT_MODIFIED_HEADERS = {b"cache-control", b"content-location", b"date", b"etag", b"expires", b"vary"}
+
+
+class CacheRule(NamedTuple):
+    """A cacheable route"""
+    pattern: str
+    scope: str
+    ttl: float
+
+
+class CacheEntry:
+    """A stored response; bodies are immutable, freshness is refreshed on revalidation"""
+    __slots__ = ("status", "headers", "body", "etag", "upstream_etag", "stored_at", "expires", "size")
+
+    def __init__(
+        self,
+        status: int,
+        headers: List[Tuple[bytes, bytes]],
+        body: bytes,
+        etag: str,
+        upstream_etag: Optional[str],
+        ttl: float
+    ):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.upstream_etag = upstream_etag
+        self.stored_at = time.monotonic()
+        self.expires = self.stored_at + ttl
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers) + _ENTRY_OVERHEAD
+
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires
+
+    def refresh(self, ttl: float):
+        self.stored_at = time.monotonic()
+        self.expires = self.stored_at + ttl
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Cache-Control directives, lowercased; valueless directives map to None"""
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def load_cache_routes(overrides: Optional[str] = None) -> List[CacheRule]:
+    """Built-in rules with the EDGE_CACHE_ROUTES JSON merged over them"""
+    routes = dict(CACHE_ROUTES)
+    if overrides:
+        for pattern, rule in json.loads(overrides).items():
+            if rule is None:
+                routes.pop(pattern, None)
+            else:
+                routes[pattern] = rule
+
+    rules = []
+    for pattern, rule in routes.items():
+        if not pattern.startswith('/'):
+            raise ValueError(f"cache route must start with '/': {pattern!r}")
+        scope = rule.get("scope", "user")
+        if scope not in CACHE_SCOPES:
+            raise ValueError(f"invalid cache scope for {pattern}: {scope!r}")
+        rules.append(CacheRule(pattern, scope, float(rule.get("ttl", 0))))
+    return rules
+
+
+class EdgeCache:
+    """Byte-bounded LRU + TTL response cache for opted-in GET routes"""
+
+    def __init__(
+        self,
+        rules: List[CacheRule],
+        max_bytes: int = EDGE_CACHE_MAX_BYTES,
+        max_entry_bytes: int = EDGE_CACHE_MAX_ENTRY_BYTES
+    ):
+        self.rules = rules
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        # One alternation; group index -> rule
+        self._matcher = re.compile("|".join(
+            "(" + re.escape(rule.pattern.rstrip('/')).replace(r"\*", "[^/]+") + "/?)"
+            for rule in rules
+        )) if rules else None
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.bytes = 0
+        self.counters: Dict[str, int] = {
+            "hits": 0, "misses": 0, "revalidated": 0, "not_modified": 0,
+            "stored": 0, "evictions": 0, "uncacheable": 0, "too_large": 0
+        }
+
+    def rule_for(self, method: str, path: str) -> Optional[CacheRule]:
+        """The rule covering this request, or None if it isn't cacheable"""
+        if method != "GET" or self._matcher is None:
+            return None
+        match = self._matcher.fullmatch(path)
+        if match is None:
+            return None
+        return self.rules[match.lastindex - 1]
+
+    def key_for(self, rule: CacheRule, request: Request) -> str:
+        if rule.scope == "public":
+            scope = "public"
+        else:
+            credentials = f"{request.headers.get('authorization', '')}\0{request.headers.get('cookie', '')}"
+            scope = "user:" + hashlib.sha256(credentials.encode()).hexdigest()[:32]
+        accept_encoding = request.headers.get("accept-encoding", "").replace(" ", "").lower()
+        return f"{scope}|{request.url.path}?{request.url.query}|{accept_encoding}"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Entry for key, fresh or not (a stale one may still be revalidated)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def ttl_for(self, rule: CacheRule, status: int, headers) -> Optional[float]:
+        """Seconds a backend response may be served for, or None if it must not be stored"""
+        ttl = self._ttl(rule, status, headers)
+        if ttl is None:
+            self.counters["uncacheable"] += 1
+        return ttl
+
+    def _ttl(self, rule: CacheRule, status: int, headers) -> Optional[float]:
+        if status != 200 or "set-cookie" in headers:
+            return None
+        vary = {v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()}
+        if vary - {"accept-encoding"}:
+            return None
+
+        directives = parse_cache_control(headers.get("cache-control"))
+        if "no-store" in directives or (rule.scope == "public" and "private" in directives):
+            return None
+        if "no-cache" in directives:
+            # Only worth keeping if it can be revalidated
+            return 0.0 if "etag" in headers else None
+        for name in ("s-maxage", "max-age") if rule.scope == "public" else ("max-age",):
+            if name in directives:
+                try:
+                    return max(0.0, float(directives[name]))
+                except (TypeError, ValueError):
+                    return None
+        return rule.ttl
+
+    def store(
+        self,
+        key: str,
+        status: int,
+        raw_headers: List[Tuple[bytes, bytes]],
+        body: bytes,
+        ttl: float
+    ) -> CacheEntry:
+        """Store a complete response and return its entry (served even if too large to keep)"""
+        headers = [(k, v) for k, v in raw_headers if k.lower() not in _UNSTORED_HEADERS]
+        upstream_etag = next((v.decode("latin-1") for k, v in headers if k.lower() == b"etag"), None)
+        etag = upstream_etag
+        if etag is None:
+            etag = f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            headers.append((b"etag", etag.encode("latin-1")))
+        entry = CacheEntry(status, headers, body, etag, upstream_etag, ttl)
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+        if entry.size > self.max_bytes:
+            return entry
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self.counters["stored"] += 1
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.counters["evictions"] += 1
+        return entry
+
+    def respond(self, entry: CacheEntry, request: Request, outcome: str) -> Response:
+        """Serve an entry: 304 if the client already has it, else the stored response"""
+        self.counters[_OUTCOME_COUNTERS[outcome]] += 1
+        extra = [
+            (b"age", str(int(time.monotonic() - entry.stored_at)).encode()),
+            (b"x-cache", outcome.encode()),
+        ]
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, entry.etag):
+            self.counters["not_modified"] += 1
+            response = Response(status_code=304)
+            response.raw_headers = [(k, v) for k, v in entry.headers if k.lower() in _NOT_MODIFIED_HEADERS] + extra
+            return response
+
+        response = Response(content=entry.body, status_code=entry.status)
+        response.raw_headers = entry.headers + [(b"content-length", str(len(entry.body)).encode())] + extra
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "routes": [rule._asdict() for rule in self.rules],
+        }
+
+
+# Global cache instance
+edge_cache = EdgeCache(load_cache_routes(os.getenv("EDGE_CACHE_ROUTES")))
@@ -5,69 +5,26 @@ Centralized entry point for all backend services
 from fastapi import FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect, Form
 from fastapi.responses import StreamingResponse, JSONResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
 import httpx
 import os
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Iterable, List, Tuple
 import json
-import asyncio
 from datetime import datetime
 
+from app.edge_cache import CacheRule, edge_cache
+from app.middleware import RateLimitMiddleware
+from app.rate_limit import rate_limiter
 from app.websocket_proxy import proxy_websocket
+from app.routing import route_table, websocket_route_table
+from app.sse_relay import SSE_EVENT_TRANSFORMS, SSERelayStats, relay_sse
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Service routing configuration
-# NOTE: Order matters! More specific routes must come first
-SERVICE_ROUTES = {
-    # Authentication & Users (User Service)
-    '/api/auth': os.getenv('USER_SERVICE_URL', 'http://user-service:8001'),
-    '/api/v1/users': os.getenv('USER_SERVICE_URL', 'http://user-service:8001'),  # Platform keys and other v1 endpoints
-    '/api/users': os.getenv('USER_SERVICE_URL', 'http://user-service:8001'),
-
-    # Admin - User Management (User Service) - Must be before /api/admin
-    '/api/admin/users': os.getenv('USER_SERVICE_URL', 'http://user-service:8001'),
-
-    # Statistics (Worker Service) - More specific routes first
-    '/api/statistics': os.getenv('WORKER_SERVICE_URL', 'http://worker-api:8010'),
-    '/api/admin/statistics/historical': os.getenv('WORKER_SERVICE_URL', 'http://worker-api:8010'),  # Historical trends
-    '/api/admin/statistics/llm-health': os.getenv('WORKER_SERVICE_URL', 'http://worker-api:8010'),  # LLM health
-    '/api/admin/statistics/snapshot': os.getenv('WORKER_SERVICE_URL', 'http://worker-api:8010'),  # Snapshot trigger
-
-    # Admin - LLM & Statistics (Admin Service)
-    '/api/admin/llm-models': os.getenv('ADMIN_SERVICE_URL', 'http://admin-service:8005'),
-    '/api/admin/public/llm-models': os.getenv('ADMIN_SERVICE_URL', 'http://admin-service:8005'),  # Public LLM list (no admin required)
-    '/api/admin/statistics': os.getenv('ADMIN_SERVICE_URL', 'http://admin-service:8005'),  # Comprehensive and other admin stats
-    '/api/admin': os.getenv('ADMIN_SERVICE_URL', 'http://admin-service:8005'),
-
-    # LLM Proxy Service (OpenAI Compatible Endpoint)
-    '/api/llm': os.getenv('LLM_PROXY_SERVICE_URL', 'http://llm-proxy-service:8006'),
-
-    # A2A Router (Public agent endpoints) - Must be before /api/agents
-    '/api/v1/a2a': os.getenv('AGENT_SERVICE_URL', 'http://agent-service:8002'),
-
-    # Other Services
-    '/api/agents': os.getenv('AGENT_SERVICE_URL', 'http://agent-service:8002'),
-    '/api/hub': os.getenv('CHAT_SERVICE_URL', 'http://chat-service:8003'),  # Hub endpoints (deployed agents)
-    '/api/workbench': os.getenv('CHAT_SERVICE_URL', 'http://chat-service:8003'),  # Workbench endpoints
-    '/api/chat': os.getenv('CHAT_SERVICE_URL', 'http://chat-service:8003'),
-    '/api/tracing': os.getenv('TRACING_SERVICE_URL', 'http://tracing-service:8004'),
-}
-
-# Services that need path prefix stripping (prefix will be removed before forwarding)
-STRIP_PREFIX_SERVICES = {
-    '/api/llm',  # LLM Proxy expects /v1/... not /api/llm/v1/...
-}
-
-# WebSocket routes
-WEBSOCKET_ROUTES = {
-    '/ws/chat': os.getenv('CHAT_SERVICE_URL', 'http://chat-service:8003'),
-    '/ws/trace': os.getenv('TRACING_SERVICE_URL', 'http://tracing-service:8004'),
-}
-
 # HTTP client pool for better performance
 http_client: Optional[httpx.AsyncClient] = None
 
@@ -82,15 +39,25 @@ async def lifespan(app: FastAPI):
         limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
     )
 
+    # Compiled routing table (reloaded when GATEWAY_ROUTES_FILE changes)
+    route_table.start()
+
+    # Redis-backed rate limits shared by all gateway replicas
+    await rate_limiter.connect()
+
     # Log service routes
     logger.info("Service routing configuration:")
-    for route, service_url in SERVICE_ROUTES.items():
+    for route, service_url in route_table.table.routes.items():
         logger.info(f"  {route} -> {service_url}")
+    for rule in edge_cache.rules:
+        logger.info(f"  cached: {rule.pattern} (scope={rule.scope}, ttl={rule.ttl:g}s)")
 
     yield
 
     # Shutdown
     logger.info("Shutting down API Gateway...")
+    await route_table.stop()
+    await rate_limiter.close()
     if http_client:
         await http_client.aclose()
 
@@ -102,6 +69,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Rate limit per platform key / user / IP (registered before CORS so 429s still get CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # Configure CORS - Allow all origins for development
 logger.info("CORS configured to allow all origins (*)")
 
@@ -113,34 +83,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_service_url(path: str) -> Optional[str]:
-    """Determine which service should handle this request"""
-    for route_prefix, service_url in SERVICE_ROUTES.items():
-        if path.startswith(route_prefix):
-            return service_url
-    return None
-
-def get_route_prefix(path: str) -> Optional[str]:
-    """Get the matched route prefix for stripping"""
-    for route_prefix in SERVICE_ROUTES.keys():
-        if path.startswith(route_prefix):
-            return route_prefix
-    return None
-
-def get_target_path(path: str) -> str:
-    """Get the target path for the backend service, optionally stripping the route prefix"""
-    route_prefix = get_route_prefix(path)
-    if route_prefix and route_prefix in STRIP_PREFIX_SERVICES:
-        # Strip the route prefix for services that need it (e.g., /api/llm from /api/llm/v1/chat/completions)
-        target_path = path[len(route_prefix):]
-        # Ensure path starts with /
-        if not target_path.startswith('/'):
-            target_path = '/' + target_path
-        return target_path
-    # For other services, keep the full path
-    # Remove any double slashes
-    return path.replace('//', '/')
-
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -155,7 +97,7 @@ async def api_health_check():
     """Check health of all backend services"""
     health_status = {}
 
-    for route, service_url in SERVICE_ROUTES.items():
+    for route, service_url in route_table.table.routes.items():
         try:
             response = await http_client.get(f"{service_url}/health", timeout=2.0)
             health_status[route] = {
@@ -232,51 +174,148 @@ async def sso_callback(
             status_code=response.status_code
         )
 
-async def proxy_request(request: Request, service_url: str, path: str):
-    """Proxy HTTP request to backend service"""
+# Connection-level headers that must not be forwarded by a proxy (RFC 9110 7.6.1)
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade",
+})
+
+
+def end_to_end_headers(raw_headers: List[Tuple[bytes, bytes]], drop: Iterable[str] = ()) -> List[Tuple[bytes, bytes]]:
+    """
+    Filter raw (name, value) header pairs for forwarding
+
+    Removes hop-by-hop headers, headers named in Connection, and drop.
+    Repeated headers (Set-Cookie, Cookie) are kept as separate pairs.
+    """
+    excluded = set(HOP_BY_HOP_HEADERS)
+    excluded.update(drop)
+    for name, value in raw_headers:
+        if name.lower() == b"connection":
+            excluded.update(token.strip().lower() for token in value.decode("latin-1").split(","))
+    return [(name, value) for name, value in raw_headers if name.decode("latin-1").lower() not in excluded]
+
+
+async def relay_body(
+    response: httpx.Response,
+    chunks: Optional[AsyncIterator[bytes]] = None,
+    prefix: bytes = b""
+) -> AsyncIterator[bytes]:
+    """
+    Forward upstream bytes as they arrive (still encoded, so Content-Length stays valid)
+
+    prefix and chunks continue a body the caller already started reading.
+    """
+    try:
+        if prefix:
+            yield prefix
+        async for chunk in chunks or response.aiter_raw():
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+def relay_response(
+    response: httpx.Response,
+    chunks: Optional[AsyncIterator[bytes]] = None,
+    prefix: bytes = b""
+) -> StreamingResponse:
+    """Stream an upstream response to the client with its end-to-end headers"""
+    relayed = StreamingResponse(
+        content=relay_body(response, chunks, prefix),
+        status_code=response.status_code,
+        background=BackgroundTask(response.aclose)
+    )
+    # Upstream headers as-is (Content-Length/Content-Encoding match the raw bytes)
+    relayed.raw_headers = end_to_end_headers(response.headers.raw)
+    return relayed
+
+
+async def proxy_cached_get(
+    request: Request,
+    rule: CacheRule,
+    target_url: str,
+    query_params: List[Tuple[str, str]],
+    headers: List[Tuple[bytes, bytes]]
+):
+    """GET an opted-in route through the edge cache (see app.edge_cache)"""
+    key = edge_cache.key_for(rule, request)
+    entry = edge_cache.get(key)
+    if entry is not None and entry.fresh():
+        return edge_cache.respond(entry, request, "HIT")
+
+    # The cache answers the client's validators itself; upstream only sees the cache's own
+    headers = [(name, value) for name, value in headers if name.lower() not in (b"if-none-match", b"if-modified-since")]
+    if entry is not None and entry.upstream_etag:
+        headers.append((b"if-none-match", entry.upstream_etag.encode("latin-1")))
+
+    upstream_request = http_client.build_request("GET", target_url, params=query_params, headers=headers)
+    response = await http_client.send(upstream_request, stream=True)
+
+    if response.status_code == 304 and entry is not None:
+        await response.aclose()
+        ttl = edge_cache.ttl_for(rule, 200, response.headers)
+        entry.refresh(ttl or 0.0)
+        return edge_cache.respond(entry, request, "REVALIDATED")
+
+    ttl = edge_cache.ttl_for(rule, response.status_code, response.headers)
+    if ttl is None:
+        return relay_response(response)
+
+    chunks = response.aiter_raw()
+    body = bytearray()
+    try:
+        async for chunk in chunks:
+            body += chunk
+            if len(body) > edge_cache.max_entry_bytes:
+                # Too big to keep: stream the rest through
+                edge_cache.counters["too_large"] += 1
+                return relay_response(response, chunks, bytes(body))
+    except BaseException:
+        await response.aclose()
+        raise
+    await response.aclose()
+
+    entry = edge_cache.store(key, response.status_code, end_to_end_headers(response.headers.raw), bytes(body), ttl)
+    return edge_cache.respond(entry, request, "MISS")
+
+
+async def proxy_request(request: Request, service_url: str, target_path: str):
+    """Proxy HTTP request to backend service (target_path already resolved by the route table)"""
     if not http_client:
         raise HTTPException(status_code=500, detail="HTTP client not initialized")
 
-    # Get target path (with route prefix stripped)
-    target_path = get_target_path(path)
-
     # Build target URL
     target_url = f"{service_url}{target_path}"
 
-    # Get query parameters
-    query_params = dict(request.query_params)
+    # Get query parameters (repeated keys kept)
+    query_params = request.query_params.multi_items()
 
-    # Get headers (excluding host)
-    headers = dict(request.headers)
-    headers.pop("host", None)
-
-    # Get body for non-GET requests
-    body = None
-    if request.method != "GET":
-        body = await request.body()
+    # End-to-end headers, excluding host (httpx sets it for the target)
+    headers = end_to_end_headers(request.headers.raw, drop=("host",))
 
     logger.info("=" * 80)
     logger.info(f"[API Gateway] Proxying request:")
     logger.info(f"  Method: {request.method}")
-    logger.info(f"  Original path: {path}")
+    logger.info(f"  Original path: {request.url.path}")
     logger.info(f"  Target URL: {target_url}")
     logger.info(f"  Query params: {query_params}")
-    logger.info(f"  Headers: {dict(headers)}")
-    if body:
-        logger.info(f"  Body length: {len(body)} bytes")
-        logger.info(f"  Body preview: {body[:200]}")
+    logger.info(f"  Content-Length: {request.headers.get('content-length', 'none')}")
     logger.info("=" * 80)
 
     try:
         # Check if this is an SSE request (for real-time streaming)
-        accept_header = headers.get("accept", "")
-        is_sse = "text/event-stream" in accept_header or path.endswith("/stream")
+        accept_header = request.headers.get("accept", "")
+        is_sse = "text/event-stream" in accept_header or target_path.endswith("/stream")
 
-        logger.info(f"[API Gateway] SSE Check: accept_header={accept_header}, path={path}, is_sse={is_sse}")
+        logger.info(f"[API Gateway] SSE Check: accept_header={accept_header}, path={target_path}, is_sse={is_sse}")
 
         if is_sse:
+            # SSE requests are small chat payloads; read them before the response starts streaming
+            body = await request.body() if request.method != "GET" else None
+
             # Check the framework from the custom header
-            agent_framework = headers.get("x-agent-framework", "").lower()
+            agent_framework = request.headers.get("x-agent-framework", "").lower()
             logger.info(f"[API Gateway] Detected SSE request, framework: {agent_framework or 'unknown'}")
 
             # For SSE, use streaming to avoid buffering
@@ -297,35 +336,15 @@ async def proxy_request(request: Request, service_url: str, path: str):
                         yield f"data: {json.dumps({'error': error_text.decode()})}\n\n".encode()
                         return
 
-                    # Different streaming strategies based on framework
-                    if agent_framework == "langchain":
-                        # Langchain: Use line-based streaming for complete SSE events
-                        # This ensures JSON events are not split mid-stream
-                        logger.info("[API Gateway] Using line-based streaming for Langchain")
-                        line_count = 0
-                        try:
-                            async for line in response.aiter_lines():
-                                line_count += 1
-                                logger.debug(f"[API Gateway] Langchain line #{line_count}: {line[:100]}")
-                                # Add newline to each line and encode
-                                yield f"{line}\n".encode()
-                                # Force flush after each line for real-time streaming
-                                await asyncio.sleep(0)  # This allows other tasks to run
-                            logger.info(f"[API Gateway] Langchain streaming completed: {line_count} lines")
-                        except Exception as e:
-                            logger.error(f"[API Gateway] Error in Langchain streaming: {e}")
-                            raise
-                    else:
-                        # Agno and others: Use line-based streaming
-                        # Works well for complete JSON events with newlines
-                        logger.info(f"[API Gateway] Using line-based streaming for {agent_framework or 'default'}")
-                        line_count = 0
-                        async for line in response.aiter_lines():
-                            line_count += 1
-                            logger.debug(f"[API Gateway] Line #{line_count}: {line[:100]}")
-                            # Add newline to each line and encode
-                            yield f"{line}\n".encode()
-                        logger.info(f"[API Gateway] Line-based streaming completed: {line_count} lines")
+                    # Same relay for every framework: raw bytes, written on event boundaries
+                    stats = SSERelayStats()
+                    async for chunk in relay_sse(
+                        response.aiter_bytes(),
+                        transform=SSE_EVENT_TRANSFORMS.get(agent_framework),
+                        stats=stats
+                    ):
+                        yield chunk
+                    logger.info(f"[API Gateway] SSE stream completed: {stats.bytes_out} bytes in {stats.writes} writes")
 
             return StreamingResponse(
                 content=stream_sse(),
@@ -337,24 +356,26 @@ async def proxy_request(request: Request, service_url: str, path: str):
                 }
             )
         else:
-            # For non-SSE requests, use regular request
-            response = await http_client.request(
+            # Opted-in public/idempotent GETs are served from gateway memory when possible
+            cache_rule = edge_cache.rule_for(request.method, request.url.path)
+            if cache_rule is not None:
+                return await proxy_cached_get(request, cache_rule, target_url, query_params, headers)
+
+            # Stream both bodies: the request body goes upstream as the client sends it
+            # (with its Content-Length, or chunked), and the response is relayed once its
+            # headers arrive, so gateway memory stays bounded regardless of payload size.
+            upstream_request = http_client.build_request(
                 method=request.method,
                 url=target_url,
                 params=query_params,
                 headers=headers,
-                content=body
+                content=request.stream() if request.method not in ("GET", "HEAD") else None
             )
+            response = await http_client.send(upstream_request, stream=True)
 
             logger.info(f"[API Gateway] Response received: status={response.status_code}, content-type={response.headers.get('content-type')}")
 
-            # Return the response
-            return StreamingResponse(
-                content=response.iter_bytes(),
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.headers.get("content-type", "application/json")
-            )
+            return relay_response(response)
 
     except httpx.TimeoutException:
         logger.error(f"Timeout while proxying to {target_url}")
@@ -380,7 +401,7 @@ async def handle_sso_callback(
         raise HTTPException(status_code=500, detail="HTTP client not initialized")
 
     # Forward to user-service callback/sso endpoint
-    user_service_url = SERVICE_ROUTES.get('/api/auth')
+    user_service_url = route_table.table.routes.get('/api/auth')
     if not user_service_url:
         raise HTTPException(status_code=500, detail="User service not configured")
 
@@ -417,18 +438,15 @@ async def gateway_proxy(request: Request, path: str):
     else:
         path = f"/{path}"
 
-    # Find the appropriate service
-    service_url = get_service_url(path)
+    # Find the appropriate service and target path in one lookup
+    route = route_table.resolve(path)
 
-    if not service_url:
+    if not route:
         logger.warning(f"No service found for path: {path}")
         raise HTTPException(status_code=404, detail=f"No service found for path: {path}")
 
-    # Get the target path
-    target_path = get_target_path(path)
-
     # Proxy the request
-    return await proxy_request(request, service_url, target_path)
+    return await proxy_request(request, route.service_url, route.target_path)
 
 @app.websocket("/ws/{path:path}")
 async def websocket_proxy_handler(websocket: WebSocket, path: str):
@@ -436,18 +454,12 @@ async def websocket_proxy_handler(websocket: WebSocket, path: str):
 
     # Determine the backend service
     ws_path = f"/ws/{path}"
-    service_url = None
-    matched_route = None
-
-    for route_prefix, url in WEBSOCKET_ROUTES.items():
-        if ws_path.startswith(route_prefix):
-            service_url = url
-            matched_route = route_prefix
-            break
+    route = websocket_route_table.resolve(ws_path)
 
-    if not service_url:
+    if not route:
         await websocket.close(code=1008, reason="No service found for WebSocket path")
         return
+    service_url = route.service_url
 
     # Convert http to ws protocol
     ws_service_url = service_url.replace("http://", "ws://").replace("https://", "wss://")
@@ -3,15 +3,19 @@ Middleware for API Gateway
 """
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.datastructures import Headers
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
-import jwt
+from jose import ExpiredSignatureError, JWTError, jwt
+import math
 import time
 import logging
 from typing import Optional
 from datetime import datetime
 import json
 
+from app.rate_limit import GatewayRateLimiter, rate_limiter
+
 logger = logging.getLogger(__name__)
 
 # Bearer token security
@@ -77,14 +81,14 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
             request.state.user = payload
             request.state.user_id = payload.get("loginid", payload.get("sub"))
 
-        except jwt.ExpiredSignatureError:
+        except ExpiredSignatureError:
             logger.warning(f"Expired JWT token for {path}")
             return Response(
                 content=json.dumps({"detail": "Token has expired"}),
                 status_code=401,
                 media_type="application/json"
             )
-        except jwt.InvalidTokenError as e:
+        except JWTError as e:
             logger.warning(f"Invalid JWT token for {path}: {str(e)}")
             return Response(
                 content=json.dumps({"detail": "Invalid token"}),
@@ -134,118 +138,56 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
         return response
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple rate limiting middleware"""
-
-    def __init__(self, app, requests_per_minute: int = 100):
-        super().__init__(app)
-        self.requests_per_minute = requests_per_minute
-        self.request_counts = {}  # IP -> list of timestamps
-        self.window_seconds = 60
-
-    async def dispatch(self, request: Request, call_next):
-        # Get client IP
-        client_ip = request.client.host if request.client else "unknown"
-
-        # Skip rate limiting for health checks
-        if request.url.path in ["/health", "/api/health"]:
-            response = await call_next(request)
-            return response
-
-        # Current time
-        current_time = time.time()
-
-        # Initialize or get request timestamps for this IP
-        if client_ip not in self.request_counts:
-            self.request_counts[client_ip] = []
-
-        # Remove old timestamps outside the window
-        self.request_counts[client_ip] = [
-            timestamp for timestamp in self.request_counts[client_ip]
-            if current_time - timestamp < self.window_seconds
-        ]
-
-        # Check rate limit
-        if len(self.request_counts[client_ip]) >= self.requests_per_minute:
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return Response(
+class RateLimitMiddleware:
+    """
+    Per-identity rate limiting shared across gateway replicas (see app.rate_limit)
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so streamed and SSE
+    responses pass through untouched; only the response start message is
+    touched, to add the RateLimit-* headers.
+    """
+
+    def __init__(self, app, limiter: Optional[GatewayRateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+        self.exempt_paths = {"/health", "/api/health"}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = scope["client"][0] if scope.get("client") else "unknown"
+        kind, identity, key_hash = self.limiter.identify(Headers(scope=scope).get("authorization"), client_ip)
+        decision = await self.limiter.admit(kind, identity)
+        if decision is None and key_hash is None:
+            await self.app(scope, receive, send)
+            return
+
+        if decision is not None and not decision.allowed:
+            response = Response(
                 content=json.dumps({
                     "detail": "Rate limit exceeded",
-                    "retry_after": self.window_seconds
+                    "retry_after": max(1, math.ceil(decision.retry_after))
                 }),
                 status_code=429,
+                headers=decision.headers(),
                 media_type="application/json"
             )
-
-        # Record this request
-        self.request_counts[client_ip].append(current_time)
-
-        # Continue with the request
-        response = await call_next(request)
-        return response
-
-class CacheMiddleware(BaseHTTPMiddleware):
-    """Simple response caching middleware for GET requests"""
-
-    def __init__(self, app, cache_ttl_seconds: int = 60):
-        super().__init__(app)
-        self.cache_ttl_seconds = cache_ttl_seconds
-        self.cache = {}  # Simple in-memory cache
-
-    async def dispatch(self, request: Request, call_next):
-        # Only cache GET requests
-        if request.method != "GET":
-            response = await call_next(request)
-            return response
-
-        # Skip caching for certain paths
-        skip_cache_paths = ["/health", "/api/health", "/ws/"]
-        if any(request.url.path.startswith(path) for path in skip_cache_paths):
-            response = await call_next(request)
-            return response
-
-        # Create cache key
-        cache_key = f"{request.url.path}?{request.url.query}"
-
-        # Check cache
-        if cache_key in self.cache:
-            cached_data, cached_time = self.cache[cache_key]
-            if time.time() - cached_time < self.cache_ttl_seconds:
-                logger.debug(f"Cache hit for {cache_key}")
-                return Response(
-                    content=cached_data["content"],
-                    status_code=cached_data["status_code"],
-                    headers=cached_data["headers"],
-                    media_type=cached_data["media_type"]
-                )
-
-        # Process request
-        response = await call_next(request)
-
-        # Cache successful responses
-        if response.status_code == 200:
-            # Read response body
-            response_body = b""
-            async for chunk in response.body_iterator:
-                response_body += chunk
-
-            # Store in cache
-            self.cache[cache_key] = (
-                {
-                    "content": response_body,
-                    "status_code": response.status_code,
-                    "headers": dict(response.headers),
-                    "media_type": response.media_type
-                },
-                time.time()
-            )
-
-            # Return new response with the body
-            return Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type
-            )
-
-        return response
\ No newline at end of file
+            await response(scope, receive, send)
+            return
+
+        rate_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in decision.headers().items()
+        ] if decision is not None else []
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                if rate_headers:
+                    message["headers"] = list(message.get("headers", ())) + rate_headers
+                if key_hash is not None:
+                    self.limiter.confirm_key(key_hash, scope["path"], message["status"])
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,278 @@
+"""
+Distributed rate limiting for the API Gateway
+
+Each request is charged to one identity, checked in this order:
+
+- key:<hash of the platform key> for "Authorization: Bearer a2g_..."
+- user:<JWT subject> for a valid platform JWT
+- ip:<client address> otherwise, including expired or invalid tokens
+
+The gateway cannot validate platform keys itself, so a key's requests are
+charged to the client IP until a backend has accepted the key once: a 2xx
+from an LLM Proxy route that authenticates platform keys (PLATFORM_KEY_PATH).
+Other routes may answer 2xx without looking at the key, so they don't count.
+Made-up keys therefore can't be used to dodge the IP limit.
+
+Limits are requests per minute per identity type: RATE_LIMIT_PER_KEY,
+RATE_LIMIT_PER_USER and RATE_LIMIT_PER_IP, where 0 disables that type. They
+are enforced in Redis with GCRA (generic cell rate algorithm), so every
+gateway replica shares the same budget. GCRA stores one number per identity,
+the theoretical arrival time (TAT) of its next request. A Lua script checks
+and advances it atomically, so each request costs O(1) time and memory. A
+client may burst up to a minute's allowance, then is held to the steady rate.
+
+Local fast path: a client well under its limit is granted a small lease of
+requests, which this replica spends without a Redis round trip. Each lease
+is twice the size of the last one if the client spent that one before it
+expired, up to RATE_LIMIT_LEASE_MAX. Otherwise the lease size goes back to
+one. Near the limit, Redis only grants one request at a time, so every
+request is checked exactly. An unspent lease expires after
+RATE_LIMIT_LEASE_TTL seconds and still counts as used. A replica can
+therefore overcharge a client by at most one lease.
+
+If Redis is unavailable, requests are admitted (fail open).
+"""
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import redis.asyncio as redis
+from jose import JWTError, jwt
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/8")
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "local-dev-secret-key")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+
+# Requests per minute per identity type (0 disables limiting for that type)
+RATE_LIMITS = {
+    "key": int(os.getenv("RATE_LIMIT_PER_KEY", "1200")),
+    "user": int(os.getenv("RATE_LIMIT_PER_USER", "600")),
+    "ip": int(os.getenv("RATE_LIMIT_PER_IP", "100")),
+}
+RATE_LIMIT_PERIOD = 60
+RATE_LIMIT_LEASE_MAX = int(os.getenv("RATE_LIMIT_LEASE_MAX", "16"))
+RATE_LIMIT_LEASE_TTL = float(os.getenv("RATE_LIMIT_LEASE_TTL", "1"))
+# Bound on per-process identity state (leases, verified tokens, confirmed keys)
+RATE_LIMIT_LOCAL_ENTRIES = int(os.getenv("RATE_LIMIT_LOCAL_ENTRIES", "10000"))
+RATE_LIMIT_KEY_PREFIX = "gateway:ratelimit:"
+
+PLATFORM_KEY_PREFIX = "a2g_"
+# LLM Proxy's OpenAI-compatible routes, which reject requests without a valid platform key
+PLATFORM_KEY_PATH = re.compile(r"^/api/llm/trace/[^/]+/v1/")
+
+# KEYS[1]: the identity's TAT (ms, Redis clock)
+# ARGV: emission interval (ms), burst tolerance (ms), requested lease size
+# Returns [granted, remaining, retry_after_ms, reset_ms]
+_GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local available = math.floor((now + tolerance - tat) / interval)
+if available < 1 then
+    return {0, 0, tat + interval - tolerance - now, tat - now}
+end
+local granted = 1
+if available >= 2 * want then
+    granted = want
+end
+tat = tat + granted * interval
+redis.call('SET', KEYS[1], tat, 'PX', tat - now)
+return {granted, available - granted, 0, tat - now}
+"""
+
+
+class RateLimitDecision(NamedTuple):
+    """Outcome of charging one request to an identity"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: float  # seconds until the full burst allowance is back
+    retry_after: float  # seconds until a rejected request would pass
+
+    def headers(self) -> Dict[str, str]:
+        """RateLimit-* headers (IETF draft), plus Retry-After when rejected"""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(max(0, self.remaining)),
+            "RateLimit-Reset": str(math.ceil(max(0.0, self.reset))),
+            "RateLimit-Policy": f"{self.limit};w={RATE_LIMIT_PERIOD}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class _Lease:
+    """Requests this replica may admit for one identity without asking Redis"""
+    __slots__ = ("size", "tokens", "remaining", "reset_at", "expires")
+
+    def __init__(self, size: int, tokens: int, remaining: int, reset_at: float, expires: float):
+        self.size = size
+        self.tokens = tokens
+        self.remaining = remaining
+        self.reset_at = reset_at
+        self.expires = expires
+
+
+def _remember(cache: OrderedDict, key: str, value: Any):
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > RATE_LIMIT_LOCAL_ENTRIES:
+        cache.popitem(last=False)
+
+
+class GatewayRateLimiter:
+    """GCRA rate limiter shared by gateway replicas through Redis"""
+
+    def __init__(
+        self,
+        limits: Dict[str, int] = RATE_LIMITS,
+        period: int = RATE_LIMIT_PERIOD,
+        lease_max: int = RATE_LIMIT_LEASE_MAX,
+        lease_ttl: float = RATE_LIMIT_LEASE_TTL
+    ):
+        self.limits = limits
+        self.period = period
+        self.lease_max = max(1, lease_max)
+        self.lease_ttl = lease_ttl
+        self.redis_client: Optional[redis.Redis] = None
+        self._script = None
+        self._healthy = True
+        self._leases: "OrderedDict[str, _Lease]" = OrderedDict()
+        # JWT -> (subject, expiry) for tokens that verified
+        self._tokens: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # Platform key hashes a backend has accepted
+        self._confirmed_keys: "OrderedDict[str, bool]" = OrderedDict()
+        self.counters: Dict[str, int] = {"local": 0, "redis": 0, "limited": 0, "errors": 0}
+
+    async def connect(self, url: str = REDIS_URL):
+        """Create the Redis client; connections are opened lazily, so a Redis outage doesn't block startup"""
+        if not any(self.limits.values()):
+            logger.info("[API Gateway] Rate limiting disabled")
+            return
+        self.redis_client = redis.from_url(url, decode_responses=True)
+        self._script = self.redis_client.register_script(_GCRA_SCRIPT)
+        try:
+            await self.redis_client.ping()
+            logger.info(f"[API Gateway] Rate limiter connected to Redis at {url}")
+        except Exception as e:
+            logger.error(f"[API Gateway] Redis at {url} unavailable, admitting requests until it is back: {e}")
+
+    async def close(self):
+        if self.redis_client:
+            await self.redis_client.close()
+            self.redis_client = None
+
+    def identify(self, authorization: Optional[str], client_host: str) -> Tuple[str, str, Optional[str]]:
+        """
+        Pick the identity a request is charged to
+
+        Returns (identity type, identity, unconfirmed platform key hash). The
+        key hash is set while the key is still charged to the IP, so the
+        caller can confirm it once a backend accepts it.
+        """
+        if authorization and authorization[:7].lower() == "bearer ":
+            token = authorization[7:].strip()
+            if token.startswith(PLATFORM_KEY_PREFIX):
+                key_hash = hashlib.sha256(token.encode()).hexdigest()[:32]
+                if key_hash in self._confirmed_keys:
+                    return "key", key_hash, None
+                return "ip", client_host, key_hash
+            subject = self._token_subject(token)
+            if subject is not None:
+                return "user", subject, None
+        return "ip", client_host, None
+
+    def confirm_key(self, key_hash: str, path: str, status_code: int):
+        """Charge a platform key to its own budget from now on, if the response shows a backend accepted it"""
+        if 200 <= status_code < 300 and PLATFORM_KEY_PATH.match(path):
+            _remember(self._confirmed_keys, key_hash, True)
+
+    def _token_subject(self, token: str) -> Optional[str]:
+        cached = self._tokens.get(token)
+        if cached is not None:
+            subject, expires = cached
+            if expires > time.time():
+                return subject
+            del self._tokens[token]
+            return None
+        try:
+            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        except JWTError:
+            return None
+        subject = payload.get("sub") or payload.get("loginid")
+        if not subject:
+            return None
+        _remember(self._tokens, token, (str(subject), float(payload.get("exp") or math.inf)))
+        return str(subject)
+
+    async def admit(self, kind: str, identity: str) -> Optional[RateLimitDecision]:
+        """Charge one request to an identity; None when it isn't limited"""
+        limit = self.limits.get(kind)
+        if not limit or self._script is None:
+            return None
+
+        key = f"{kind}:{identity}"
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is not None and now < lease.expires:
+            if lease.tokens > 0:
+                lease.tokens -= 1
+                self.counters["local"] += 1
+                return RateLimitDecision(True, limit, lease.remaining + lease.tokens, lease.reset_at - now, 0.0)
+            # Spent before expiring: this client can use a bigger lease
+            size = min(lease.size * 2, self.lease_max)
+        else:
+            size = 1
+
+        interval = max(1, round(self.period * 1000 / limit))
+        try:
+            granted, remaining, retry_ms, reset_ms = await self._script(
+                keys=[f"{RATE_LIMIT_KEY_PREFIX}{key}"],
+                args=[interval, self.period * 1000, size]
+            )
+        except Exception as e:
+            self.counters["errors"] += 1
+            if self._healthy:
+                self._healthy = False
+                logger.error(f"[API Gateway] Rate limit check failed, admitting requests: {e}")
+            return None
+        if not self._healthy:
+            self._healthy = True
+            logger.info("[API Gateway] Rate limit checks recovered")
+        self.counters["redis"] += 1
+
+        granted, remaining = int(granted), int(remaining)
+        reset = int(reset_ms) / 1000
+        if not granted:
+            self.counters["limited"] += 1
+            logger.warning(f"[API Gateway] Rate limit exceeded for {kind} {identity}")
+            return RateLimitDecision(False, limit, 0, reset, int(retry_ms) / 1000)
+
+        _remember(self._leases, key, _Lease(granted, granted - 1, remaining, now + reset, now + self.lease_ttl))
+        return RateLimitDecision(True, limit, remaining + granted - 1, reset, 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "limits": self.limits,
+            "leases": len(self._leases),
+            "lease_max": self.lease_max,
+        }
+
+
+# Global limiter instance
+rate_limiter = GatewayRateLimiter()
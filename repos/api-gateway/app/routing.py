@@ -0,0 +1,228 @@
+"""
+Compiled routing table for the API Gateway
+
+Routes map a path prefix to a backend service. A request goes to the route
+with the longest matching prefix, so the order routes are declared in no
+longer matters. Matching is by string prefix, as before: /api/admin also
+matches /api/administrators.
+
+RouteTable resolves service URL, matched prefix and target path in one
+lookup. It buckets prefixes by length and tries the lengths longest first,
+so the cost is one dict lookup per distinct prefix length, not one
+startswith per route.
+
+Routes can be changed without a restart by pointing GATEWAY_ROUTES_FILE at
+a JSON file:
+
+    {
+        "routes": {"/api/reports": "http://report-service:8020", "/api/hub": null},
+        "strip_prefix": ["/api/llm"]
+    }
+
+Its routes are merged over the built-in SERVICE_ROUTES (null removes a
+route) and "strip_prefix" replaces STRIP_PREFIX_SERVICES when present. The
+file is re-read when its mtime changes. An invalid file is logged and the
+current table keeps serving.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+USER_SERVICE_URL = os.getenv('USER_SERVICE_URL', 'http://user-service:8001')
+AGENT_SERVICE_URL = os.getenv('AGENT_SERVICE_URL', 'http://agent-service:8002')
+CHAT_SERVICE_URL = os.getenv('CHAT_SERVICE_URL', 'http://chat-service:8003')
+TRACING_SERVICE_URL = os.getenv('TRACING_SERVICE_URL', 'http://tracing-service:8004')
+ADMIN_SERVICE_URL = os.getenv('ADMIN_SERVICE_URL', 'http://admin-service:8005')
+LLM_PROXY_SERVICE_URL = os.getenv('LLM_PROXY_SERVICE_URL', 'http://llm-proxy-service:8006')
+WORKER_SERVICE_URL = os.getenv('WORKER_SERVICE_URL', 'http://worker-api:8010')
+
+# Service routing configuration (longest matching prefix wins)
+SERVICE_ROUTES = {
+    # Authentication & Users (User Service)
+    '/api/auth': USER_SERVICE_URL,
+    '/api/v1/users': USER_SERVICE_URL,  # Platform keys and other v1 endpoints
+    '/api/users': USER_SERVICE_URL,
+
+    # Admin - User Management (User Service)
+    '/api/admin/users': USER_SERVICE_URL,
+
+    # Statistics (Worker Service)
+    '/api/statistics': WORKER_SERVICE_URL,
+    '/api/admin/statistics/historical': WORKER_SERVICE_URL,  # Historical trends
+    '/api/admin/statistics/llm-health': WORKER_SERVICE_URL,  # LLM health
+    '/api/admin/statistics/snapshot': WORKER_SERVICE_URL,  # Snapshot trigger
+
+    # Admin - LLM & Statistics (Admin Service)
+    '/api/admin/llm-models': ADMIN_SERVICE_URL,
+    '/api/admin/public/llm-models': ADMIN_SERVICE_URL,  # Public LLM list (no admin required)
+    '/api/admin/statistics': ADMIN_SERVICE_URL,  # Comprehensive and other admin stats
+    '/api/admin': ADMIN_SERVICE_URL,
+
+    # LLM Proxy Service (OpenAI Compatible Endpoint)
+    '/api/llm': LLM_PROXY_SERVICE_URL,
+
+    # A2A Router (Public agent endpoints)
+    '/api/v1/a2a': AGENT_SERVICE_URL,
+
+    # Other Services
+    '/api/agents': AGENT_SERVICE_URL,
+    '/api/hub': CHAT_SERVICE_URL,  # Hub endpoints (deployed agents)
+    '/api/workbench': CHAT_SERVICE_URL,  # Workbench endpoints
+    '/api/chat': CHAT_SERVICE_URL,
+    '/api/tracing': TRACING_SERVICE_URL,
+}
+
+# Services that need path prefix stripping (prefix will be removed before forwarding)
+STRIP_PREFIX_SERVICES = {
+    '/api/llm',  # LLM Proxy expects /v1/... not /api/llm/v1/...
+}
+
+# WebSocket routes
+WEBSOCKET_ROUTES = {
+    '/ws/chat': CHAT_SERVICE_URL,
+    '/ws/trace': TRACING_SERVICE_URL,
+}
+
+# Optional JSON file with route overrides, re-read when it changes
+GATEWAY_ROUTES_FILE = os.getenv("GATEWAY_ROUTES_FILE", "")
+GATEWAY_ROUTES_RELOAD_INTERVAL = float(os.getenv("GATEWAY_ROUTES_RELOAD_INTERVAL", "5"))
+
+
+class RouteMatch(NamedTuple):
+    """Result of resolving a request path"""
+    prefix: str
+    service_url: str
+    target_path: str
+
+
+class RouteTable:
+    """Immutable longest-prefix routing table"""
+
+    def __init__(self, routes: Dict[str, str], strip_prefixes: Iterable[str] = ()):
+        self.routes = dict(routes)
+        self.strip_prefixes = frozenset(strip_prefixes)
+        # prefix -> (service_url, strip prefix?)
+        self._by_prefix: Dict[str, Tuple[str, bool]] = {
+            prefix: (service_url, prefix in self.strip_prefixes)
+            for prefix, service_url in self.routes.items()
+        }
+        # Distinct prefix lengths, longest first
+        self._lengths: List[int] = sorted({len(prefix) for prefix in self.routes}, reverse=True)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def resolve(self, path: str) -> Optional[RouteMatch]:
+        """Match path against the longest route prefix; None if no route matches"""
+        by_prefix = self._by_prefix
+        path_length = len(path)
+        for length in self._lengths:
+            if length > path_length:
+                continue
+            entry = by_prefix.get(path[:length])
+            if entry is None:
+                continue
+            service_url, strip = entry
+            if strip:
+                # e.g. /api/llm/v1/chat/completions -> /v1/chat/completions
+                target_path = path[length:]
+                if not target_path.startswith('/'):
+                    target_path = '/' + target_path
+            else:
+                # Keep the full path, minus any double slashes
+                target_path = path.replace('//', '/')
+            return RouteMatch(path[:length], service_url, target_path)
+        return None
+
+
+def load_routes_file(path: str) -> RouteTable:
+    """Build a RouteTable from the built-in routes plus the overrides in path"""
+    with open(path) as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("routes file must contain a JSON object")
+
+    routes = dict(SERVICE_ROUTES)
+    for prefix, service_url in (config.get("routes") or {}).items():
+        if not prefix.startswith('/'):
+            raise ValueError(f"route prefix must start with '/': {prefix!r}")
+        if service_url is None:
+            routes.pop(prefix, None)
+        elif isinstance(service_url, str) and service_url.startswith(("http://", "https://")):
+            routes[prefix] = service_url.rstrip('/')
+        else:
+            raise ValueError(f"invalid service URL for {prefix}: {service_url!r}")
+
+    strip_prefixes = config.get("strip_prefix")
+    if strip_prefixes is None:
+        strip_prefixes = STRIP_PREFIX_SERVICES
+    return RouteTable(routes, strip_prefixes)
+
+
+class RouteTableReloader:
+    """Holds the active RouteTable and swaps it when the routes file changes"""
+
+    def __init__(self, path: str = GATEWAY_ROUTES_FILE, interval: float = GATEWAY_ROUTES_RELOAD_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.table = RouteTable(SERVICE_ROUTES, STRIP_PREFIX_SERVICES)
+        self._mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reloads = 0
+
+    def resolve(self, path: str) -> Optional[RouteMatch]:
+        return self.table.resolve(path)
+
+    def reload(self) -> bool:
+        """Re-read the routes file if it changed; returns True if the table was replaced"""
+        if not self.path:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            if self._mtime is not None:
+                logger.error(f"[API Gateway] Routes file {self.path} unavailable, keeping current routes: {e}")
+                self._mtime = None
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            table = load_routes_file(self.path)
+        except (OSError, ValueError) as e:
+            logger.error(f"[API Gateway] Invalid routes file {self.path}, keeping current routes: {e}")
+            return False
+        # Single reference swap: in-flight requests keep the table they resolved against
+        self.table = table
+        self.reloads += 1
+        logger.info(f"[API Gateway] Loaded {len(table)} routes from {self.path}")
+        return True
+
+    def start(self):
+        """Load the routes file and watch it for changes"""
+        self.reload()
+        if self.path and self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.reload()
+
+
+# Active HTTP routing table
+route_table = RouteTableReloader()
+websocket_route_table = RouteTable(WEBSOCKET_ROUTES)
@@ -0,0 +1,98 @@
+"""
+Byte-level Server-Sent Events relay
+
+The gateway forwards agent and LLM event streams without parsing them. The
+upstream bytes are passed through as they arrive. Each write ends on an event
+boundary (a blank line), so clients never see half an event. A network read
+holding several events is forwarded as one write, and a read that ends
+mid-event waits for the rest of that event.
+
+Nothing is decoded unless an EventTransform is configured for the stream.
+"""
+import logging
+from typing import AsyncIterator, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rewrites one complete event (bytes, including its trailing blank line)
+EventTransform = Callable[[bytes], bytes]
+
+# x-agent-framework -> transform applied to each event; empty means raw passthrough
+SSE_EVENT_TRANSFORMS: Dict[str, EventTransform] = {}
+
+# A partial event larger than this is forwarded without waiting for its boundary
+MAX_PENDING_EVENT_BYTES = 64 * 1024
+
+
+def _boundary_end(buffer, start: int = 0) -> int:
+    """Index just past the last event boundary in buffer[start:], or -1"""
+    lf = buffer.rfind(b"\n\n", start)
+    crlf = buffer.rfind(b"\r\n\r\n", start)
+    if lf < 0 and crlf < 0:
+        return -1
+    return max(lf + 2 if lf >= 0 else -1, crlf + 4 if crlf >= 0 else -1)
+
+
+def _split_events(data: bytes):
+    """Split complete events, keeping each event's own line endings"""
+    start = 0
+    while start < len(data):
+        lf = data.find(b"\n\n", start)
+        crlf = data.find(b"\r\n\r\n", start)
+        if crlf >= 0 and (lf < 0 or crlf + 2 <= lf):
+            end = crlf + 4
+        elif lf >= 0:
+            end = lf + 2
+        else:
+            end = len(data)
+        yield data[start:end]
+        start = end
+
+
+class SSERelayStats:
+    """Per-stream counters, logged once when the stream ends"""
+    __slots__ = ("bytes_out", "writes")
+
+    def __init__(self):
+        self.bytes_out = 0
+        self.writes = 0
+
+
+async def relay_sse(
+    chunks: AsyncIterator[bytes],
+    transform: Optional[EventTransform] = None,
+    stats: Optional[SSERelayStats] = None
+) -> AsyncIterator[bytes]:
+    """Re-chunk upstream bytes on event boundaries, optionally transforming each event"""
+    def finish(out: bytes) -> bytes:
+        if transform is not None:
+            out = b"".join(transform(event) for event in _split_events(out))
+        if stats is not None:
+            stats.bytes_out += len(out)
+            stats.writes += 1
+        return out
+
+    pending = bytearray()
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        if not pending and chunk.endswith((b"\n\n", b"\r\n\r\n")):
+            # Common case: the read ends exactly on a boundary - forward it untouched
+            yield finish(chunk)
+            continue
+
+        # Only the new bytes (plus a possible split boundary) can hold a boundary
+        search_from = max(len(pending) - 3, 0)
+        pending += chunk
+        end = _boundary_end(pending, search_from)
+        if end < 0:
+            if len(pending) < MAX_PENDING_EVENT_BYTES:
+                continue
+            end = len(pending)
+        out = bytes(pending[:end])
+        del pending[:end]
+        yield finish(out)
+
+    if pending:
+        # Stream ended mid-event; forward what there is
+        yield finish(bytes(pending))
@@ -0,0 +1,125 @@
+"""
+Micro-benchmark: resolving request paths to backend services
+
+Times, per request path:
+
+- legacy: the linear startswith scans main.py used before RouteTable
+  (get_service_url, then get_target_path -> get_route_prefix; proxy_request
+  ran get_target_path once more on the already-resolved path)
+- current: one RouteTable.resolve
+
+The path mix weights the hot LLM / agent / chat routes, which sit late in
+SERVICE_ROUTES, plus a few unmatched paths (a full scan in the legacy code).
+--routes adds synthetic /api/svcN routes to show how each approach scales
+with table size.
+
+Usage:
+    uv run python benchmarks/bench_routing.py
+    uv run python benchmarks/bench_routing.py --routes 200 --requests 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.routing import SERVICE_ROUTES, STRIP_PREFIX_SERVICES, RouteTable  # noqa: E402
+
+PATHS = [
+    ("/api/llm/trace/3f2a9c/v1/chat/completions", 30),
+    ("/api/agents/42", 10),
+    ("/api/agents/", 5),
+    ("/api/chat/sessions/abc/messages", 10),
+    ("/api/workbench/agents/42/stream", 5),
+    ("/api/hub/agents", 5),
+    ("/api/tracing/logs/3f2a9c", 10),
+    ("/api/admin/statistics/historical/daily", 3),
+    ("/api/admin/public/llm-models", 5),
+    ("/api/auth/me", 5),
+    ("/api/v1/users/platform-keys", 2),
+    ("/api/v1/a2a/agents/42/.well-known/agent-card.json", 5),
+    ("/api/unknown/thing", 3),
+    ("/favicon.ico", 2),
+]
+
+
+def legacy_router(routes, strip_prefixes):
+    def get_service_url(path):
+        for route_prefix, service_url in routes.items():
+            if path.startswith(route_prefix):
+                return service_url
+        return None
+
+    def get_route_prefix(path):
+        for route_prefix in routes.keys():
+            if path.startswith(route_prefix):
+                return route_prefix
+        return None
+
+    def get_target_path(path):
+        route_prefix = get_route_prefix(path)
+        if route_prefix and route_prefix in strip_prefixes:
+            target_path = path[len(route_prefix):]
+            if not target_path.startswith('/'):
+                target_path = '/' + target_path
+            return target_path
+        return path.replace('//', '/')
+
+    def resolve(path):
+        service_url = get_service_url(path)
+        if not service_url:
+            return None
+        target_path = get_target_path(path)
+        # proxy_request derived the target path again
+        return service_url, get_target_path(target_path)
+
+    return resolve
+
+
+def run(name, resolve, paths, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for path in paths:
+            resolve(path)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<8} {best / len(paths) * 1e9:7.1f}ns/request  total={best * 1000:7.2f}ms")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--routes", type=int, default=0, help="Extra synthetic routes appended to the table")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    routes = dict(SERVICE_ROUTES)
+    for i in range(args.routes):
+        routes[f"/api/svc{i}"] = f"http://svc{i}:8000"
+
+    rng = random.Random(args.seed)
+    population, weights = zip(*PATHS)
+    paths = rng.choices(population, weights=weights, k=args.requests)
+
+    legacy = legacy_router(routes, STRIP_PREFIX_SERVICES)
+    table = RouteTable(routes, STRIP_PREFIX_SERVICES)
+
+    def current(path):
+        route = table.resolve(path)
+        return (route.service_url, route.target_path) if route else None
+
+    for path in population:
+        assert legacy(path) == current(path), f"routing differs for {path}"
+
+    print(f"{len(routes)} routes, {len(table._lengths)} distinct prefix lengths, {len(paths)} requests")
+    legacy_time = run("legacy", legacy, paths, args.rounds)
+    current_time = run("current", current, paths, args.rounds)
+    print(f"speedup: {legacy_time / current_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Load test: gateway SSE relay under many concurrent token streams
+
+Runs --streams concurrent streams through the relay loop of proxy_request.
+Each upstream is an httpx.MockTransport emitting one OpenAI-style token
+event every --interval-ms. With --split, some events straddle network
+reads the way they do on a real connection. Each event carries its send
+time, so the client side measures event latency (upstream send -> relayed
+to the client).
+
+Modes:
+- baseline: client reads the upstream directly (generator + client cost)
+- legacy: the aiter_lines loop proxy_request used before relay_sse, with
+  the per-line DEBUG log that main.py's logging config emits
+- langchain: legacy plus the per-line asyncio.sleep(0) of the langchain path
+- current: relay_sse over aiter_bytes
+
+"relay cpu/1k tok" subtracts the baseline, leaving the gateway's own cost.
+
+Usage:
+    uv run python benchmarks/load_sse_relay.py
+    uv run python benchmarks/load_sse_relay.py --streams 500 --tokens 400 --interval-ms 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx  # noqa: E402
+
+from app.sse_relay import relay_sse  # noqa: E402
+
+UPSTREAM_URL = "http://agent.bench/stream"
+
+logger = logging.getLogger("bench.gateway")
+
+
+def make_client(tokens: int, interval: float, split: float, seed: int) -> httpx.AsyncClient:
+    async def events(rng):
+        for i in range(tokens):
+            event = json.dumps({
+                "t": time.perf_counter(),
+                "choices": [{"index": 0, "delta": {"content": f" tok{i}"}}]
+            }, separators=(",", ":"))
+            data = f"data: {event}\n\n".encode()
+            if rng.random() < split:
+                cut = rng.randint(1, len(data) - 1)
+                yield data[:cut]
+                await asyncio.sleep(0)
+                yield data[cut:]
+            else:
+                yield data
+            await asyncio.sleep(interval)
+        yield b"data: [DONE]\n\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        rng = random.Random(seed + int(request.headers["x-stream"]))
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=events(rng))
+
+    return httpx.AsyncClient(
+        transport=httpx.MockTransport(handler),
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=None),
+        timeout=None
+    )
+
+
+async def baseline(response: httpx.Response):
+    async for chunk in response.aiter_bytes():
+        yield chunk
+
+
+async def legacy(response: httpx.Response):
+    line_count = 0
+    async for line in response.aiter_lines():
+        line_count += 1
+        logger.debug(f"[API Gateway] Line #{line_count}: {line[:100]}")
+        yield f"{line}\n".encode()
+    logger.info(f"[API Gateway] Line-based streaming completed: {line_count} lines")
+
+
+async def langchain(response: httpx.Response):
+    line_count = 0
+    async for line in response.aiter_lines():
+        line_count += 1
+        logger.debug(f"[API Gateway] Langchain line #{line_count}: {line[:100]}")
+        yield f"{line}\n".encode()
+        await asyncio.sleep(0)
+    logger.info(f"[API Gateway] Langchain streaming completed: {line_count} lines")
+
+
+async def current(response: httpx.Response):
+    async for chunk in relay_sse(response.aiter_bytes()):
+        yield chunk
+
+
+MODES = {"baseline": baseline, "legacy": legacy, "langchain": langchain, "current": current}
+
+
+async def one_stream(client, relay, stream_id: int, latencies):
+    async with client.stream("GET", UPSTREAM_URL, headers={"x-stream": str(stream_id)}) as response:
+        async for chunk in relay(response):
+            # Latency of the newest event in this write (baseline can see half a timestamp)
+            pos = chunk.rfind(b'"t":')
+            end = chunk.find(b",", pos)
+            if pos >= 0 and end >= 0:
+                latencies.append(time.perf_counter() - float(chunk[pos + 4:end]))
+
+
+async def run(name: str, args) -> float:
+    latencies = []
+    async with make_client(args.tokens, args.interval_ms / 1000, args.split, args.seed) as client:
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one_stream(client, MODES[name], i, latencies) for i in range(args.streams)))
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+    total_tokens = args.streams * args.tokens
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<9} cpu/1k tok={cpu / total_tokens * 1e6:7.2f}ms  wall={wall:6.2f}s  "
+        f"latency p50={quantiles[49] * 1000:7.2f}ms p99={quantiles[98] * 1000:8.2f}ms "
+        f"max={max(latencies) * 1000:8.2f}ms"
+    )
+    return cpu / total_tokens * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=500)
+    parser.add_argument("--tokens", type=int, default=200, help="Token events per stream")
+    parser.add_argument("--interval-ms", type=float, default=20, help="Upstream delay between tokens")
+    parser.add_argument("--split", type=float, default=0.1, help="Fraction of events split across two reads")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--modes", default="baseline,legacy,langchain,current")
+    args = parser.parse_args()
+
+    # main.py configures logging at DEBUG; send it to /dev/null so the cost is formatting, not the terminal
+    logging.basicConfig(level=logging.DEBUG, handlers=[logging.FileHandler(os.devnull)])
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"{args.streams} concurrent streams x {args.tokens} tokens, one token per {args.interval_ms}ms")
+    results = {name: await run(name, args) for name in args.modes.split(",")}
+    if "baseline" in results:
+        for name, cpu in results.items():
+            if name != "baseline":
+                print(f"{name:<9} relay cpu/1k tok={cpu - results['baseline']:7.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
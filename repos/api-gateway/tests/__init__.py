@@ -0,0 +1 @@
+"""Tests for API Gateway"""
@@ -0,0 +1,148 @@
+"""
+Tests for the gateway edge cache: rules, freshness, ETag/304 and eviction
+"""
+import httpx
+import pytest
+from starlette.requests import Request
+
+from app import edge_cache as edge_cache_module
+from app.edge_cache import EdgeCache, _ENTRY_OVERHEAD, load_cache_routes
+
+HEADERS = [(b"content-type", b"application/json")]
+
+
+def make_request(path="/api/admin/public/llm-models", query="", **headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(edge_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_rules_match_opted_in_gets_only():
+    cache = EdgeCache(load_cache_routes(
+        '{"/api/hub/agents": {"ttl": 10}, "/api/v1/a2a/*/.well-known/agent-card.json": null}'
+    ))
+
+    assert cache.rule_for("GET", "/api/admin/public/llm-models/").scope == "public"
+    assert cache.rule_for("GET", "/api/hub/agents") == ("/api/hub/agents", "user", 10.0)
+    assert cache.rule_for("POST", "/api/hub/agents") is None
+    assert cache.rule_for("GET", "/api/hub/agents/7") is None
+    assert cache.rule_for("GET", "/api/v1/a2a/agent-1/.well-known/agent-card.json") is None
+    with pytest.raises(ValueError):
+        load_cache_routes('{"/api/x": {"scope": "shared"}}')
+
+
+def test_user_scope_keys_by_credentials():
+    cache = EdgeCache(load_cache_routes('{"/api/hub/agents": {"scope": "user", "ttl": 10}}'))
+    rule = cache.rule_for("GET", "/api/hub/agents")
+    alice = cache.key_for(rule, make_request("/api/hub/agents", authorization="Bearer alice"))
+    bob = cache.key_for(rule, make_request("/api/hub/agents", authorization="Bearer bob"))
+    assert alice != bob
+    assert alice == cache.key_for(rule, make_request("/api/hub/agents", authorization="Bearer alice"))
+
+    public_rule = cache.rule_for("GET", "/api/admin/public/llm-models")
+    assert cache.key_for(public_rule, make_request(authorization="Bearer alice")) == cache.key_for(
+        public_rule, make_request(authorization="Bearer bob")
+    )
+
+
+def test_ttl_follows_backend_cache_control():
+    cache = EdgeCache(load_cache_routes())
+    public = cache.rule_for("GET", "/api/admin/public/llm-models")
+    user = public._replace(scope="user")
+
+    def ttl(rule, status=200, **headers):
+        headers = httpx.Headers({name.replace("_", "-"): value for name, value in headers.items()})
+        return cache.ttl_for(rule, status, headers)
+
+    assert ttl(public) == 30
+    assert ttl(public, cache_control="public, s-maxage=5, max-age=60") == 5
+    assert ttl(user, cache_control="s-maxage=5, max-age=60") == 60
+    assert ttl(public, cache_control="no-store") is None
+    assert ttl(public, cache_control="private") is None
+    assert ttl(user, cache_control="private, max-age=3") == 3
+    assert ttl(public, cache_control="no-cache") is None
+    assert ttl(public, cache_control="no-cache", etag='"v1"') == 0
+    assert ttl(public, vary="Accept-Encoding") == 30
+    assert ttl(public, vary="Authorization") is None
+    assert ttl(public, set_cookie="session=1") is None
+    assert ttl(public, status=404) is None
+    assert cache.counters["uncacheable"] == 6
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = EdgeCache([])
+    entry = cache.store("k", 200, HEADERS, b"[]", ttl=30)
+    clock[0] += 29
+    assert cache.get("k").fresh()
+    clock[0] += 2
+    assert cache.get("k") is entry and not entry.fresh()
+    entry.refresh(30)
+    assert entry.fresh()
+
+
+def test_etag_and_not_modified(clock):
+    cache = EdgeCache([])
+    headers = HEADERS + [(b"content-length", b"2"), (b"cache-control", b"max-age=30")]
+    entry = cache.store("k", 200, headers, b"[]", 30)
+    assert entry.upstream_etag is None
+    assert entry.etag.startswith('W/"')
+
+    clock[0] += 3
+    hit = cache.respond(entry, make_request(), "HIT")
+    assert hit.status_code == 200
+    assert hit.body == b"[]"
+    assert hit.headers["etag"] == entry.etag
+    assert hit.headers["age"] == "3"
+    assert hit.headers["x-cache"] == "HIT"
+    assert hit.headers.getlist("content-length") == ["2"]
+
+    not_modified = cache.respond(entry, make_request(if_none_match=f'"other", {entry.etag[2:]}'), "HIT")
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["etag"] == entry.etag
+    assert not_modified.headers["cache-control"] == "max-age=30"
+    assert "content-type" not in not_modified.headers
+    assert cache.counters["hits"] == 2
+    assert cache.counters["not_modified"] == 1
+
+    # A backend ETag is kept as-is and used for revalidation
+    upstream = cache.store("k2", 200, HEADERS + [(b"ETag", b'"v1"')], b"{}", 30)
+    assert upstream.etag == upstream.upstream_etag == '"v1"'
+    assert cache.respond(upstream, make_request(if_none_match="*"), "REVALIDATED").status_code == 304
+
+
+def test_evicts_least_recently_used_within_byte_budget():
+    body = b"x" * 100
+    # Body, headers plus the generated weak ETag, and fixed overhead
+    header_bytes = sum(len(k) + len(v) for k, v in HEADERS) + len(b'etagW/"0123456789abcdef"')
+    entry_size = len(body) + header_bytes + _ENTRY_OVERHEAD
+    cache = EdgeCache([], max_bytes=entry_size * 2)
+
+    first = cache.store("a", 200, HEADERS, body, 30)
+    assert first.size == entry_size
+    cache.store("b", 200, HEADERS, body, 30)
+    cache.get("a")  # a is now more recently used than b
+    cache.store("c", 200, HEADERS, body, 30)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is first
+    assert cache.bytes == entry_size * 2
+    assert cache.counters["evictions"] == 1
+
+    # Replacing an entry doesn't double-count it; an oversized one is served but not kept
+    cache.store("a", 200, HEADERS, body, 30)
+    assert cache.bytes == entry_size * 2
+    huge = cache.store("d", 200, HEADERS, b"x" * entry_size * 2, 30)
+    assert huge.body and cache.get("d") is None
+    assert cache.stats()["entries"] == 2
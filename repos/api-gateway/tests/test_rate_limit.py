@@ -0,0 +1,122 @@
+"""
+Tests for the gateway rate limiter: GCRA in Redis, local leases and key confirmation
+"""
+import fakeredis
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+
+from app.middleware import RateLimitMiddleware
+from app.rate_limit import _GCRA_SCRIPT, GatewayRateLimiter
+
+PLATFORM_KEY = "Bearer a2g_test_key"
+LLM_PATH = "/api/llm/trace/trace-1/v1/chat/completions"
+
+
+def make_limiter(limits, lease_max=1):
+    limiter = GatewayRateLimiter(limits=limits, lease_max=lease_max, lease_ttl=60)
+    limiter.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    limiter._script = limiter.redis_client.register_script(_GCRA_SCRIPT)
+    return limiter
+
+
+class TestGatewayRateLimiter:
+
+    async def test_burst_then_rejected_with_retry_after(self):
+        limiter = make_limiter({"ip": 3})
+        decisions = [await limiter.admit("ip", "10.0.0.1") for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+        assert 19 <= decisions[3].retry_after <= 20
+        assert decisions[3].headers()["Retry-After"] == "20"
+        assert decisions[0].headers()["RateLimit-Policy"] == "3;w=60"
+        # Identities have separate budgets
+        assert (await limiter.admit("ip", "10.0.0.2")).allowed
+        assert limiter.counters["limited"] == 1
+
+    async def test_leases_double_while_spent_before_expiry(self):
+        limiter = make_limiter({"key": 600}, lease_max=4)
+        decisions = [await limiter.admit("key", "k1") for _ in range(7)]
+
+        assert all(d.allowed for d in decisions)
+        # Leases of 1, 2 and 4 requests: three Redis round trips
+        assert (limiter.counters["redis"], limiter.counters["local"]) == (3, 4)
+        assert decisions[-1].remaining == 600 - 7
+
+    async def test_near_the_limit_every_request_goes_to_redis(self):
+        limiter = make_limiter({"key": 4}, lease_max=16)
+        decisions = [await limiter.admit("key", "k1") for _ in range(5)]
+
+        assert [d.allowed for d in decisions] == [True] * 4 + [False]
+        assert limiter.counters["local"] == 0
+
+    async def test_fails_open_without_redis(self):
+        limiter = make_limiter({"ip": 1})
+
+        async def unavailable(**kwargs):
+            raise ConnectionError("redis down")
+
+        limiter._script = unavailable
+        assert await limiter.admit("ip", "10.0.0.1") is None
+        assert limiter.counters["errors"] == 1
+        # Disabled identity types aren't limited at all
+        assert await make_limiter({"ip": 0}).admit("ip", "10.0.0.1") is None
+
+    def test_platform_key_charged_to_ip_until_confirmed(self):
+        limiter = make_limiter({"ip": 1})
+        kind, identity, key_hash = limiter.identify(PLATFORM_KEY, "10.0.0.1")
+        assert (kind, identity) == ("ip", "10.0.0.1")
+
+        limiter.confirm_key(key_hash, "/api/agents", 200)
+        limiter.confirm_key(key_hash, LLM_PATH, 401)
+        assert limiter.identify(PLATFORM_KEY, "10.0.0.1")[0] == "ip"
+
+        limiter.confirm_key(key_hash, LLM_PATH, 200)
+        assert limiter.identify(PLATFORM_KEY, "10.0.0.1") == ("key", key_hash, None)
+        assert limiter.identify("Bearer not-a-jwt", "10.0.0.1") == ("ip", "10.0.0.1", None)
+
+
+@pytest.fixture
+def gateway():
+    limiter = make_limiter({"key": 100, "user": 100, "ip": 2})
+
+    async def backend(scope, receive, send):
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    app = RateLimitMiddleware(backend, limiter)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway")
+    return client, limiter
+
+
+class TestRateLimitMiddleware:
+
+    async def test_headers_and_429(self, gateway):
+        client, _ = gateway
+        async with client:
+            first = await client.get("/api/agents")
+            await client.get("/api/agents")
+            limited = await client.get("/api/agents")
+            health = await client.get("/health")
+
+        assert first.status_code == 200
+        assert first.headers["RateLimit-Limit"] == "2"
+        assert first.headers["RateLimit-Remaining"] == "1"
+        assert limited.status_code == 429
+        assert int(limited.headers["Retry-After"]) >= 1
+        assert limited.json()["detail"] == "Rate limit exceeded"
+        assert health.status_code == 200
+
+    async def test_key_confirmed_only_by_platform_key_route(self, gateway):
+        client, limiter = gateway
+        headers = {"Authorization": PLATFORM_KEY}
+        async with client:
+            await client.get("/api/agents", headers=headers)
+            assert limiter.identify(PLATFORM_KEY, "127.0.0.1")[0] == "ip"
+
+            await client.post(LLM_PATH, headers=headers)
+            assert limiter.identify(PLATFORM_KEY, "127.0.0.1")[0] == "key"
+            # The IP budget is spent, but the key now has its own
+            response = await client.post(LLM_PATH, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["RateLimit-Limit"] == "100"
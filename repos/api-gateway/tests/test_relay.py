@@ -0,0 +1,62 @@
+"""
+Tests for forwarding upstream responses: header filtering and body streaming
+"""
+import httpx
+
+from app.main import end_to_end_headers, relay_response
+
+
+class TestEndToEndHeaders:
+
+    def test_drops_hop_by_hop_and_connection_named_headers(self):
+        raw = [
+            (b"Content-Type", b"application/json"),
+            (b"Connection", b"keep-alive, X-Upstream-Debug"),
+            (b"Keep-Alive", b"timeout=5"),
+            (b"Transfer-Encoding", b"chunked"),
+            (b"x-upstream-debug", b"1"),
+            (b"Content-Length", b"42"),
+        ]
+        assert end_to_end_headers(raw) == [(b"Content-Type", b"application/json"), (b"Content-Length", b"42")]
+        assert end_to_end_headers(raw, drop={"content-length"}) == [(b"Content-Type", b"application/json")]
+
+    def test_repeated_headers_stay_separate(self):
+        raw = [(b"set-cookie", b"a=1; Path=/"), (b"set-cookie", b"b=2, c=3"), (b"upgrade", b"h2c")]
+        assert end_to_end_headers(raw) == raw[:2]
+
+
+async def test_relay_response_streams_raw_bytes_and_closes_upstream():
+    body = [b'{"items": [', b"1, 2", b"]}"]
+    closed = False
+
+    class Upstream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for chunk in body:
+                yield chunk
+
+        async def aclose(self):
+            nonlocal closed
+            closed = True
+
+    upstream = httpx.Response(
+        200,
+        headers=[(b"content-type", b"application/json"), (b"content-encoding", b"identity"),
+                 (b"transfer-encoding", b"chunked")],
+        stream=Upstream()
+    )
+    relayed = relay_response(upstream)
+
+    assert relayed.status_code == 200
+    assert relayed.raw_headers == [(b"content-type", b"application/json"), (b"content-encoding", b"identity")]
+    assert [chunk async for chunk in relayed.body_iterator] == body
+    assert closed
+
+
+async def test_relay_response_continues_a_started_body():
+    upstream = httpx.Response(200, content=b"unused")
+
+    async def rest():
+        yield b"lo"
+
+    relayed = relay_response(upstream, rest(), prefix=b"hel")
+    assert b"".join([chunk async for chunk in relayed.body_iterator]) == b"hello"
@@ -0,0 +1,91 @@
+"""
+Tests for the longest-prefix route table and its hot reload
+"""
+import json
+import os
+
+from app.routing import SERVICE_ROUTES, RouteMatch, RouteTable, RouteTableReloader
+
+ROUTES = {
+    "/api/admin": "http://admin:8005",
+    "/api/admin/users": "http://users:8001",
+    "/api/llm": "http://llm:8006",
+}
+
+
+def write_routes(path, config, mtime):
+    path.write_text(config if isinstance(config, str) else json.dumps(config))
+    os.utime(path, (mtime, mtime))
+
+
+class TestRouteTable:
+
+    def test_longest_prefix_wins(self):
+        table = RouteTable(ROUTES)
+        assert table.resolve("/api/admin/users/7").service_url == "http://users:8001"
+        assert table.resolve("/api/admin/llm-models").service_url == "http://admin:8005"
+        # String prefix, not path segment
+        assert table.resolve("/api/administrators").prefix == "/api/admin"
+        assert table.resolve("/api/agents") is None
+        assert table.resolve("/api") is None
+
+    def test_strip_prefix(self):
+        table = RouteTable(ROUTES, {"/api/llm"})
+        assert table.resolve("/api/llm/trace/t1/v1/chat/completions") == RouteMatch(
+            "/api/llm", "http://llm:8006", "/trace/t1/v1/chat/completions"
+        )
+        assert table.resolve("/api/llm").target_path == "/"
+        assert table.resolve("/api/admin//users").target_path == "/api/admin/users"
+
+    def test_built_in_routes(self):
+        table = RouteTable(SERVICE_ROUTES)
+        assert table.resolve("/api/admin/statistics/historical/daily").service_url == SERVICE_ROUTES[
+            "/api/admin/statistics/historical"
+        ]
+        assert table.resolve("/api/admin/statistics/top").service_url == SERVICE_ROUTES["/api/admin/statistics"]
+
+
+class TestRouteTableReloader:
+
+    def test_reload_merges_file_over_built_in_routes(self, tmp_path):
+        routes_file = tmp_path / "routes.json"
+        write_routes(routes_file, {
+            "routes": {"/api/reports": "http://reports:8020/", "/api/hub": None},
+            "strip_prefix": ["/api/reports"]
+        }, 1000)
+        reloader = RouteTableReloader(str(routes_file))
+
+        assert reloader.reload() is True
+        assert reloader.resolve("/api/reports/daily") == RouteMatch("/api/reports", "http://reports:8020", "/daily")
+        assert reloader.resolve("/api/hub/agents") is None
+        # strip_prefix replaced the default list
+        assert reloader.resolve("/api/llm/v1/models").target_path == "/api/llm/v1/models"
+        # Unchanged mtime: not re-read
+        assert reloader.reload() is False
+        assert reloader.reloads == 1
+
+    def test_invalid_file_keeps_current_routes(self, tmp_path):
+        routes_file = tmp_path / "routes.json"
+        write_routes(routes_file, {"routes": {"/api/reports": "http://reports:8020"}}, 1000)
+        reloader = RouteTableReloader(str(routes_file))
+        assert reloader.reload() is True
+        table = reloader.table
+
+        for mtime, config in enumerate([
+            "{not json",
+            [],
+            {"routes": {"api/reports": "http://reports:8020"}},
+            {"routes": {"/api/reports": "reports:8020"}},
+        ], start=2000):
+            write_routes(routes_file, config, mtime)
+            assert reloader.reload() is False
+            assert reloader.table is table
+
+        # A missing file keeps the routes too, and is picked up again when it returns
+        routes_file.unlink()
+        assert reloader.reload() is False
+        assert reloader.table is table
+        write_routes(routes_file, {"routes": {"/api/audit": "http://audit:8030"}}, 3000)
+        assert reloader.reload() is True
+        assert reloader.resolve("/api/audit/log").service_url == "http://audit:8030"
+        assert reloader.reloads == 2
@@ -0,0 +1,47 @@
+"""
+Tests for the byte-level SSE relay
+"""
+from app import sse_relay
+from app.sse_relay import SSERelayStats, relay_sse
+
+
+async def relay(chunks, **kwargs):
+    async def upstream():
+        for chunk in chunks:
+            yield chunk
+
+    return [out async for out in relay_sse(upstream(), **kwargs)]
+
+
+async def test_whole_events_pass_through_untouched():
+    chunks = [b"data: a\n\n", b"data: b\n\ndata: c\n\n", b"", b"data: d\r\n\r\n"]
+    stats = SSERelayStats()
+    assert await relay(chunks, stats=stats) == [b"data: a\n\n", b"data: b\n\ndata: c\n\n", b"data: d\r\n\r\n"]
+    assert (stats.writes, stats.bytes_out) == (3, sum(map(len, chunks)))
+
+
+async def test_events_split_across_reads_are_held_until_complete():
+    assert await relay([b"data: he", b"llo\n", b"\ndata: wor", b"ld\n\nda", b"ta: !\n\n"]) == [
+        b"data: hello\n\n", b"data: world\n\n", b"data: !\n\n"
+    ]
+    # Boundary split between reads, CRLF line endings
+    assert await relay([b"data: x\r\n\r", b"\ndata: y\r\n", b"\r\n"]) == [b"data: x\r\n\r\n", b"data: y\r\n\r\n"]
+
+
+async def test_partial_event_is_flushed_at_end_of_stream_or_size_cap(monkeypatch):
+    assert await relay([b"data: a\n\ndata: trunc"]) == [b"data: a\n\n", b"data: trunc"]
+
+    monkeypatch.setattr(sse_relay, "MAX_PENDING_EVENT_BYTES", 8)
+    assert await relay([b"data: ", b"long payload", b"\n\n"]) == [b"data: long payload", b"\n\n"]
+
+
+async def test_transform_sees_each_complete_event():
+    seen = []
+
+    def transform(event):
+        seen.append(event)
+        return event.upper()
+
+    out = await relay([b"data: a\n\ndata: b", b"\r\n\r\ndata: c\n\n"], transform=transform)
+    assert seen == [b"data: a\n\n", b"data: b\r\n\r\n", b"data: c\n\n"]
+    assert out == [b"DATA: A\n\n", b"DATA: B\r\n\r\nDATA: C\n\n"]
@@ -3,10 +3,14 @@ Redis client for session management
 """
 import redis.asyncio as redis
 from app.core.config import settings
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Subscribed by llm-proxy-service to drop the session from its lookup cache
+CHAT_SESSIONS_DELETED_CHANNEL = "chat_sessions:deleted"
+
 class RedisClient:
     """Redis client for storing session → trace_id mappings"""
 
@@ -45,10 +49,15 @@ class RedisClient:
         return trace_id
 
     async def delete_session_trace(self, session_id: str):
-        """Delete session mapping"""
+        """Delete session mapping and notify services caching it"""
         key = f"session:trace:{session_id}"
         await self.redis_client.delete(key)
         logger.info(f"Deleted session mapping: {session_id}")
+        try:
+            await self.redis_client.publish(CHAT_SESSIONS_DELETED_CHANNEL, json.dumps({"session_id": session_id}))
+        except Exception as e:
+            # Subscribers fall back to their cache TTL
+            logger.error(f"Failed to publish session deletion ({session_id}): {e}")
 
 # Global Redis client instance
 redis_client = RedisClient()
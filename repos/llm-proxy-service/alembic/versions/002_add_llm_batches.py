@@ -0,0 +1,69 @@
+"""Add llm_batches and llm_batch_results tables
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create tables for /v1/batches jobs"""
+
+    op.create_table('llm_batches',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('agent_id', sa.String(), nullable=False),
+        sa.Column('trace_id', sa.String(), nullable=True),
+        sa.Column('endpoint', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('input_requests', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+        sa.Column('total_requests', sa.Integer(), nullable=False),
+        sa.Column('batch_metadata', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('errors', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('in_progress_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_llm_batches_user_id'), 'llm_batches', ['user_id'], unique=False)
+    op.create_index(op.f('ix_llm_batches_agent_id'), 'llm_batches', ['agent_id'], unique=False)
+    op.create_index(op.f('ix_llm_batches_trace_id'), 'llm_batches', ['trace_id'], unique=False)
+    op.create_index(op.f('ix_llm_batches_status'), 'llm_batches', ['status'], unique=False)
+
+    op.create_table('llm_batch_results',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('batch_id', sa.String(), nullable=False),
+        sa.Column('custom_id', sa.String(), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('response_body', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('error', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_llm_batch_results_batch_id'), 'llm_batch_results', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop /v1/batches tables"""
+
+    op.drop_index(op.f('ix_llm_batch_results_batch_id'), table_name='llm_batch_results')
+    op.drop_table('llm_batch_results')
+
+    op.drop_index(op.f('ix_llm_batches_status'), table_name='llm_batches')
+    op.drop_index(op.f('ix_llm_batches_trace_id'), table_name='llm_batches')
+    op.drop_index(op.f('ix_llm_batches_agent_id'), table_name='llm_batches')
+    op.drop_index(op.f('ix_llm_batches_user_id'), table_name='llm_batches')
+    op.drop_table('llm_batches')
@@ -0,0 +1,38 @@
+"""Add trace_id and tool_call_id columns to tool_calls table
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add trace_id and tool_call_id columns to tool_calls table"""
+
+    op.add_column('tool_calls', sa.Column('trace_id', sa.String(), nullable=True))
+    op.add_column('tool_calls', sa.Column('tool_call_id', sa.String(), nullable=True))
+
+    op.create_index(op.f('ix_tool_calls_trace_id'), 'tool_calls', ['trace_id'], unique=False)
+    op.create_index(op.f('ix_tool_calls_tool_call_id'), 'tool_calls', ['tool_call_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Remove trace_id and tool_call_id columns from tool_calls table"""
+
+    op.drop_index(op.f('ix_tool_calls_tool_call_id'), table_name='tool_calls')
+    op.drop_index(op.f('ix_tool_calls_trace_id'), table_name='tool_calls')
+
+    op.drop_column('tool_calls', 'tool_call_id')
+    op.drop_column('tool_calls', 'trace_id')
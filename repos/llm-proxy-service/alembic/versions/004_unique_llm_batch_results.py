@@ -0,0 +1,41 @@
+"""Make llm_batch_results unique per (batch_id, custom_id)
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Drop duplicate results left by concurrent retries, then add the unique index"""
+
+    op.execute("""
+        DELETE FROM llm_batch_results a
+        USING llm_batch_results b
+        WHERE a.batch_id = b.batch_id
+          AND a.custom_id = b.custom_id
+          AND (a.completed_at, a.id) > (b.completed_at, b.id)
+    """)
+    op.create_index(
+        'uq_llm_batch_results_batch_id_custom_id',
+        'llm_batch_results',
+        ['batch_id', 'custom_id'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Remove the unique index"""
+
+    op.drop_index('uq_llm_batch_results_batch_id_custom_id', table_name='llm_batch_results')
@@ -0,0 +1,409 @@
+"""
+OpenAI Compatible Batch API
+
+URL Pattern: /trace/{trace_id}/v1/batches
+
+A batch is a JSONL file of chat completion requests in the OpenAI batch
+input format, posted as the request body:
+
+    {"custom_id": "row-1", "method": "POST", "url": "/v1/chat/completions", "body": {"model": "...", "messages": [...]}}
+
+The file is validated and stored, then worker-service runs it in the
+background with bounded concurrency, sending each request back through the
+internal batch endpoints (see app/api/internal.py). Every request goes
+through the normal completion path, so it gets its own LLMCall row and
+trace events attributed to the batch's agent and trace_id.
+
+Results are downloaded from /batches/{batch_id}/output as JSONL in the
+OpenAI batch output format.
+"""
+from fastapi import APIRouter, HTTPException, Header, Path, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import json
+import logging
+import os
+
+from ..core import metrics
+from ..core.concurrency import EndpointBusy
+from ..core.context_guard import ContextWindowExceeded, guard_context_window
+from ..core.database import LLMBatch, LLMBatchResult, async_session_maker
+from ..core.http_client import get_upstream_client
+from ..core.rate_limit import RateLimitExceeded, rate_limiter
+from .openai_compatible import ChatCompletionRequest, get_provider_config, route_completion, validate_platform_key
+from .trace_openai import resolve_trace_agent
+
+logger = logging.getLogger(__name__)
+
+batches_router = APIRouter()
+
+WORKER_SERVICE_URL = os.getenv("WORKER_SERVICE_URL", "http://worker-api:8010")
+LLM_BATCH_MAX_REQUESTS = int(os.getenv("LLM_BATCH_MAX_REQUESTS", "10000"))
+
+BATCH_ENDPOINTS = ("/v1/chat/completions", "/chat/completions")
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[int]:
+    return int(value.timestamp()) if value else None
+
+
+def parse_batch_file(content: bytes) -> List[Dict[str, Any]]:
+    """
+    Validate a JSONL batch input file
+
+    Returns [{"custom_id": ..., "body": {...}}, ...]; raises HTTPException(400)
+    naming the first invalid line.
+    """
+    requests: List[Dict[str, Any]] = []
+    seen = set()
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            custom_id = item["custom_id"]
+            if not isinstance(custom_id, str) or not custom_id:
+                raise ValueError("custom_id must be a non-empty string")
+            if custom_id in seen:
+                raise ValueError(f"duplicate custom_id {custom_id!r}")
+            if item.get("method", "POST") != "POST":
+                raise ValueError("method must be POST")
+            if item.get("url", "/v1/chat/completions") not in BATCH_ENDPOINTS:
+                raise ValueError("url must be /v1/chat/completions")
+            body = item["body"]
+            if body.get("stream"):
+                raise ValueError("streaming is not supported in batches")
+            ChatCompletionRequest(**body)
+        except (ValueError, KeyError, TypeError, AttributeError, ValidationError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid batch input on line {line_number}: {e}")
+        seen.add(custom_id)
+        requests.append({"custom_id": custom_id, "body": body})
+
+    if not requests:
+        raise HTTPException(status_code=400, detail="Batch input file is empty")
+    if len(requests) > LLM_BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"Batch has {len(requests)} requests, the limit is {LLM_BATCH_MAX_REQUESTS}")
+    return requests
+
+
+async def _request_counts(session, batch: LLMBatch) -> Dict[str, int]:
+    result = await session.execute(
+        select(LLMBatchResult.status_code, func.count())
+        .where(LLMBatchResult.batch_id == batch.id)
+        .group_by(LLMBatchResult.status_code)
+    )
+    counts = {"total": batch.total_requests, "completed": 0, "failed": 0}
+    for status_code, count in result.all():
+        counts["completed" if status_code == 200 else "failed"] += count
+    return counts
+
+
+async def batch_object(session, batch: LLMBatch) -> Dict[str, Any]:
+    """OpenAI batch object for an LLMBatch"""
+    return {
+        "id": batch.id,
+        "object": "batch",
+        "endpoint": batch.endpoint,
+        "errors": {"object": "list", "data": batch.errors} if batch.errors else None,
+        "input_file_id": None,
+        "completion_window": "24h",
+        "status": batch.status,
+        "output_file_id": None,
+        "created_at": _timestamp(batch.created_at),
+        "in_progress_at": _timestamp(batch.in_progress_at),
+        "completed_at": _timestamp(batch.completed_at) if batch.status == "completed" else None,
+        "failed_at": _timestamp(batch.completed_at) if batch.status == "failed" else None,
+        "cancelled_at": _timestamp(batch.completed_at) if batch.status == "cancelled" else None,
+        "request_counts": await _request_counts(session, batch),
+        "metadata": batch.batch_metadata
+    }
+
+
+async def _get_user_batch(session, batch_id: str, authorization: Optional[str]) -> LLMBatch:
+    user_info = await validate_platform_key(authorization)
+    if not user_info:
+        raise HTTPException(status_code=401, detail="Invalid or missing Platform API key")
+    batch = await session.get(LLMBatch, batch_id)
+    if batch is None or batch.user_id != user_info.get("user_id"):
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    return batch
+
+
+async def enqueue_batch(batch_id: str):
+    """Ask worker-service to run the batch; raises on failure"""
+    client = get_upstream_client(WORKER_SERVICE_URL)
+    response = await client.post(f"{WORKER_SERVICE_URL}/api/internal/llm-batches/{batch_id}/run")
+    response.raise_for_status()
+
+
+@batches_router.post("/batches")
+async def create_traced_batch(
+    http_request: Request,
+    trace_id: str = Path(..., description="Trace ID for this agent"),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Create a batch from a JSONL file of chat completion requests (sent as the request body)
+
+    Example:
+        curl -X POST http://localhost:9050/api/llm/trace/{trace_id}/v1/batches \\
+          -H "Authorization: Bearer a2g_..." \\
+          -H "Content-Type: application/jsonl" \\
+          --data-binary @requests.jsonl
+    """
+    user_info = await validate_platform_key(authorization)
+    if not user_info:
+        raise HTTPException(status_code=401, detail="Invalid or missing Platform API key")
+
+    requests = parse_batch_file(await http_request.body())
+    agent_id, resolved_trace_id = await resolve_trace_agent(trace_id)
+
+    async with async_session_maker() as session:
+        batch = LLMBatch(
+            user_id=user_info.get("user_id"),
+            agent_id=agent_id,
+            trace_id=resolved_trace_id,
+            status="validating",
+            input_requests=requests,
+            total_requests=len(requests),
+            batch_metadata={"key_id": user_info.get("key_id")}
+        )
+        session.add(batch)
+        await session.commit()
+        logger.info(f"[Batches] Created {batch.id} with {len(requests)} requests for agent_id={agent_id}, trace_id={resolved_trace_id}")
+
+        try:
+            await enqueue_batch(batch.id)
+        except Exception as e:
+            logger.error(f"[Batches] Failed to hand {batch.id} to worker-service: {e}")
+            batch.status = "failed"
+            batch.errors = [{"code": "worker_unavailable", "message": str(e)}]
+            batch.completed_at = datetime.utcnow()
+            await session.commit()
+
+        return await batch_object(session, batch)
+
+
+@batches_router.get("/batches/{batch_id}")
+async def get_traced_batch(
+    trace_id: str = Path(..., description="Trace ID for this agent"),
+    batch_id: str = Path(...),
+    authorization: Optional[str] = Header(None)
+):
+    """Batch status and request counts"""
+    async with async_session_maker() as session:
+        batch = await _get_user_batch(session, batch_id, authorization)
+        return await batch_object(session, batch)
+
+
+@batches_router.post("/batches/{batch_id}/cancel")
+async def cancel_traced_batch(
+    trace_id: str = Path(..., description="Trace ID for this agent"),
+    batch_id: str = Path(...),
+    authorization: Optional[str] = Header(None)
+):
+    """Stop a batch; requests already running finish, the rest are not sent"""
+    async with async_session_maker() as session:
+        batch = await _get_user_batch(session, batch_id, authorization)
+        if batch.status not in FINAL_STATUSES:
+            batch.status = "cancelling"
+            await session.commit()
+        return await batch_object(session, batch)
+
+
+@batches_router.get("/batches/{batch_id}/output")
+async def get_traced_batch_output(
+    trace_id: str = Path(..., description="Trace ID for this agent"),
+    batch_id: str = Path(...),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Results so far as JSONL in the OpenAI batch output format
+
+    Rows are streamed from the database in chunks, so large batches are never
+    held in memory at once.
+    """
+    async with async_session_maker() as session:
+        await _get_user_batch(session, batch_id, authorization)
+
+    async def rows():
+        async with async_session_maker() as session:
+            result = await session.stream_scalars(
+                select(LLMBatchResult)
+                .where(LLMBatchResult.batch_id == batch_id)
+                .order_by(LLMBatchResult.completed_at)
+                .execution_options(yield_per=500)
+            )
+            async for row in result:
+                yield json.dumps({
+                    "id": row.id,
+                    "custom_id": row.custom_id,
+                    "response": {
+                        "status_code": row.status_code,
+                        "request_id": row.id,
+                        "body": row.response_body
+                    } if row.response_body is not None else None,
+                    "error": row.error
+                }) + "\n"
+
+    return StreamingResponse(rows(), media_type="application/jsonl")
+
+
+# ===== Execution (called by worker-service through the internal API) =====
+
+async def start_batch(batch_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """Mark a batch in progress; returns (status, requests that have no result yet)"""
+    async with async_session_maker() as session:
+        batch = await session.get(LLMBatch, batch_id)
+        if batch is None:
+            raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+        if batch.status in FINAL_STATUSES or batch.status == "cancelling":
+            return batch.status, []
+        if batch.status == "validating":
+            batch.status = "in_progress"
+            batch.in_progress_at = datetime.utcnow()
+            await session.commit()
+
+        done = await session.execute(select(LLMBatchResult.custom_id).where(LLMBatchResult.batch_id == batch_id))
+        done_ids = set(done.scalars().all())
+        return batch.status, [item for item in batch.input_requests if item["custom_id"] not in done_ids]
+
+
+async def execute_batch_request(
+    batch_id: str,
+    custom_id: str,
+    body: Dict[str, Any],
+    final_attempt: bool = False
+) -> Dict[str, Any]:
+    """
+    Run one request of a batch through the completion path and store its result
+
+    Raises HTTPException(409) once the batch is cancelled, and
+    HTTPException(429) when the batch's rate limit or the upstream endpoint
+    is at capacity. Upstream 5xx errors raise HTTPException(503) unless this
+    is the worker's final attempt. Nothing is stored in those cases; the
+    worker retries later. A retry that races an earlier attempt returns the
+    stored result (llm_batch_results is unique per custom_id).
+    """
+    async with async_session_maker() as session:
+        batch = await session.get(LLMBatch, batch_id)
+        if batch is None:
+            raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+        if batch.status in ("cancelling", "cancelled"):
+            raise HTTPException(status_code=409, detail=f"Batch {batch_id} is {batch.status}")
+        stored = await _stored_status(session, batch_id, custom_id)
+        if stored is not None:
+            # Retried after the result was stored
+            return {"custom_id": custom_id, "status_code": stored}
+        agent_id, trace_id, user_id = batch.agent_id, batch.trace_id, batch.user_id
+        key_id = (batch.batch_metadata or {}).get("key_id")
+
+    request_metrics = metrics.track_request("batch")
+    response_body = None
+    error = None
+    rate_limit = None
+    try:
+        request = ChatCompletionRequest(**{**body, "stream": False})
+        config = await get_provider_config(request.model)
+        admin_model_name = config.get("admin_model_name", request.model)
+        request_metrics.provider = config["provider"]
+        request_metrics.model = admin_model_name
+        context = guard_context_window(request, config.get("context_window"), config.get("context_overflow"))
+        # Batch requests spend the same key/user/agent/model budgets as interactive ones
+        rate_limit = await rate_limiter.admit(
+            request,
+            key_id=key_id,
+            user_id=user_id,
+            agent=trace_id or agent_id,
+            model=admin_model_name,
+            prompt_tokens=context.prompt_tokens
+        )
+        response_body = await route_completion(config, request, agent_id, trace_id, user_id)
+        status_code = 200
+    except RateLimitExceeded as e:
+        metrics.record_error("rate_limited")
+        raise HTTPException(status_code=429, detail=str(e), headers=e.headers)
+    except EndpointBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ContextWindowExceeded as e:
+        metrics.record_error("context_length_exceeded")
+        status_code, error = 400, e.to_openai_error()["error"]
+    except ValidationError as e:
+        status_code, error = 400, {"code": "invalid_request", "message": str(e)}
+    except HTTPException as e:
+        metrics.record_error("upstream_status")
+        if e.status_code >= 500 and not final_attempt:
+            logger.warning(f"[Batches] {batch_id}/{custom_id} upstream {e.status_code}, worker will retry")
+            raise HTTPException(status_code=503, detail=str(e.detail))
+        status_code, error = e.status_code, {"code": "upstream_error", "message": str(e.detail)}
+    except Exception as e:
+        logger.error(f"[Batches] {batch_id}/{custom_id} failed: {e}", exc_info=True)
+        metrics.record_error("proxy_error")
+        status_code, error = 500, {"code": "server_error", "message": str(e)}
+    finally:
+        rate_limiter.release(rate_limit)
+
+    async with async_session_maker() as session:
+        session.add(LLMBatchResult(
+            batch_id=batch_id,
+            custom_id=custom_id,
+            status_code=status_code,
+            response_body=response_body,
+            error=error
+        ))
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Another attempt stored its result first; that one stands
+            await session.rollback()
+            status_code = await _stored_status(session, batch_id, custom_id)
+            logger.info(f"[Batches] {batch_id}/{custom_id} already has a result, keeping it")
+    return {"custom_id": custom_id, "status_code": status_code}
+
+
+async def _stored_status(session, batch_id: str, custom_id: str) -> Optional[int]:
+    result = await session.execute(
+        select(LLMBatchResult.status_code)
+        .where(LLMBatchResult.batch_id == batch_id, LLMBatchResult.custom_id == custom_id)
+    )
+    return result.scalars().first()
+
+
+async def finalize_batch(batch_id: str) -> str:
+    """
+    Close a batch after the worker is done with it
+
+    Requests the worker gave up on are recorded as failed. Returns the final status.
+    """
+    async with async_session_maker() as session:
+        batch = await session.get(LLMBatch, batch_id)
+        if batch is None:
+            raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+        if batch.status in FINAL_STATUSES:
+            return batch.status
+
+        cancelled = batch.status == "cancelling"
+        done = await session.execute(select(LLMBatchResult.custom_id).where(LLMBatchResult.batch_id == batch_id))
+        done_ids = set(done.scalars().all())
+        for item in batch.input_requests:
+            if item["custom_id"] not in done_ids:
+                session.add(LLMBatchResult(
+                    batch_id=batch_id,
+                    custom_id=item["custom_id"],
+                    status_code=499 if cancelled else 503,
+                    error={
+                        "code": "batch_cancelled" if cancelled else "batch_request_not_executed",
+                        "message": "Batch was cancelled" if cancelled else "Request could not be executed"
+                    }
+                ))
+
+        batch.status = "cancelled" if cancelled else "completed"
+        batch.completed_at = datetime.utcnow()
+        await session.commit()
+        logger.info(f"[Batches] {batch_id} {batch.status}")
+        return batch.status
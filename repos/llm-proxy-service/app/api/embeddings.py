@@ -0,0 +1,261 @@
+"""
+OpenAI Compatible Embeddings API
+
+URL Pattern: /trace/{trace_id}/v1/embeddings
+
+Concurrent small requests for the same model are merged into one upstream
+/embeddings call by the embedding batcher. Every caller still gets its own
+LLMCall row (attributed to its agent and trace_id) with its share of the
+upstream token usage.
+"""
+from fastapi import APIRouter, HTTPException, Header, Path, Response
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional, Union
+from datetime import datetime
+import logging
+import time
+
+from ..core import metrics
+from ..core.concurrency import EndpointBusy, concurrency_limiter
+from ..core.embedding_batcher import embedding_batcher
+from ..core.endpoint_pool import endpoint_pool
+from ..core.http_client import get_upstream_client
+from ..core.llm_call_writer import llm_call_writer
+from ..core.rate_limit import RateLimitExceeded, rate_limiter
+from ..core.token_estimator import count_text_tokens
+from .openai_compatible import (
+    completion_error_type,
+    emit_trace_event,
+    get_provider_config,
+    validate_platform_key
+)
+from .trace_openai import resolve_trace_agent
+
+logger = logging.getLogger(__name__)
+
+embeddings_router = APIRouter()
+
+OPENAI_COMPATIBLE_PROVIDERS = ("openai", "openai-compatible", "openai_compatible")
+
+
+class EmbeddingRequest(BaseModel):
+    """OpenAI compatible embeddings request"""
+    model: str
+    # A string, a list of strings, a token array or a list of token arrays
+    input: Union[str, List[str], List[int], List[List[int]]]
+    encoding_format: Optional[Literal["float", "base64"]] = None
+    dimensions: Optional[int] = Field(default=None, ge=1)
+    user: Optional[str] = None
+
+    def input_list(self) -> List[Any]:
+        """Inputs as a list with one entry per embedding"""
+        if isinstance(self.input, str):
+            return [self.input]
+        if self.input and isinstance(self.input[0], int):
+            return [self.input]
+        return list(self.input)
+
+
+def estimate_input_tokens(inputs: List[Any], model: str) -> int:
+    """Token estimate for the rate-limit reservation; token arrays count exactly"""
+    return sum(count_text_tokens(item, model) if isinstance(item, str) else len(item) for item in inputs)
+
+
+async def send_embeddings(
+    config: Dict[str, Any],
+    model: str,
+    request: EmbeddingRequest,
+    inputs: List[Any]
+) -> Dict[str, Any]:
+    """One upstream /embeddings call for a (possibly merged) list of inputs"""
+    endpoints = config.get("endpoints")
+    pool = endpoints if endpoints and len(endpoints) > 1 else None
+    base_url = (endpoint_pool.pick(pool) if pool else config["base_url"]).rstrip('/')
+
+    payload: Dict[str, Any] = {"model": model, "input": inputs}
+    if request.encoding_format:
+        payload["encoding_format"] = request.encoding_format
+    if request.dimensions:
+        payload["dimensions"] = request.dimensions
+
+    lease = await concurrency_limiter.acquire(base_url, "embeddings", None)
+    started = endpoint_pool.on_start(base_url) if pool else 0.0
+    response = None
+    try:
+        response = await get_upstream_client(base_url, config["provider"]).post(
+            f"{base_url}/embeddings",
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {config['api_key']}"},
+            json=payload
+        )
+    finally:
+        lease.release()
+        if pool:
+            endpoint_pool.on_finish(base_url, started, response is not None and response.status_code < 500)
+
+    if response.status_code != 200:
+        logger.error(f"[Embeddings] Upstream error {response.status_code}: {response.text}")
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    return response.json()
+
+
+def save_embedding_call_to_db(
+    agent_id: str,
+    user_id: Optional[int],
+    trace_id: Optional[str],
+    provider: str,
+    model: str,
+    request: EmbeddingRequest,
+    inputs: List[Any],
+    result: Dict[str, Any],
+    latency_ms: int
+):
+    """Buffer the LLMCall row for one caller's embeddings request"""
+    usage = result["usage"]
+    # Swap this request's reserved rate-limit tokens for its share of the usage
+    rate_limiter.reconcile(usage["total_tokens"])
+    llm_call_writer.add({
+        "user_id": user_id,
+        "agent_id": agent_id,
+        "session_id": None,
+        "trace_id": trace_id,
+        "provider": provider,
+        "model": model,
+        "request_messages": {"input": inputs},
+        "request_params": {
+            "endpoint": "/v1/embeddings",
+            "encoding_format": request.encoding_format,
+            "dimensions": request.dimensions
+        },
+        "response_content": None,
+        "response_metadata": {
+            "object": "list",
+            "embeddings": len(result["data"]),
+            "usage": usage,
+            "batch": result["batch"]
+        },
+        "request_tokens": usage["prompt_tokens"],
+        "response_tokens": 0,
+        "total_tokens": usage["total_tokens"],
+        "latency_ms": latency_ms,
+        "success": True,
+        "error_message": None,
+        "completed_at": datetime.utcnow()
+    })
+
+
+@embeddings_router.post("/embeddings")
+async def create_traced_embeddings(
+    trace_id: str = Path(..., description="Trace ID for this agent"),
+    request: EmbeddingRequest = ...,
+    http_response: Response = None,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    OpenAI Compatible Embeddings Endpoint
+
+    Works with any OpenAI client pointed at the agent's trace base URL:
+
+        client = OpenAI(base_url="http://localhost:9050/api/llm/trace/{trace_id}/v1", api_key="a2g_...")
+        client.embeddings.create(model="text-embedding-3-small", input=["chunk 1", "chunk 2"])
+
+    Only OpenAI and OpenAI-compatible providers are supported.
+    """
+    request_metrics = metrics.track_request("embeddings")
+
+    user_info = await validate_platform_key(authorization)
+    if not user_info:
+        raise HTTPException(status_code=401, detail="Invalid or missing Platform API key")
+    user_id = user_info.get("user_id")
+
+    agent_id, trace_id = await resolve_trace_agent(trace_id)
+
+    config = await get_provider_config(request.model)
+    provider = config["provider"]
+    admin_model_name = config.get("admin_model_name", request.model)
+    request_metrics.provider = provider
+    request_metrics.model = admin_model_name
+
+    if provider not in OPENAI_COMPATIBLE_PROVIDERS:
+        raise HTTPException(status_code=400, detail=f"Embeddings are not supported for provider: {provider}")
+    if not config["api_key"]:
+        raise HTTPException(status_code=500, detail=f"No API key configured for provider: {provider}")
+
+    inputs = request.input_list()
+    if not inputs:
+        raise HTTPException(status_code=400, detail="input must not be empty")
+
+    logger.info(f"[Embeddings] agent_id={agent_id}, trace_id={trace_id}, model={admin_model_name}, inputs={len(inputs)}")
+
+    # Same per key/user/agent/model RPM and TPM budgets as completions
+    try:
+        rate_limit = await rate_limiter.admit(
+            request,
+            key_id=user_info.get("key_id"),
+            user_id=user_id,
+            agent=trace_id or agent_id,
+            model=admin_model_name,
+            prompt_tokens=estimate_input_tokens(inputs, admin_model_name)
+        )
+    except RateLimitExceeded as e:
+        metrics.record_error("rate_limited")
+        raise HTTPException(status_code=429, detail=str(e), headers=e.headers)
+
+    # Requests sharing upstream, model and output shape can share one call
+    batch_key = (config["base_url"], config["api_key"], admin_model_name, request.encoding_format, request.dimensions)
+    start_time = time.time()
+    try:
+        result = await embedding_batcher.embed(
+            batch_key,
+            inputs,
+            lambda batch_inputs: send_embeddings(config, admin_model_name, request, batch_inputs)
+        )
+    except EndpointBusy as e:
+        metrics.record_error("queue_timeout")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Upstream endpoint for model {request.model} is at capacity, retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        logger.error(f"[Embeddings] Failed for agent_id={agent_id}: {e}")
+        metrics.record_error(completion_error_type(e))
+        await emit_trace_event(
+            agent_id,
+            "llm_error",
+            {"error": str(e), "provider": provider, "model": request.model},
+            trace_id=trace_id
+        )
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=502, detail=str(e))
+    else:
+        latency_ms = int((time.time() - start_time) * 1000)
+        save_embedding_call_to_db(
+            agent_id, user_id, trace_id, provider, admin_model_name, request, inputs, result, latency_ms
+        )
+    finally:
+        # Refunds the reservation when the call failed before recording usage
+        rate_limiter.release(rate_limit)
+
+    metrics.record_completion(provider, admin_model_name, latency_ms, result["usage"])
+
+    await emit_trace_event(
+        agent_id,
+        "embeddings",
+        {
+            "provider": provider,
+            "model": request.model,
+            "inputs": len(inputs),
+            "usage": result["usage"],
+            "batched_requests": result["batch"]["requests"]
+        },
+        trace_id=trace_id
+    )
+
+    response = {
+        "object": "list",
+        "data": result["data"],
+        "model": result.get("model") or admin_model_name,
+        "usage": result["usage"]
+    }
+    return rate_limit.apply(response, http_response) if rate_limit else response
@@ -2,12 +2,24 @@
 Internal API endpoints for service-to-service communication
 No authentication required - for internal use only
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import delete
 import logging
 
 from app.core.database import get_db, LLMCall, TraceEvent, ToolCall
+from app.core.http_client import upstream_clients
+from app.core.trace_shipper import trace_shipper
+from app.core.llm_call_writer import llm_call_writer, trace_event_writer
+from app.core.tool_call_writer import tool_call_writer
+from app.core.concurrency import concurrency_limiter
+from app.core.response_cache import response_cache
+from app.core.single_flight import single_flight
+from app.core.endpoint_pool import endpoint_pool
+from app.core.rate_limit import rate_limiter
+from app.core.embedding_batcher import embedding_batcher
+from app.core.lookup_cache import session_trace_cache, trace_agent_cache
+from app.api.batches import execute_batch_request, finalize_batch, start_batch
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -24,6 +36,11 @@ async def delete_agent_llm_calls(
     Called by Agent Service when an agent is deleted to clean up token usage records.
     """
     try:
+        # Write out buffered rows first so none land after the delete
+        await llm_call_writer.flush()
+        await trace_event_writer.flush()
+        await tool_call_writer.flush()
+
         agent_id_str = str(agent_id)
 
         # Delete LLM calls
@@ -71,6 +88,9 @@ async def delete_model_llm_calls(
     Worker-service snapshots are kept as-is (model name based, continues accumulating if same name is reused).
     """
     try:
+        # Write out buffered rows first so none land after the delete
+        await llm_call_writer.flush()
+
         # Delete LLM calls for this model
         llm_delete_stmt = delete(LLMCall).where(LLMCall.model == model_name)
         llm_result = await db.execute(llm_delete_stmt)
@@ -90,3 +110,166 @@ async def delete_model_llm_calls(
         logger.error(f"Failed to delete records for model={model_name}: {e}")
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/internal/upstream-pools")
+async def get_upstream_pool_stats():
+    """
+    Connection-reuse metrics for pooled upstream clients (Internal API - No Auth Required)
+
+    One entry per upstream origin. reuse_ratio close to 1.0 and p50_handshake_ms of 0
+    mean requests are riding on warm keep-alive connections.
+    """
+    return {"pools": upstream_clients.get_stats()}
+
+
+@router.get("/internal/trace-shipper")
+async def get_trace_shipper_stats():
+    """
+    Trace-event shipper counters (Internal API - No Auth Required)
+
+    queued/sent/dropped/spilled event counts plus current queue depth.
+    """
+    return trace_shipper.stats()
+
+
+@router.get("/internal/llm-call-writer")
+async def get_llm_call_writer_stats():
+    """
+    Write-behind LLM call buffer counters (Internal API - No Auth Required)
+    """
+    return llm_call_writer.stats()
+
+
+@router.get("/internal/trace-event-writer")
+async def get_trace_event_writer_stats():
+    """
+    Write-behind trace event buffer counters (Internal API - No Auth Required)
+    """
+    return trace_event_writer.stats()
+
+
+@router.get("/internal/tool-call-writer")
+async def get_tool_call_writer_stats():
+    """
+    Write-behind tool call buffer counters (Internal API - No Auth Required)
+
+    results_matched counts tool results joined to their call (latency_ms set);
+    pending_results are waiting for a row flushed elsewhere.
+    """
+    return tool_call_writer.stats()
+
+
+@router.get("/internal/lookup-cache")
+async def get_lookup_cache_stats():
+    """
+    Session -> trace and trace -> agent lookup cache counters (Internal API - No Auth Required)
+    """
+    return {
+        "session_trace": session_trace_cache.stats(),
+        "trace_agent": trace_agent_cache.stats()
+    }
+
+
+@router.get("/internal/concurrency")
+async def get_concurrency_stats():
+    """
+    Per-endpoint concurrency limiter metrics (Internal API - No Auth Required)
+
+    in_flight/max_in_flight, fair-queue depth, admitted/queued/rejected counts
+    and p50/p95 queue wait per upstream endpoint.
+    """
+    return {"endpoints": concurrency_limiter.get_stats()}
+
+
+@router.get("/internal/response-cache")
+async def get_response_cache_stats():
+    """
+    Response cache counters (Internal API - No Auth Required)
+
+    hits/misses/hit_ratio and total upstream tokens saved since start.
+    Per-call hit/miss is recorded in LLMCall.response_metadata["cache"].
+    """
+    return response_cache.stats()
+
+
+@router.get("/internal/single-flight")
+async def get_single_flight_stats():
+    """
+    Request coalescing counters (Internal API - No Auth Required)
+
+    leaders = upstream calls made, followers = identical requests that
+    attached to an in-flight leader instead of calling upstream.
+    """
+    return single_flight.stats()
+
+
+@router.get("/internal/endpoint-pools")
+async def get_endpoint_pool_stats():
+    """
+    Replica selection state for multi-endpoint models (Internal API - No Auth Required)
+
+    outstanding requests, EWMA latency, consecutive failures and ejection
+    status per replica endpoint.
+    """
+    return endpoint_pool.get_stats()
+
+
+@router.get("/internal/rate-limits")
+async def get_rate_limit_stats():
+    """
+    RPM/TPM limiter counters and configured budgets (Internal API - No Auth Required)
+
+    limited_by_scope counts 429s by the scope type (key/user/agent/model) that
+    ran out first; reconciled_tokens is the net correction from estimated to
+    actual token usage.
+    """
+    return rate_limiter.stats()
+
+
+@router.get("/internal/embedding-batcher")
+async def get_embedding_batcher_stats():
+    """
+    Embedding micro-batching counters (Internal API - No Auth Required)
+
+    requests vs upstream_calls shows how many /embeddings requests were merged.
+    """
+    return embedding_batcher.stats()
+
+
+@router.post("/internal/batches/{batch_id}/start")
+async def start_llm_batch(batch_id: str):
+    """
+    Mark a batch in progress (Internal API - No Auth Required)
+
+    Called by Worker Service before running a batch. Returns the requests
+    that have no stored result yet, so a restarted run resumes where it stopped.
+    """
+    status, requests = await start_batch(batch_id)
+    return {"batch_id": batch_id, "status": status, "requests": requests}
+
+
+@router.post("/internal/batches/{batch_id}/requests")
+async def execute_llm_batch_request(batch_id: str, item: dict = Body(...)):
+    """
+    Execute one request of a batch (Internal API - No Auth Required)
+
+    Body is {"custom_id": ..., "body": {...chat completion request...}},
+    plus "final_attempt": true on the worker's last try.
+    429 and 503 mean the request should be retried (rate limited, upstream
+    at capacity or failing); 409 means the batch was cancelled. On the final
+    attempt an upstream 5xx is stored as the request's result.
+    """
+    if "custom_id" not in item or not isinstance(item.get("body"), dict):
+        raise HTTPException(status_code=400, detail="custom_id and body are required")
+    return await execute_batch_request(
+        batch_id, item["custom_id"], item["body"], final_attempt=bool(item.get("final_attempt"))
+    )
+
+
+@router.post("/internal/batches/{batch_id}/finalize")
+async def finalize_llm_batch(batch_id: str):
+    """
+    Close a batch after Worker Service has run it (Internal API - No Auth Required)
+    """
+    return {"batch_id": batch_id, "status": await finalize_batch(batch_id)}
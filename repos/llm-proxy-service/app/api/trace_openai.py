@@ -2,10 +2,12 @@
 Trace-based OpenAI Compatible API
 Agent-specific LLM endpoint with automatic trace_id injection
 """
-from fastapi import APIRouter, HTTPException, Header, Path
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Header, Path, Response
+from typing import Optional, Tuple
 import logging
 
+from ..core import metrics
+from ..core.lookup_cache import lookup_trace_agent
 from .openai_compatible import (
     ChatCompletionRequest,
     create_chat_completion,
@@ -18,10 +20,36 @@ logger = logging.getLogger(__name__)
 trace_openai_router = APIRouter()
 
 
+async def resolve_trace_agent(trace_id: str) -> Tuple[str, Optional[str]]:
+    """
+    Resolve the agent_id for a trace_id via Agent Service (cached, see lookup_cache)
+
+    Returns (agent_id, trace_id); trace_id is None for deployed agents, whose
+    calls are not traced. agent_id is "unknown" when the lookup fails.
+    """
+    agent = await lookup_trace_agent(trace_id)
+    if agent is None:
+        logger.warning(f"[Traced LLM] ⚠️  Could not resolve agent for trace_id={trace_id}")
+        return "unknown", trace_id
+
+    resolved_agent_id, agent_status = agent["id"], agent["status"]
+    logger.info(f"[Traced LLM] ✅ Resolved agent_id={resolved_agent_id}, status={agent_status} from trace_id={trace_id}")
+
+    # Check if agent is deployed - if so, don't collect trace
+    deployed_statuses = ["DEPLOYED_TEAM", "DEPLOYED_ALL", "PRODUCTION"]
+    if agent_status in deployed_statuses:
+        logger.info(f"[Traced LLM] 🚫 Agent is deployed ({agent_status}), skipping trace collection")
+        # Clear trace_id to prevent trace collection
+        trace_id = None
+
+    return resolved_agent_id, trace_id
+
+
 @trace_openai_router.post("/chat/completions")
 async def create_traced_chat_completion(
     trace_id: str = Path(..., description="Trace ID for this agent (auto-generated from user_id + agent_id)"),
     request: ChatCompletionRequest = None,
+    http_response: Response = None,
     authorization: Optional[str] = Header(None)
 ):
     """
@@ -55,6 +83,8 @@ async def create_traced_chat_completion(
     5. Token usage tracked by agent_id
     6. Trace events appear in Workbench trace panel
     """
+    metrics.track_request("trace")
+
     logger.info("="*80)
     logger.info(f"[Traced LLM] NEW REQUEST via /trace/{trace_id}/v1/chat/completions")
     logger.info(f"[Traced LLM] Trace ID from URL: {trace_id}")
@@ -76,34 +106,7 @@ async def create_traced_chat_completion(
 
     # Lookup agent_id from trace_id via Agent Service
     # Agent doesn't need to provide this - we resolve it automatically!
-    resolved_agent_id = "unknown"
-    agent_status = None
-
-    import httpx
-    import os
-    agent_service_url = os.getenv('AGENT_SERVICE_URL', 'http://agent-service:8002')
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{agent_service_url}/api/internal/agents/by-trace-id/{trace_id}")
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("agent") and data["agent"].get("id"):
-                    resolved_agent_id = str(data["agent"]["id"])
-                    agent_status = data["agent"].get("status")
-                    logger.info(f"[Traced LLM] ✅ Resolved agent_id={resolved_agent_id}, status={agent_status} from trace_id={trace_id}")
-
-                    # Check if agent is deployed - if so, don't collect trace
-                    deployed_statuses = ["DEPLOYED_TEAM", "DEPLOYED_ALL", "PRODUCTION"]
-                    if agent_status in deployed_statuses:
-                        logger.info(f"[Traced LLM] 🚫 Agent is deployed ({agent_status}), skipping trace collection")
-                        # Clear trace_id to prevent trace collection
-                        trace_id = None
-                else:
-                    logger.warning(f"[Traced LLM] ⚠️  No agent found for trace_id={trace_id}")
-            else:
-                logger.warning(f"[Traced LLM] ⚠️  Agent Service returned {response.status_code} for trace_id={trace_id}")
-    except Exception as e:
-        logger.error(f"[Traced LLM] ❌ Failed to lookup agent_id from trace_id={trace_id}: {e}")
+    resolved_agent_id, trace_id = await resolve_trace_agent(trace_id)
 
     # Inject trace_id and agent_id into the request
     logger.info(f"[Traced LLM] FORWARDING to main handler - trace_id={trace_id}, agent_id={resolved_agent_id}")
@@ -111,6 +114,7 @@ async def create_traced_chat_completion(
     # Call the original function with trace_id and agent_id automatically set
     return await create_chat_completion(
         request=request,
+        http_response=http_response,
         authorization=authorization,
         x_agent_id=resolved_agent_id,  # Auto-resolved from trace_id
         x_trace_id=trace_id  # From URL path
@@ -0,0 +1,218 @@
+"""
+Trace event and tool call query endpoints
+
+Requests need the caller's Platform API key (Authorization: Bearer a2g_...),
+and a trace or agent is only visible to a user whose key has made LLM calls
+for it; anything else is answered 404.
+
+Rows are written in batches by the write-behind buffers, so the last second
+or so of activity may not be visible yet.
+"""
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, desc
+from typing import Dict, Any, Optional, Literal
+
+from app.api.openai_compatible import validate_platform_key
+from app.core.database import LLMCall, TraceEvent, ToolCall, get_db
+
+router = APIRouter()
+
+
+# ===== Access =====
+
+async def _require_usage(db: AsyncSession, condition, authorization: Optional[str], label: str):
+    """401 without a valid key; 404 unless the key's user has LLM calls matching condition"""
+    user_info = await validate_platform_key(authorization)
+    if not user_info:
+        raise HTTPException(status_code=401, detail="Invalid or missing Platform API key")
+    owned = await db.scalar(
+        select(LLMCall.id).where(condition, LLMCall.user_id == user_info.get("user_id")).limit(1)
+    )
+    if owned is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+
+
+async def require_trace_access(
+    trace_id: str,
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    await _require_usage(db, LLMCall.trace_id == trace_id, authorization, f"Trace {trace_id}")
+
+
+async def require_agent_access(
+    agent_id: str,
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    await _require_usage(db, LLMCall.agent_id == agent_id, authorization, f"Agent {agent_id}")
+
+
+async def paginate(db: AsyncSession, query, page: int, limit: int) -> Dict[str, Any]:
+    """Run query for one page; returns rows plus total/page/limit"""
+    total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+    offset = (page - 1) * limit
+    result = await db.execute(query.offset(offset).limit(limit))
+    return {"rows": result.scalars().all(), "total": total or 0, "page": page, "limit": limit}
+
+
+def event_to_dict(event: TraceEvent) -> Dict[str, Any]:
+    return {
+        "id": event.id,
+        "agent_id": event.agent_id,
+        "trace_id": event.trace_id,
+        "event_type": event.event_type,
+        "event_data": event.event_data,
+        "event_metadata": event.event_metadata,
+        "timestamp": event.timestamp.isoformat() if event.timestamp else None
+    }
+
+
+def tool_call_to_dict(call: ToolCall) -> Dict[str, Any]:
+    return {
+        "id": call.id,
+        "agent_id": call.agent_id,
+        "trace_id": call.trace_id,
+        "tool_call_id": call.tool_call_id,
+        "tool_name": call.tool_name,
+        "tool_args": call.tool_args,
+        "tool_result": call.tool_result,
+        "success": call.success,
+        "called_at": call.called_at.isoformat() if call.called_at else None,
+        "completed_at": call.completed_at.isoformat() if call.completed_at else None,
+        "latency_ms": call.latency_ms
+    }
+
+
+# ===== Trace Events =====
+
+async def query_events(db: AsyncSession, condition, event_type: Optional[str], page: int, limit: int):
+    query = select(TraceEvent).where(condition)
+    if event_type:
+        query = query.where(TraceEvent.event_type == event_type)
+    # Oldest first: a page reads as a timeline
+    query = query.order_by(TraceEvent.timestamp, TraceEvent.id)
+
+    result = await paginate(db, query, page, limit)
+    result["events"] = [event_to_dict(event) for event in result.pop("rows")]
+    return result
+
+
+@router.get("/traces/{trace_id}/events", dependencies=[Depends(require_trace_access)])
+async def get_trace_events(
+    trace_id: str,
+    event_type: Optional[str] = Query(None, description="Filter by event type (llm_request, tool_call, ...)"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Trace events recorded for a trace, oldest first"""
+    return await query_events(db, TraceEvent.trace_id == trace_id, event_type, page, limit)
+
+
+@router.get("/agents/{agent_id}/events", dependencies=[Depends(require_agent_access)])
+async def get_agent_events(
+    agent_id: str,
+    event_type: Optional[str] = Query(None, description="Filter by event type (llm_request, tool_call, ...)"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Trace events recorded for an agent, oldest first"""
+    return await query_events(db, TraceEvent.agent_id == agent_id, event_type, page, limit)
+
+
+# ===== Tool Calls =====
+
+async def query_tool_calls(
+    db: AsyncSession,
+    condition,
+    tool_name: Optional[str],
+    min_latency_ms: Optional[int],
+    sort: str,
+    page: int,
+    limit: int
+):
+    query = select(ToolCall).where(condition)
+    if tool_name:
+        query = query.where(ToolCall.tool_name == tool_name)
+    if min_latency_ms is not None:
+        query = query.where(ToolCall.latency_ms >= min_latency_ms)
+    if sort == "latency":
+        # Slowest first; calls still waiting for a result go last
+        query = query.order_by(desc(ToolCall.latency_ms).nulls_last(), desc(ToolCall.called_at))
+    else:
+        query = query.order_by(desc(ToolCall.called_at), ToolCall.id)
+
+    result = await paginate(db, query, page, limit)
+    result["tool_calls"] = [tool_call_to_dict(call) for call in result.pop("rows")]
+    return result
+
+
+@router.get("/traces/{trace_id}/tool-calls", dependencies=[Depends(require_trace_access)])
+async def get_trace_tool_calls(
+    trace_id: str,
+    tool_name: Optional[str] = Query(None, description="Filter by tool name"),
+    min_latency_ms: Optional[int] = Query(None, ge=0, description="Only calls at least this slow"),
+    sort: Literal["called_at", "latency"] = Query("called_at", description="Newest first, or slowest first"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Tool calls made within a trace, with their results and latency"""
+    return await query_tool_calls(
+        db, ToolCall.trace_id == trace_id, tool_name, min_latency_ms, sort, page, limit
+    )
+
+
+@router.get("/agents/{agent_id}/tool-calls", dependencies=[Depends(require_agent_access)])
+async def get_agent_tool_calls(
+    agent_id: str,
+    tool_name: Optional[str] = Query(None, description="Filter by tool name"),
+    min_latency_ms: Optional[int] = Query(None, ge=0, description="Only calls at least this slow"),
+    sort: Literal["called_at", "latency"] = Query("called_at", description="Newest first, or slowest first"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Tool calls made by an agent, with their results and latency"""
+    return await query_tool_calls(
+        db, ToolCall.agent_id == agent_id, tool_name, min_latency_ms, sort, page, limit
+    )
+
+
+async def tool_latency_summary(db: AsyncSession, condition):
+    query = select(
+        ToolCall.tool_name,
+        func.count(ToolCall.id).label('call_count'),
+        func.count(ToolCall.latency_ms).label('completed_count'),
+        func.avg(ToolCall.latency_ms).label('avg_latency_ms'),
+        func.max(ToolCall.latency_ms).label('max_latency_ms')
+    ).where(condition).group_by(ToolCall.tool_name).order_by(desc('avg_latency_ms').nulls_last())
+
+    result = await db.execute(query)
+    return {
+        "tools": [
+            {
+                "tool_name": row.tool_name,
+                "call_count": row.call_count,
+                "completed_count": row.completed_count,
+                "avg_latency_ms": round(float(row.avg_latency_ms), 1) if row.avg_latency_ms is not None else None,
+                "max_latency_ms": row.max_latency_ms
+            }
+            for row in result.all()
+        ]
+    }
+
+
+@router.get("/traces/{trace_id}/tool-latency", dependencies=[Depends(require_trace_access)])
+async def get_trace_tool_latency(trace_id: str, db: AsyncSession = Depends(get_db)):
+    """Per-tool call count and latency within a trace, slowest tools first"""
+    return await tool_latency_summary(db, ToolCall.trace_id == trace_id)
+
+
+@router.get("/agents/{agent_id}/tool-latency", dependencies=[Depends(require_agent_access)])
+async def get_agent_tool_latency(agent_id: str, db: AsyncSession = Depends(get_db)):
+    """Per-tool call count and latency for an agent, slowest tools first"""
+    return await tool_latency_summary(db, ToolCall.agent_id == agent_id)
@@ -0,0 +1,208 @@
+"""
+Per-endpoint concurrency limiter with weighted fair queueing
+
+Each upstream endpoint (provider base URL) gets at most LLM_MAX_IN_FLIGHT
+concurrent calls. Callers beyond that wait in a weighted fair queue keyed by
+(agent_id, user_id): every flow gets a virtual finish tag of
+max(virtual_time, previous_finish) + 1/weight, and freed slots go to the
+waiter with the smallest tag. A busy agent loop therefore only delays its own
+requests instead of starving everyone else on the same backend.
+
+Waiting longer than LLM_MAX_QUEUE_WAIT raises EndpointBusy, which the
+completion endpoints turn into 429 with Retry-After.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics import observe_queue_wait
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "64"))
+LLM_MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "30"))
+# Per-endpoint overrides, e.g. {"http://vllm:8000/v1": 8}
+LLM_ENDPOINT_LIMITS: Dict[str, int] = json.loads(os.getenv("LLM_ENDPOINT_LIMITS", "{}"))
+# Flow weights, e.g. {"agent:42": 4, "user:7": 2}; unlisted flows weigh 1
+LLM_FAIR_QUEUE_WEIGHTS: Dict[str, float] = json.loads(os.getenv("LLM_FAIR_QUEUE_WEIGHTS", "{}"))
+
+WAIT_SAMPLE_SIZE = 1000
+
+
+class EndpointBusy(Exception):
+    """Raised when a request waited longer than the queue budget for a slot"""
+
+    def __init__(self, endpoint: str, retry_after: int):
+        super().__init__(f"Upstream endpoint {endpoint} is at capacity")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("future", "flow", "start_tag", "cancelled")
+
+    def __init__(self, future: asyncio.Future, flow: str, start_tag: float):
+        self.future = future
+        self.flow = flow
+        self.start_tag = start_tag
+        self.cancelled = False
+
+
+class Lease:
+    """A held slot; release() is idempotent so streaming paths can call it twice"""
+    __slots__ = ("_limiter", "_acquired_at", "released")
+
+    def __init__(self, limiter: "EndpointLimiter"):
+        self._limiter = limiter
+        self._acquired_at = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self._limiter._release(time.monotonic() - self._acquired_at)
+
+
+class EndpointLimiter:
+    """Semaphore + weighted fair queue for one upstream endpoint"""
+
+    def __init__(self, endpoint: str, max_in_flight: int, max_wait: float):
+        self.endpoint = endpoint
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._flow_finish: Dict[str, float] = {}
+        self._queued = 0
+        # EWMA of slot hold time, used to estimate Retry-After
+        self._avg_hold = 1.0
+        self.recent_waits_ms: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.counters: Dict[str, int] = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    async def acquire(self, flow: str, weight: float = 1.0) -> Lease:
+        if self.in_flight < self.max_in_flight and not self._queued:
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+            self.recent_waits_ms.append(0.0)
+            observe_queue_wait(0.0)
+            return Lease(self)
+
+        start_tag = max(self._virtual_time, self._flow_finish.get(flow, 0.0))
+        finish_tag = start_tag + 1.0 / max(weight, 0.001)
+        self._flow_finish[flow] = finish_tag
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), flow, start_tag)
+        heapq.heappush(self._heap, (finish_tag, next(self._seq), waiter))
+        self._queued += 1
+        self.counters["queued"] += 1
+
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted at the same moment the wait ended - hand the slot on
+                Lease(self).release()
+            else:
+                waiter.cancelled = True
+                waiter.future.cancel()
+                self._queued -= 1
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.counters["rejected"] += 1
+            raise EndpointBusy(self.endpoint, self.retry_after())
+
+        waited = time.monotonic() - queued_at
+        self.counters["admitted"] += 1
+        self.recent_waits_ms.append(waited * 1000)
+        observe_queue_wait(waited)
+        return Lease(self)
+
+    def _release(self, held_seconds: float):
+        self._avg_hold = 0.9 * self._avg_hold + 0.1 * held_seconds
+        self.in_flight -= 1
+        while self._heap and self.in_flight < self.max_in_flight:
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.cancelled:
+                continue
+            self._queued -= 1
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self.in_flight += 1
+            waiter.future.set_result(None)
+        if not self._heap:
+            # Idle: forget per-flow tags so the map doesn't grow unbounded
+            self._flow_finish.clear()
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is expected to drain"""
+        per_slot = self._avg_hold * (self._queued + 1) / max(self.max_in_flight, 1)
+        return max(1, math.ceil(per_slot))
+
+    def _percentile(self, pct: float) -> float:
+        if not self.recent_waits_ms:
+            return 0.0
+        samples = sorted(self.recent_waits_ms)
+        return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queue_depth": self._queued,
+            "p50_wait_ms": round(self._percentile(0.50), 2),
+            "p95_wait_ms": round(self._percentile(0.95), 2),
+            "max_wait_ms": round(max(self.recent_waits_ms, default=0.0), 2),
+        }
+
+
+class ConcurrencyLimiter:
+    """Registry of EndpointLimiters keyed by endpoint base URL"""
+
+    def __init__(self, max_in_flight: int = LLM_MAX_IN_FLIGHT, max_wait: float = LLM_MAX_QUEUE_WAIT):
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self._limiters: Dict[str, EndpointLimiter] = {}
+
+    def limiter(self, endpoint: str) -> EndpointLimiter:
+        endpoint = endpoint.rstrip("/")
+        limiter = self._limiters.get(endpoint)
+        if limiter is None:
+            limit = LLM_ENDPOINT_LIMITS.get(endpoint, self.max_in_flight)
+            limiter = self._limiters[endpoint] = EndpointLimiter(endpoint, limit, self.max_wait)
+        return limiter
+
+    async def acquire(self, endpoint: str, agent_id: Optional[str], user_id: Optional[int]) -> Lease:
+        """Wait for a slot on endpoint; raises EndpointBusy after max_wait"""
+        weight = LLM_FAIR_QUEUE_WEIGHTS.get(
+            f"agent:{agent_id}",
+            LLM_FAIR_QUEUE_WEIGHTS.get(f"user:{user_id}", 1.0)
+        )
+        return await self.limiter(endpoint).acquire(f"{agent_id}:{user_id}", weight)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {endpoint: limiter.stats() for endpoint, limiter in self._limiters.items()}
+
+
+async def release_after(stream, lease: Lease):
+    """Wrap a streaming generator so its slot is held until the stream ends"""
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        lease.release()
+        # Close the wrapped stream now, not whenever it is garbage collected
+        await stream.aclose()
+
+
+# Global limiter instance
+concurrency_limiter = ConcurrencyLimiter()
@@ -0,0 +1,162 @@
+"""
+Context-window guard applied before a request is dispatched upstream
+
+Oversized conversations otherwise fail at the provider only after a network
+round trip (and, for agents that flatten their whole history into the
+prompt, fail on every turn from then on). The prompt is estimated locally
+(see token_estimator) and compared with the model's context window minus the
+requested max_tokens:
+
+- reject (default): 400 context_length_exceeded before any upstream call
+- truncate: drop the oldest non-system turns until the prompt fits; tool
+  calls are dropped together with their tool results
+- off
+
+Only OpenAI models counted with their own tiktoken table get exact counts;
+everything else is estimated with a proxy table or the character heuristic
+and may be off either way. Those estimates get CONTEXT_GUARD_HEURISTIC_MARGIN
+of slack: reject only prompts that would not fit even if the estimate ran
+that much high, and truncate until the prompt would fit even if it ran that
+much low. Borderline requests are left to the provider rather than refused.
+
+The window comes from the admin model's configuration ("context_window"),
+falling back to known model families. An admin configuration may also set
+"context_overflow" to override CONTEXT_GUARD_MODE per model.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .token_estimator import TOKENS_PER_REPLY, estimate_tools_tokens, is_exact, message_token_counts
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_GUARD_MODE = os.getenv("CONTEXT_GUARD_MODE", "reject")  # reject | truncate | off
+# Relative error allowed for non-exact prompt estimates (cl100k proxy is typically within 10-15%)
+CONTEXT_GUARD_HEURISTIC_MARGIN = float(os.getenv("CONTEXT_GUARD_HEURISTIC_MARGIN", "0.15"))
+
+# Longest matching prefix of the model name (last path segment) wins, so
+# variants with a different window than their family need their own entry
+DEFAULT_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-instruct": 4096,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4-0125-preview": 128000,
+    "gpt-4-1106-preview": 128000,
+    "gpt-4-vision-preview": 128000,
+    "gpt-4.5": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-5": 400000,
+    "gpt-oss": 131072,
+    "o1": 200000,
+    "o1-mini": 128000,
+    "o1-preview": 128000,
+    "o3": 200000,
+    "o4": 200000,
+    "claude-": 200000,
+    "gemini-": 1048576,
+    "gemini-1.0-pro": 32760,
+    "gemini-pro": 32760,
+    "gemini-1.5-pro": 2097152,
+}
+
+
+class ContextWindowExceeded(Exception):
+    """The prompt plus max_tokens does not fit the model's context window"""
+
+    def __init__(self, model: str, prompt_tokens: int, max_tokens: int, context_window: int):
+        super().__init__(
+            f"This model's maximum context length is {context_window} tokens. However, your messages "
+            f"resulted in about {prompt_tokens} tokens"
+            + (f" and {max_tokens} tokens were requested for the completion" if max_tokens else "")
+            + f". Please reduce the length of the messages (model: {model})."
+        )
+        self.prompt_tokens = prompt_tokens
+        self.context_window = context_window
+
+    def to_openai_error(self) -> Dict[str, Any]:
+        return {"error": {"message": str(self), "type": "invalid_request_error", "code": "context_length_exceeded"}}
+
+
+@dataclass
+class ContextEstimate:
+    """Outcome of the guard for one request"""
+    prompt_tokens: int
+    context_window: Optional[int] = None
+    dropped_messages: int = 0
+
+
+def context_window_for(model_name: str, configuration: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """Context window from the admin configuration, else the best-known default"""
+    if configuration and configuration.get("context_window"):
+        return int(configuration["context_window"])
+    name = model_name.split("/")[-1].lower()
+    matches = [prefix for prefix in DEFAULT_CONTEXT_WINDOWS if name.startswith(prefix)]
+    return DEFAULT_CONTEXT_WINDOWS[max(matches, key=len)] if matches else None
+
+
+def _turn_groups(messages: List[Any]) -> List[List[int]]:
+    """Indexes of non-system messages, grouped so tool results stay with their call"""
+    groups: List[List[int]] = []
+    for index, msg in enumerate(messages):
+        if msg.role == "system":
+            continue
+        if msg.role in ("tool", "function") and groups:
+            groups[-1].append(index)
+        else:
+            groups.append([index])
+    return groups
+
+
+def guard_context_window(
+    request: Any,
+    context_window: Optional[int],
+    mode: Optional[str] = None
+) -> ContextEstimate:
+    """
+    Estimate the prompt and enforce the context window
+
+    In truncate mode request.messages is replaced with the trimmed list.
+    Raises ContextWindowExceeded when the prompt can't be made to fit.
+    """
+    mode = mode or CONTEXT_GUARD_MODE
+    counts = message_token_counts(request)
+    fixed = TOKENS_PER_REPLY + estimate_tools_tokens(request)
+    prompt_tokens = fixed + sum(counts)
+    estimate = ContextEstimate(prompt_tokens, context_window)
+
+    if mode == "off" or not context_window:
+        return estimate
+    budget = context_window - (request.max_tokens or 0)
+    margin = 0.0 if is_exact(request.model) else CONTEXT_GUARD_HEURISTIC_MARGIN
+    if prompt_tokens * (1 + margin) <= budget:
+        return estimate
+    if mode != "truncate":
+        if prompt_tokens * (1 - margin) > budget:
+            raise ContextWindowExceeded(request.model, prompt_tokens, request.max_tokens or 0, context_window)
+        # Might fit; the provider has the real tokenizer
+        return estimate
+
+    # Drop the oldest turns, always keeping system messages and the latest turn
+    dropped = set()
+    groups = _turn_groups(request.messages)
+    for group in groups[:-1]:
+        if prompt_tokens * (1 + margin) <= budget:
+            break
+        dropped.update(group)
+        prompt_tokens -= sum(counts[i] for i in group)
+    if prompt_tokens * (1 - margin) > budget:
+        raise ContextWindowExceeded(request.model, prompt_tokens, request.max_tokens or 0, context_window)
+    if not dropped:
+        return estimate
+
+    request.messages = [msg for i, msg in enumerate(request.messages) if i not in dropped]
+    logger.warning(
+        f"[Context Guard] Truncated {len(dropped)} oldest messages for model={request.model} "
+        f"to fit {context_window} tokens (prompt ~{prompt_tokens})"
+    )
+    return ContextEstimate(prompt_tokens, context_window, len(dropped))
@@ -3,9 +3,9 @@ Database configuration and models for LLM Proxy Service
 """
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Integer, DateTime, JSON, Text, Float, Boolean
+from sqlalchemy import String, Integer, DateTime, JSON, Text, Float, Boolean, Index
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import uuid
 import os
 
@@ -85,7 +85,10 @@ class ToolCall(Base):
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     agent_id: Mapped[str] = mapped_column(String, index=True)
     session_id: Mapped[Optional[str]] = mapped_column(String, index=True)
+    trace_id: Mapped[Optional[str]] = mapped_column(String, index=True)
     llm_call_id: Mapped[Optional[str]] = mapped_column(String, index=True)
+    # Provider-assigned id; the tool message answering the call carries it as tool_call_id
+    tool_call_id: Mapped[Optional[str]] = mapped_column(String, index=True)
 
     # Tool Info
     tool_name: Mapped[str] = mapped_column(String)
@@ -102,6 +105,47 @@ class ToolCall(Base):
     latency_ms: Mapped[Optional[int]] = mapped_column(Integer)
 
 
+class LLMBatch(Base):
+    """A /v1/batches job: completion requests from an uploaded JSONL file, run by worker-service"""
+    __tablename__ = "llm_batches"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: f"batch_{uuid.uuid4().hex}")
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, index=True)
+    agent_id: Mapped[str] = mapped_column(String, index=True)
+    trace_id: Mapped[Optional[str]] = mapped_column(String, index=True)
+
+    endpoint: Mapped[str] = mapped_column(String, default="/v1/chat/completions")
+    # validating, in_progress, completed, failed, cancelling, cancelled
+    status: Mapped[str] = mapped_column(String, index=True, default="validating")
+    # [{"custom_id": ..., "body": {...}}, ...] in file order
+    input_requests: Mapped[List[Dict[str, Any]]] = mapped_column(JSON)
+    total_requests: Mapped[int] = mapped_column(Integer, default=0)
+    batch_metadata: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    errors: Mapped[Optional[List[Dict[str, Any]]]] = mapped_column(JSON)
+
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    in_progress_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+
+class LLMBatchResult(Base):
+    """Outcome of one request of an LLMBatch"""
+    __tablename__ = "llm_batch_results"
+    # One result per request, however many times the worker retries it
+    __table_args__ = (
+        Index("uq_llm_batch_results_batch_id_custom_id", "batch_id", "custom_id", unique=True),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: f"batch_req_{uuid.uuid4().hex}")
+    batch_id: Mapped[str] = mapped_column(String, index=True)
+    custom_id: Mapped[str] = mapped_column(String)
+    status_code: Mapped[int] = mapped_column(Integer)
+    response_body: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    error: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    completed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 async def init_db():
     """Initialize database tables"""
     async with engine.begin() as conn:
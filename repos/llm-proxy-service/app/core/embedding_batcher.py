@@ -0,0 +1,162 @@
+"""
+Micro-batching of concurrent embedding requests
+
+Agents typically embed one query or a handful of chunks per call, so under
+load the upstream sees many tiny /embeddings requests. Requests for the same
+upstream model (and encoding_format / dimensions) that arrive within
+EMBEDDING_BATCH_WINDOW_MS are merged into one upstream call of up to
+EMBEDDING_MAX_BATCH_INPUTS inputs; each caller gets back only its own
+vectors, re-indexed from 0, and its share of the upstream usage.
+
+A request that alone reaches the batch size is sent on its own. If the merged
+call is rejected with a 4xx (other than 429), one caller's input may be what
+the upstream refused, so each caller's inputs are retried as their own call.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_MAX_BATCH_INPUTS = int(os.getenv("EMBEDDING_MAX_BATCH_INPUTS", "128"))
+
+# Sends a list of inputs upstream and returns the OpenAI-format embeddings response
+SendBatch = Callable[[List[Any]], Awaitable[Dict[str, Any]]]
+
+
+class _PendingBatch:
+    __slots__ = ("inputs", "waiters", "send", "timer")
+
+    def __init__(self, send: SendBatch):
+        self.inputs: List[Any] = []
+        # (offset, count, weight, future) per caller
+        self.waiters: List[Tuple[int, int, int, asyncio.Future]] = []
+        self.send = send
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+def _input_weight(item: Any) -> int:
+    """Rough size of one input, used to split the batch's usage between callers"""
+    return max(1, len(item) // 4 if isinstance(item, str) else len(item))
+
+
+class EmbeddingBatcher:
+    """Collects embedding inputs per upstream key and flushes them as one call"""
+
+    def __init__(self, window_ms: float = EMBEDDING_BATCH_WINDOW_MS, max_inputs: int = EMBEDDING_MAX_BATCH_INPUTS):
+        self.window = window_ms / 1000
+        self.max_inputs = max_inputs
+        self._pending: Dict[Tuple, _PendingBatch] = {}
+        self._flushing: Set[asyncio.Task] = set()
+        self.counters: Dict[str, int] = {
+            "requests": 0, "upstream_calls": 0, "inputs": 0, "errors": 0, "split_batches": 0
+        }
+
+    async def embed(self, key: Tuple, inputs: List[Any], send: SendBatch) -> Dict[str, Any]:
+        """
+        Embed inputs, sharing an upstream call with concurrent requests for key
+
+        Returns {"data": [...], "usage": {...}, "batch": {"inputs": n, "requests": k}}.
+        """
+        self.counters["requests"] += 1
+        self.counters["inputs"] += len(inputs)
+
+        if len(inputs) >= self.max_inputs or self.window <= 0:
+            batch = _PendingBatch(send)
+            future = self._add(batch, inputs)
+            await self._flush(batch)
+            return await future
+
+        batch = self._pending.get(key)
+        if batch is not None and len(batch.inputs) + len(inputs) > self.max_inputs:
+            self._start_flush(key, batch)
+            batch = None
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(send)
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._start_flush, key, batch)
+
+        future = self._add(batch, inputs)
+        if len(batch.inputs) >= self.max_inputs:
+            self._start_flush(key, batch)
+        return await future
+
+    def _add(self, batch: _PendingBatch, inputs: List[Any]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        weight = sum(_input_weight(item) for item in inputs)
+        batch.waiters.append((len(batch.inputs), len(inputs), weight, future))
+        batch.inputs.extend(inputs)
+        return future
+
+    def _start_flush(self, key: Tuple, batch: _PendingBatch):
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        task = asyncio.create_task(self._flush(batch))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, batch: _PendingBatch):
+        self.counters["upstream_calls"] += 1
+        try:
+            response = await batch.send(batch.inputs)
+            data = sorted(response.get("data") or [], key=lambda item: item.get("index", 0))
+            if len(data) != len(batch.inputs):
+                raise ValueError(f"Upstream returned {len(data)} embeddings for {len(batch.inputs)} inputs")
+        except Exception as e:
+            self.counters["errors"] += 1
+            status_code = getattr(e, "status_code", None)
+            if len(batch.waiters) > 1 and isinstance(status_code, int) and 400 <= status_code < 500 and status_code != 429:
+                logger.warning(f"[Embeddings] Merged call of {len(batch.waiters)} requests rejected ({status_code}), "
+                               f"retrying each request on its own")
+                self.counters["split_batches"] += 1
+                await asyncio.gather(*(self._flush_alone(batch, waiter) for waiter in batch.waiters))
+                return
+            for _, _, _, future in batch.waiters:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        usage = response.get("usage") or {}
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        total_weight = sum(weight for _, _, weight, _ in batch.waiters)
+        assigned = 0
+        for position, (offset, count, weight, future) in enumerate(batch.waiters):
+            if position == len(batch.waiters) - 1:
+                share = prompt_tokens - assigned
+            else:
+                share = prompt_tokens * weight // total_weight
+            assigned += share
+            if future.done():
+                # Caller went away while the batch was in flight
+                continue
+            future.set_result({
+                "data": [{**item, "index": index} for index, item in enumerate(data[offset:offset + count])],
+                "model": response.get("model"),
+                "usage": {"prompt_tokens": share, "total_tokens": share},
+                "batch": {"inputs": len(batch.inputs), "requests": len(batch.waiters)}
+            })
+
+    async def _flush_alone(self, batch: _PendingBatch, waiter: Tuple[int, int, int, asyncio.Future]):
+        offset, count, weight, future = waiter
+        if future.done():
+            return
+        single = _PendingBatch(batch.send)
+        single.inputs = batch.inputs[offset:offset + count]
+        single.waiters = [(0, count, weight, future)]
+        await self._flush(single)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "window_ms": self.window * 1000,
+            "max_inputs": self.max_inputs,
+            "pending_batches": len(self._pending)
+        }
+
+
+# Global batcher instance
+embedding_batcher = EmbeddingBatcher()
@@ -0,0 +1,208 @@
+"""
+Replica selection and outlier ejection for multi-endpoint models
+
+An admin model may list replica endpoints besides its primary one
+(llm_models.endpoints). For every call the proxy picks one replica:
+
+- least_outstanding (default): fewest requests in flight, EWMA latency breaks ties
+- ewma: lowest EWMA latency weighted by requests in flight (peak-EWMA)
+
+A replica is ejected for LLM_POOL_EJECT_SECONDS after LLM_POOL_EJECT_AFTER
+consecutive failures (connect errors, 5xx); repeat ejections back off up to
+LLM_POOL_MAX_EJECT_SECONDS. worker-service check_llm_health publishes
+per-endpoint probe results on LLM_ENDPOINT_HEALTH_CHANNEL: an unhealthy
+report ejects the replica until the next healthy report (or
+LLM_POOL_HEALTH_TTL), a healthy report reinstates it.
+
+If every replica is ejected the pool falls back to all of them rather than
+failing the request.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_POOL_STRATEGY = os.getenv("LLM_POOL_STRATEGY", "least_outstanding")  # least_outstanding | ewma
+LLM_POOL_EJECT_AFTER = int(os.getenv("LLM_POOL_EJECT_AFTER", "3"))
+LLM_POOL_EJECT_SECONDS = float(os.getenv("LLM_POOL_EJECT_SECONDS", "30"))
+LLM_POOL_MAX_EJECT_SECONDS = float(os.getenv("LLM_POOL_MAX_EJECT_SECONDS", "300"))
+# Extra replicas tried for a failed non-streaming call
+LLM_POOL_RETRIES = int(os.getenv("LLM_POOL_RETRIES", "2"))
+# How long an unhealthy report from the health checker keeps a replica out
+LLM_POOL_HEALTH_TTL = float(os.getenv("LLM_POOL_HEALTH_TTL", "600"))
+
+# Published by worker-service check_llm_health, one message per probed endpoint
+LLM_ENDPOINT_HEALTH_CHANNEL = "llm_endpoints:health"
+
+# Weight of the newest latency sample in the EWMA
+EWMA_ALPHA = 0.3
+
+
+def pool_endpoints(primary: str, replicas: Optional[Iterable[str]] = None) -> List[str]:
+    """Primary endpoint followed by its replicas, normalized and de-duplicated"""
+    endpoints: List[str] = []
+    for url in [primary, *(replicas or [])]:
+        url = (url or "").rstrip("/")
+        if url and url not in endpoints:
+            endpoints.append(url)
+    return endpoints
+
+
+class EndpointState:
+    """Load, latency and failure state for one replica"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.ewma_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.counters: Dict[str, int] = {"requests": 0, "failures": 0}
+
+    @property
+    def ejected(self) -> bool:
+        return time.monotonic() < self.ejected_until
+
+    def eject(self, seconds: float, reason: str):
+        self.ejected_until = time.monotonic() + seconds
+        self.ejections += 1
+        logger.warning(f"[Endpoint Pool] Ejected {self.url} for {seconds:.0f}s ({reason})")
+
+    def reinstate(self):
+        if self.ejected:
+            logger.info(f"[Endpoint Pool] Reinstated {self.url}")
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+
+    def observe_latency(self, latency_ms: float):
+        if self.ewma_ms is None:
+            self.ewma_ms = latency_ms
+        else:
+            self.ewma_ms = EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * self.ewma_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "outstanding": self.outstanding,
+            "ewma_ms": round(self.ewma_ms, 2) if self.ewma_ms is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "ejected": self.ejected,
+            "ejections": self.ejections,
+        }
+
+
+class EndpointPool:
+    """Registry of replica state keyed by endpoint URL"""
+
+    def __init__(self, strategy: str = LLM_POOL_STRATEGY):
+        self.strategy = strategy
+        self._states: Dict[str, EndpointState] = {}
+
+    def state(self, url: str) -> EndpointState:
+        url = url.rstrip("/")
+        state = self._states.get(url)
+        if state is None:
+            state = self._states[url] = EndpointState(url)
+        return state
+
+    def _score(self, state: EndpointState) -> tuple:
+        # Replicas without samples yet score as fast so they get probed
+        ewma = state.ewma_ms or 0.0
+        if self.strategy == "ewma":
+            return (ewma * (state.outstanding + 1), state.outstanding)
+        return (state.outstanding, ewma)
+
+    def pick(self, endpoints: List[str], exclude: Iterable[str] = ()) -> Optional[str]:
+        """Best replica not in exclude, or None when all were excluded"""
+        excluded = set(exclude)
+        states = [self.state(url) for url in endpoints if url not in excluded]
+        if not states:
+            return None
+        candidates = [state for state in states if not state.ejected] or states
+        # Shuffle first so equal scores spread across replicas
+        random.shuffle(candidates)
+        return min(candidates, key=self._score).url
+
+    def on_start(self, url: str) -> float:
+        """Mark a request in flight on url; returns its start time"""
+        state = self.state(url)
+        state.outstanding += 1
+        state.counters["requests"] += 1
+        return time.monotonic()
+
+    def on_finish(self, url: str, started: float, success: bool):
+        state = self.state(url)
+        state.outstanding = max(0, state.outstanding - 1)
+        if success:
+            state.observe_latency((time.monotonic() - started) * 1000)
+            state.consecutive_failures = 0
+            return
+        state.counters["failures"] += 1
+        state.consecutive_failures += 1
+        if state.consecutive_failures >= LLM_POOL_EJECT_AFTER and not state.ejected:
+            backoff = min(LLM_POOL_EJECT_SECONDS * 2 ** min(state.ejections, 10), LLM_POOL_MAX_EJECT_SECONDS)
+            state.eject(backoff, f"{state.consecutive_failures} consecutive failures")
+
+    def on_abandon(self, url: str):
+        """The caller gave up on a request to url (e.g. client disconnect); not held against the replica"""
+        state = self.state(url)
+        state.outstanding = max(0, state.outstanding - 1)
+
+    async def track_stream(self, stream: AsyncIterator, url: str, upstream: Dict[str, Any]) -> AsyncIterator:
+        """
+        Wrap a streaming generator so url counts as busy until the stream ends
+
+        The stream fills in upstream as it runs: "status_code" once the
+        upstream answered and "error" if the call failed. A 5xx, an error or
+        no answer at all counts as a failure, like the non-streaming path.
+        """
+        started = self.on_start(url)
+        success = None
+        try:
+            async for chunk in stream:
+                yield chunk
+            status_code = upstream.get("status_code")
+            success = "error" not in upstream and status_code is not None and status_code < 500
+        except (GeneratorExit, asyncio.CancelledError):
+            raise
+        except Exception:
+            success = False
+            raise
+        finally:
+            if success is None:
+                self.on_abandon(url)
+            else:
+                self.on_finish(url, started, success)
+            await stream.aclose()
+
+    def handle_health_event(self, message: str):
+        """Redis pub/sub handler for LLM_ENDPOINT_HEALTH_CHANNEL"""
+        try:
+            event = json.loads(message)
+            url = event["endpoint"]
+        except (TypeError, ValueError, KeyError):
+            logger.warning(f"[Endpoint Pool] Ignoring malformed health event: {message}")
+            return
+        state = self.state(url)
+        if event.get("healthy"):
+            state.reinstate()
+            if state.ewma_ms is None and event.get("response_time_ms") is not None:
+                state.observe_latency(float(event["response_time_ms"]))
+        elif not state.ejected:
+            state.eject(LLM_POOL_HEALTH_TTL, f"health check: {event.get('error') or 'unhealthy'}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "endpoints": {url: state.stats() for url, state in self._states.items()}
+        }
+
+
+# Global replica state
+endpoint_pool = EndpointPool()
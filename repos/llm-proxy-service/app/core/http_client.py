@@ -0,0 +1,202 @@
+"""
+Pooled upstream HTTP clients for LLM providers and internal services
+
+One long-lived httpx.AsyncClient is kept per upstream origin (scheme://host:port)
+so every completion reuses warm TCP/TLS connections instead of paying a fresh
+handshake. Clients are created lazily and closed in the application lifespan.
+"""
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "true").lower() == "true"
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "60"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "10"))
+
+# Number of recent requests kept for handshake percentile calculation
+HANDSHAKE_SAMPLE_SIZE = 1000
+
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class PoolProfile:
+    """Connection pool settings for a class of upstream"""
+    max_connections: int
+    max_keepalive_connections: int
+    timeout: float
+
+
+# Per-provider pool limits (override with <PROVIDER>_POOL_MAX_CONNECTIONS etc.)
+def _profile(prefix: str, max_connections: int, max_keepalive: int, timeout: float) -> PoolProfile:
+    return PoolProfile(
+        max_connections=int(os.getenv(f"{prefix}_POOL_MAX_CONNECTIONS", str(max_connections))),
+        max_keepalive_connections=int(os.getenv(f"{prefix}_POOL_MAX_KEEPALIVE", str(max_keepalive))),
+        timeout=float(os.getenv(f"{prefix}_TIMEOUT", str(timeout))),
+    )
+
+
+POOL_PROFILES: Dict[str, PoolProfile] = {
+    "openai": _profile("OPENAI", 100, 20, 300.0),
+    "openai-compatible": _profile("CUSTOM", 100, 20, 300.0),
+    "gemini": _profile("GEMINI", 100, 20, 300.0),
+    "anthropic": _profile("ANTHROPIC", 100, 20, 300.0),
+    # tracing-service, user-service, agent-service
+    "internal": _profile("INTERNAL", 50, 20, 5.0),
+}
+
+
+def normalize_provider(provider: Optional[str]) -> str:
+    """Map provider aliases to a pool profile name"""
+    if provider in ("openai_compatible", "openai-compatible"):
+        return "openai-compatible"
+    if provider in POOL_PROFILES:
+        return provider
+    return "openai-compatible" if provider else "internal"
+
+
+def _origin(url: str) -> str:
+    """Return scheme://host:port for a URL (the pooling key)"""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+@dataclass
+class UpstreamPoolStats:
+    """Connection reuse counters for one upstream origin"""
+    provider: str
+    requests: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+    handshake_ms_total: float = 0.0
+    http2_responses: int = 0
+    # Per-request handshake cost in ms (0 when the connection was reused)
+    recent_handshake_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=HANDSHAKE_SAMPLE_SIZE))
+
+    def record(self, new_connection: bool, handshake_ms: float, http_version: str):
+        self.requests += 1
+        if new_connection:
+            self.new_connections += 1
+            self.handshake_ms_total += handshake_ms
+        else:
+            self.reused_connections += 1
+        if http_version == "HTTP/2":
+            self.http2_responses += 1
+        self.recent_handshake_ms.append(handshake_ms if new_connection else 0.0)
+
+    def _percentile(self, pct: float) -> float:
+        if not self.recent_handshake_ms:
+            return 0.0
+        samples = sorted(self.recent_handshake_ms)
+        return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": round(self.reused_connections / self.requests, 4) if self.requests else 0.0,
+            "http2_responses": self.http2_responses,
+            "avg_handshake_ms": round(self.handshake_ms_total / self.new_connections, 2) if self.new_connections else 0.0,
+            "p50_handshake_ms": round(self._percentile(0.50), 2),
+            "p95_handshake_ms": round(self._percentile(0.95), 2),
+        }
+
+
+class _RequestTrace:
+    """httpcore trace callback recording whether a request opened a new connection"""
+    __slots__ = ("new_connection", "connect_started", "handshake_ms")
+
+    def __init__(self):
+        self.new_connection = False
+        self.connect_started = 0.0
+        self.handshake_ms = 0.0
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.started":
+            self.new_connection = True
+            self.connect_started = time.perf_counter()
+        elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            # start_tls completes after connect_tcp, so TLS cost is included when present
+            self.handshake_ms = (time.perf_counter() - self.connect_started) * 1000
+
+
+class UpstreamClientRegistry:
+    """Lifespan-managed registry of pooled clients keyed by upstream origin"""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, UpstreamPoolStats] = {}
+
+    def get_client(self, url: str, provider: Optional[str] = "internal") -> httpx.AsyncClient:
+        """Get (or lazily create) the pooled client for the origin of url"""
+        origin = _origin(url)
+        client = self._clients.get(origin)
+        if client is not None and not client.is_closed:
+            return client
+
+        profile_name = normalize_provider(provider)
+        profile = POOL_PROFILES[profile_name]
+        stats = self._stats.setdefault(origin, UpstreamPoolStats(provider=profile_name))
+
+        async def on_request(request: httpx.Request):
+            request.extensions["trace"] = _RequestTrace()
+
+        async def on_response(response: httpx.Response):
+            trace = response.request.extensions.get("trace")
+            if isinstance(trace, _RequestTrace):
+                stats.record(trace.new_connection, trace.handshake_ms, response.http_version)
+
+        client = httpx.AsyncClient(
+            http2=UPSTREAM_HTTP2 and _HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(profile.timeout, connect=UPSTREAM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=profile.max_connections,
+                max_keepalive_connections=profile.max_keepalive_connections,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"request": [on_request], "response": [on_response]},
+        )
+        self._clients[origin] = client
+        logger.info(
+            f"[Upstream Pool] Created client for {origin} (provider={profile_name}, "
+            f"http2={UPSTREAM_HTTP2 and _HTTP2_AVAILABLE}, max_connections={profile.max_connections})"
+        )
+        return client
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Connection-reuse metrics per upstream origin"""
+        return {origin: stats.to_dict() for origin, stats in self._stats.items()}
+
+    async def close(self):
+        """Close all pooled clients"""
+        for origin, client in self._clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"[Upstream Pool] Failed to close client for {origin}: {e}")
+        self._clients.clear()
+        logger.info("[Upstream Pool] All upstream clients closed")
+
+
+# Global registry instance
+upstream_clients = UpstreamClientRegistry()
+
+
+def get_upstream_client(url: str, provider: Optional[str] = "internal") -> httpx.AsyncClient:
+    """Shortcut for upstream_clients.get_client"""
+    return upstream_clients.get_client(url, provider)
@@ -0,0 +1,199 @@
+"""
+Platform API key validation cache
+
+Validated keys are cached by the SHA-256 of the key so hot keys skip the
+user-service round trip entirely. Invalid keys are negatively cached for a
+short time, and user-service pushes revocations over Redis pub/sub.
+
+last_used timestamps are coalesced in memory and flushed to user-service
+as one batched UPDATE per interval instead of one write per request.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from .http_client import get_upstream_client
+
+logger = logging.getLogger(__name__)
+
+# User Service endpoint for API key validation
+USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://localhost:8001")
+
+PLATFORM_KEY_CACHE_TTL = float(os.getenv("PLATFORM_KEY_CACHE_TTL", "60"))
+PLATFORM_KEY_NEGATIVE_TTL = float(os.getenv("PLATFORM_KEY_NEGATIVE_TTL", "10"))
+PLATFORM_KEY_CACHE_SIZE = int(os.getenv("PLATFORM_KEY_CACHE_SIZE", "10000"))
+LAST_USED_FLUSH_INTERVAL = float(os.getenv("LAST_USED_FLUSH_INTERVAL", "30"))
+
+# Published by user-service when delete_platform_key runs
+PLATFORM_KEYS_REVOKED_CHANNEL = "platform_keys:revoked"
+
+
+def hash_key(api_key: str) -> str:
+    """SHA-256 of a platform key (raw keys are never used as cache keys)"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class PlatformKeyCache:
+    """Positive/negative validation cache with batched last_used reporting"""
+
+    def __init__(self):
+        # key_hash -> (user_info or None for invalid keys, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]]" = OrderedDict()
+        # key_hash -> in-flight validation, so concurrent misses share one call
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # key_hash -> revocation generation, held while a validation is in flight
+        self._generations: Dict[str, int] = {}
+        # key_id -> most recent use, flushed in batches
+        self._pending_last_used: Dict[int, datetime] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    async def validate(self, api_key: str) -> Optional[Dict[str, Any]]:
+        """Return user info for a valid key, None otherwise"""
+        key_hash = hash_key(api_key)
+
+        entry = self._entries.get(key_hash)
+        if entry is not None:
+            user_info, expires_at = entry
+            if expires_at > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key_hash)
+                if user_info:
+                    self._touch(user_info)
+                return user_info
+            del self._entries[key_hash]
+
+        self.misses += 1
+        inflight = self._inflight.get(key_hash)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key_hash] = future
+        self._generations[key_hash] = 0
+        user_info = None
+        try:
+            user_info, cacheable = await self._fetch(api_key)
+            if self._generations[key_hash]:
+                # Revoked while user-service was answering; keep the revocation
+                user_info, cacheable = None, False
+            if cacheable:
+                ttl = PLATFORM_KEY_CACHE_TTL if user_info else PLATFORM_KEY_NEGATIVE_TTL
+                self._store(key_hash, user_info, ttl)
+            if user_info:
+                self._touch(user_info)
+        finally:
+            del self._inflight[key_hash]
+            del self._generations[key_hash]
+            future.set_result(user_info)
+        return user_info
+
+    async def _fetch(self, api_key: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Validate with user-service. Returns (user_info, cacheable)"""
+        try:
+            client = get_upstream_client(USER_SERVICE_URL)
+            # touch=false: last_used is reported in batches by this cache
+            response = await client.get(
+                f"{USER_SERVICE_URL}/api/v1/platform-keys/validate",
+                params={"touch": "false"},
+                headers={"Authorization": f"Bearer {api_key}"}
+            )
+        except Exception as e:
+            logger.error(f"[API Key] Validation error: {e}")
+            return None, False
+
+        if response.status_code == 200:
+            user_info = response.json()
+            logger.info(f"[API Key] Validated successfully for user_id={user_info.get('user_id')}")
+            return user_info, True
+
+        logger.warning(f"[API Key] Validation failed: status={response.status_code}")
+        # Only a definitive rejection is negatively cached; 5xx is retried next call
+        return None, response.status_code in (401, 403)
+
+    def _store(self, key_hash: str, user_info: Optional[Dict[str, Any]], ttl: float):
+        self._entries[key_hash] = (user_info, time.monotonic() + ttl)
+        self._entries.move_to_end(key_hash)
+        while len(self._entries) > PLATFORM_KEY_CACHE_SIZE:
+            self._entries.popitem(last=False)
+
+    def _touch(self, user_info: Dict[str, Any]):
+        key_id = user_info.get("key_id")
+        if key_id is not None:
+            self._pending_last_used[key_id] = datetime.utcnow()
+
+    def revoke(self, key_hash: str):
+        """Drop a key and negatively cache it (also overriding a validation in flight)"""
+        if key_hash in self._generations:
+            self._generations[key_hash] += 1
+        self._entries.pop(key_hash, None)
+        self._store(key_hash, None, PLATFORM_KEY_NEGATIVE_TTL)
+
+    def handle_revocation(self, message: str):
+        """Redis pub/sub handler for PLATFORM_KEYS_REVOKED_CHANNEL"""
+        try:
+            event = json.loads(message)
+        except (TypeError, ValueError):
+            logger.warning(f"[API Key] Ignoring malformed revocation event: {message!r}")
+            return
+        key_hash = event.get("key_hash")
+        if key_hash:
+            self.revoke(key_hash)
+            logger.info(f"[API Key] Revoked key_id={event.get('key_id')} from validation cache")
+
+    async def flush_last_used(self):
+        """Send pending last_used timestamps to user-service in one request"""
+        if not self._pending_last_used:
+            return
+        pending, self._pending_last_used = self._pending_last_used, {}
+        try:
+            client = get_upstream_client(USER_SERVICE_URL)
+            response = await client.post(
+                f"{USER_SERVICE_URL}/api/internal/platform-keys/last-used",
+                json={"updates": [
+                    {"key_id": key_id, "last_used": last_used.isoformat()}
+                    for key_id, last_used in pending.items()
+                ]}
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"status={response.status_code}")
+            logger.debug(f"[API Key] Flushed last_used for {len(pending)} keys")
+        except Exception as e:
+            logger.error(f"[API Key] Failed to flush last_used for {len(pending)} keys: {e}")
+            # Keep the newest timestamp per key for the next attempt
+            for key_id, last_used in pending.items():
+                current = self._pending_last_used.get(key_id)
+                if current is None or current < last_used:
+                    self._pending_last_used[key_id] = last_used
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(LAST_USED_FLUSH_INTERVAL)
+            await self.flush_last_used()
+
+    def start(self):
+        """Start the periodic last_used flusher"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and send any remaining timestamps"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush_last_used()
+
+
+# Global cache instance
+platform_key_cache = PlatformKeyCache()
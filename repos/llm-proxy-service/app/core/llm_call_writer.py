@@ -0,0 +1,181 @@
+"""
+Write-behind buffers for LLMCall and TraceEvent records
+
+Completions hand their rows to a buffer and return immediately; a
+background task bulk-inserts buffered rows when LLM_CALL_BATCH_SIZE rows
+are waiting or every LLM_CALL_FLUSH_INTERVAL seconds. Buffers are drained
+from the application lifespan hook on graceful shutdown.
+
+A batch that fails LLM_CALL_MAX_RETRIES flushes in a row is bisected so the
+rows that can't be inserted on their own are logged and dropped instead of
+blocking the buffer. Rows are only dropped while the database answers; during
+an outage the batch stays buffered.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, text
+
+from .database import LLMCall, TraceEvent, async_session_maker
+
+logger = logging.getLogger(__name__)
+
+LLM_CALL_BATCH_SIZE = int(os.getenv("LLM_CALL_BATCH_SIZE", "500"))
+LLM_CALL_FLUSH_INTERVAL = float(os.getenv("LLM_CALL_FLUSH_INTERVAL", "1.0"))
+# Rows kept while the database is unavailable before the oldest are dropped
+LLM_CALL_MAX_BUFFER = int(os.getenv("LLM_CALL_MAX_BUFFER", "50000"))
+# Failed flushes of the same batch before it is bisected to find bad rows
+LLM_CALL_MAX_RETRIES = int(os.getenv("LLM_CALL_MAX_RETRIES", "3"))
+
+
+class RowWriter:
+    """Accumulates rows for one table and flushes them with one bulk INSERT"""
+
+    def __init__(
+        self,
+        model: type = LLMCall,
+        label: str = "LLM calls",
+        batch_size: int = LLM_CALL_BATCH_SIZE,
+        flush_interval: float = LLM_CALL_FLUSH_INTERVAL,
+        max_buffer: int = LLM_CALL_MAX_BUFFER,
+        max_retries: int = LLM_CALL_MAX_RETRIES
+    ):
+        self.model = model
+        self.label = label
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_retries = max(1, max_retries)
+        self._failures = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.counters: Dict[str, int] = {"buffered": 0, "written": 0, "dropped": 0, "failed_flushes": 0}
+
+    def add(self, row: Dict[str, Any]):
+        """Buffer one row (column name -> value, same keys for every row); never blocks"""
+        self._buffer.append(row)
+        self.counters["buffered"] += 1
+        if len(self._buffer) > self.max_buffer:
+            overflow = len(self._buffer) - self.max_buffer
+            del self._buffer[:overflow]
+            self.counters["dropped"] += overflow
+            logger.error(f"[DB] {self.label} buffer full, dropped {overflow} oldest rows")
+        if len(self._buffer) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "pending": len(self._buffer)}
+
+    async def flush(self):
+        """Insert everything currently buffered (in batch_size chunks)"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:len(batch)]
+                self.on_flushing(batch)
+                try:
+                    await self._insert(batch)
+                    self._failures = 0
+                    self.counters["written"] += len(batch)
+                    logger.info(f"[DB] Flushed {len(batch)} {self.label}")
+                    continue
+                except asyncio.CancelledError:
+                    self._buffer[:0] = batch
+                    raise
+                except Exception as e:
+                    self._failures += 1
+                    self.counters["failed_flushes"] += 1
+                    if self._failures < self.max_retries:
+                        logger.error(f"[DB] Failed to flush {len(batch)} {self.label}, will retry: {e}")
+                        # Put the batch back in front and retry on the next tick
+                        self._buffer[:0] = batch
+                        return
+                    logger.error(f"[DB] Failed to flush {len(batch)} {self.label} {self._failures} times, "
+                                 f"isolating rows that can't be inserted: {e}")
+                self._failures = 0
+                unwritten = await self._isolate(batch)
+                if unwritten:
+                    # Database is down rather than the rows being bad
+                    self._buffer[:0] = unwritten
+                    return
+
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        async with async_session_maker() as session:
+            await session.execute(insert(self.model), rows)
+            await session.commit()
+
+    async def _isolate(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insert rows by halves, dropping each row that fails on its own
+
+        Returns the rows left unwritten because the database stopped answering.
+        """
+        try:
+            await self._insert(rows)
+            self.counters["written"] += len(rows)
+            return []
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        if len(rows) > 1:
+            middle = len(rows) // 2
+            unwritten = await self._isolate(rows[:middle])
+            if unwritten:
+                return unwritten + rows[middle:]
+            return await self._isolate(rows[middle:])
+        if not await self._database_up():
+            return rows
+        self.counters["dropped"] += 1
+        logger.error(f"[DB] Dropping 1 of the {self.label} that can't be inserted: {error} - row: {rows[0]!r:.500}")
+        return []
+
+    async def _database_up(self) -> bool:
+        try:
+            async with async_session_maker() as session:
+                await session.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    def on_flushing(self, batch: List[Dict[str, Any]]):
+        """Called with each batch as it leaves the buffer, before its INSERT"""
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the background flusher"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and drain the buffer"""
+        if self._task:
+            # Let an in-progress flush finish instead of cancelling it mid-INSERT
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            logger.error(f"[DB] {len(self._buffer)} {self.label} could not be written before shutdown")
+
+
+# Global writer instances
+llm_call_writer = RowWriter(LLMCall, "LLM calls")
+trace_event_writer = RowWriter(TraceEvent, "trace events")
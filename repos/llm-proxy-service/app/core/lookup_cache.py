@@ -0,0 +1,163 @@
+"""
+Caches for per-request identity lookups on the completion path
+
+- session_trace_cache: session_id -> trace_id (chat-service Redis mapping)
+- trace_agent_cache: trace_id -> {"id", "status"} (agent-service by-trace-id)
+
+Both are small LRU maps with a TTL. Concurrent misses for one key share a
+single lookup. Only successful lookups are cached, so a session or agent
+created a moment after a miss is picked up on the next call. Owners push
+changes over Redis pub/sub: chat-service when a session is deleted,
+agent-service when an agent's trace_id or status changes or it is deleted.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from .http_client import get_upstream_client
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+AGENT_SERVICE_URL = os.getenv("AGENT_SERVICE_URL", "http://agent-service:8002")
+
+LOOKUP_CACHE_TTL = float(os.getenv("LOOKUP_CACHE_TTL", "60"))
+LOOKUP_CACHE_SIZE = int(os.getenv("LOOKUP_CACHE_SIZE", "10000"))
+
+# Published by chat-service delete_session_trace
+CHAT_SESSIONS_DELETED_CHANNEL = "chat_sessions:deleted"
+# Published by agent-service when trace_id/status change or the agent is deleted
+AGENTS_CHANGED_CHANNEL = "agents:changed"
+
+
+class LookupCache:
+    """Async LRU + TTL cache with single-flight loading"""
+
+    def __init__(self, name: str, ttl: float = LOOKUP_CACHE_TTL, max_size: int = LOOKUP_CACHE_SIZE):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        # key -> (value, expires_at), least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        # key -> in-flight load, so concurrent misses share one lookup
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Bumped on every invalidation so an in-flight load can't store a stale value
+        self._generation = 0
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for key, calling load() on a miss (None results are not cached)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self.counters["hits"] += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            del self._entries[key]
+
+        self.counters["misses"] += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        value = None
+        try:
+            value = await load()
+            if value is not None and generation == self._generation:
+                self._entries[key] = (value, time.monotonic() + self.ttl)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        finally:
+            del self._inflight[key]
+            future.set_result(value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        self._generation += 1
+        self.counters["invalidations"] += 1
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]):
+        """Drop every entry for which predicate(key, value) is true"""
+        self._generation += 1
+        for key in [key for key, (value, _) in self._entries.items() if predicate(key, value)]:
+            self.counters["invalidations"] += 1
+            del self._entries[key]
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "size": len(self._entries), "ttl": self.ttl, "max_size": self.max_size}
+
+
+session_trace_cache = LookupCache("session_trace")
+trace_agent_cache = LookupCache("trace_agent")
+
+
+async def lookup_session_trace(session_id: str) -> Optional[str]:
+    """trace_id mapped to a chat session, or None"""
+    return await session_trace_cache.get(session_id, lambda: redis_client.get_session_trace(session_id))
+
+
+async def _fetch_trace_agent(trace_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        client = get_upstream_client(AGENT_SERVICE_URL)
+        response = await client.get(f"{AGENT_SERVICE_URL}/api/internal/agents/by-trace-id/{trace_id}")
+    except Exception as e:
+        logger.error(f"[Lookup Cache] Failed to lookup agent for trace_id={trace_id}: {e}")
+        return None
+    if response.status_code != 200:
+        logger.warning(f"[Lookup Cache] Agent Service returned {response.status_code} for trace_id={trace_id}")
+        return None
+    agent = response.json().get("agent")
+    if not agent or not agent.get("id"):
+        logger.warning(f"[Lookup Cache] No agent found for trace_id={trace_id}")
+        return None
+    return {"id": str(agent["id"]), "status": agent.get("status")}
+
+
+async def lookup_trace_agent(trace_id: str) -> Optional[Dict[str, Any]]:
+    """{"id", "status"} of the agent owning trace_id, or None if unknown / lookup failed"""
+    return await trace_agent_cache.get(trace_id, lambda: _fetch_trace_agent(trace_id))
+
+
+def _parse_event(message: str, label: str) -> Optional[Dict[str, Any]]:
+    try:
+        event = json.loads(message)
+    except (TypeError, ValueError):
+        event = None
+    if not isinstance(event, dict):
+        logger.warning(f"[Lookup Cache] Ignoring malformed {label} event: {message!r}")
+        return None
+    return event
+
+
+def handle_session_deleted(message: str):
+    """Redis pub/sub handler for CHAT_SESSIONS_DELETED_CHANNEL"""
+    event = _parse_event(message, "session")
+    if event and event.get("session_id"):
+        session_trace_cache.invalidate(event["session_id"])
+        logger.info(f"[Lookup Cache] Dropped session_id={event['session_id']}")
+
+
+def handle_agent_changed(message: str):
+    """Redis pub/sub handler for AGENTS_CHANGED_CHANNEL"""
+    event = _parse_event(message, "agent")
+    if not event:
+        return
+    trace_ids = {trace_id for trace_id in event.get("trace_ids", []) if trace_id}
+    agent_id = event.get("agent_id")
+    agent_id = str(agent_id) if agent_id is not None else None
+    trace_agent_cache.invalidate_where(
+        lambda trace_id, agent: trace_id in trace_ids or (agent_id is not None and agent["id"] == agent_id)
+    )
+    logger.info(f"[Lookup Cache] Dropped agent_id={agent_id} ({event.get('action')})")
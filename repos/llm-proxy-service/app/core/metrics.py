@@ -0,0 +1,317 @@
+"""
+Prometheus metrics for the completion hot path
+
+Rendered in the Prometheus text exposition format at GET /metrics. The
+collectors are kept in-process and hand-rolled (label tuple -> value), so
+recording an observation is a dict lookup and a bisect, with no extra
+dependency.
+
+Latency and throughput histograms are labelled by provider, model (admin
+registered name) and route (chat | trace | session). The labels live on a
+per-request RequestMetrics held in a contextvar: the endpoint starts it with
+track_request() and fills in provider/model once the model is resolved, so
+code deeper in the call (concurrency limiter, stream generators,
+save_llm_call_to_db) records against it without extra arguments.
+
+Full request/response payload logging is sampled per request
+(LOG_PAYLOAD_SAMPLE_RATE) instead of running json.dumps on every call; see
+log_payloads().
+"""
+import bisect
+import contextvars
+import logging
+import os
+import random
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fraction of requests whose request/response payloads are logged (0 = never).
+# Payloads are always logged when the calling module's logger is at DEBUG.
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500)
+
+REQUEST_LABELS = ("provider", "model", "route")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple[str, ...] = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class CallbackCounter:
+    """Counter whose value is read from another component at scrape time"""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {_format_value(self.read())}"
+        ]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, labels: Tuple[str, ...] = ()) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ordered set of collectors rendered together"""
+
+    def __init__(self):
+        self._collectors: list = []
+
+    def register(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for collector in self._collectors:
+            try:
+                lines.extend(collector.render())
+            except Exception as e:
+                logger.error(f"[Metrics] Failed to render {collector.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+time_to_first_token = registry.register(Histogram(
+    "llm_proxy_time_to_first_token_seconds",
+    "Time from request arrival to the first streamed content or tool-call token",
+    REQUEST_LABELS
+))
+request_duration = registry.register(Histogram(
+    "llm_proxy_request_duration_seconds",
+    "Time from request arrival until the completion (or stream) finished",
+    REQUEST_LABELS
+))
+upstream_duration = registry.register(Histogram(
+    "llm_proxy_upstream_duration_seconds",
+    "Duration of the upstream provider call",
+    REQUEST_LABELS
+))
+queue_wait = registry.register(Histogram(
+    "llm_proxy_queue_wait_seconds",
+    "Time spent waiting for an upstream concurrency slot",
+    REQUEST_LABELS,
+    QUEUE_WAIT_BUCKETS
+))
+tokens_per_second = registry.register(Histogram(
+    "llm_proxy_tokens_per_second",
+    "Completion tokens per second of generation (after the first token for streams)",
+    REQUEST_LABELS,
+    TOKENS_PER_SECOND_BUCKETS
+))
+tokens = registry.register(Counter(
+    "llm_proxy_tokens_total",
+    "Upstream tokens used, by kind (prompt | completion)",
+    REQUEST_LABELS + ("kind",)
+))
+errors = registry.register(Counter(
+    "llm_proxy_errors_total",
+    "Failed completion requests, by error type",
+    REQUEST_LABELS + ("type",)
+))
+cache_hits = registry.register(Counter(
+    "llm_proxy_cache_hits_total",
+    "Completions answered without an upstream call, by source (response_cache | single_flight)",
+    REQUEST_LABELS + ("source",)
+))
+cache_misses = registry.register(Counter(
+    "llm_proxy_cache_misses_total",
+    "Cacheable requests not found in the response cache",
+    REQUEST_LABELS
+))
+
+
+class RequestMetrics:
+    """Labels and timestamps for the completion request being handled"""
+    __slots__ = ("route", "provider", "model", "started", "first_token_at", "log_payloads")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.provider = "unknown"
+        self.model = "unknown"
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.log_payloads = LOG_PAYLOAD_SAMPLE_RATE > 0 and random.random() < LOG_PAYLOAD_SAMPLE_RATE
+
+    @property
+    def labels(self) -> Tuple[str, str, str]:
+        return (self.provider, self.model, self.route)
+
+
+_current_request: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar(
+    "request_metrics", default=None
+)
+
+
+def track_request(route: str) -> RequestMetrics:
+    """
+    Start timing a completion request on the given route
+
+    A handler that forwards to another handler keeps the request it already
+    started, so the route label is the one the client called.
+    """
+    request_metrics = _current_request.get()
+    if request_metrics is None:
+        request_metrics = RequestMetrics(route)
+        _current_request.set(request_metrics)
+    return request_metrics
+
+
+def _labels(provider: Optional[str] = None, model: Optional[str] = None) -> Tuple[str, str, str]:
+    request_metrics = _current_request.get()
+    if request_metrics is not None:
+        return request_metrics.labels
+    return (provider or "unknown", model or "unknown", "direct")
+
+
+def observe_first_token():
+    """Record time to first token; only the first call per request counts"""
+    request_metrics = _current_request.get()
+    if request_metrics is None or request_metrics.first_token_at is not None:
+        return
+    request_metrics.first_token_at = time.perf_counter()
+    time_to_first_token.observe(request_metrics.labels, request_metrics.first_token_at - request_metrics.started)
+
+
+def observe_queue_wait(seconds: float):
+    queue_wait.observe(_labels(), seconds)
+
+
+def record_cache_miss():
+    cache_misses.inc(_labels())
+
+
+def record_error(error_type: str, provider: Optional[str] = None, model: Optional[str] = None):
+    errors.inc(_labels(provider, model) + (error_type,))
+
+
+def record_completion(
+    provider: str,
+    model: str,
+    latency_ms: int,
+    usage: Dict[str, int],
+    cache_source: Optional[str] = None
+):
+    """Record a finished completion (called once per LLMCall row)"""
+    request_metrics = _current_request.get()
+    labels = _labels(provider, model)
+    now = time.perf_counter()
+    if request_metrics is not None:
+        request_duration.observe(labels, now - request_metrics.started)
+
+    if cache_source:
+        cache_hits.inc(labels + (cache_source,))
+        return
+
+    upstream_duration.observe(labels, latency_ms / 1000)
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    completion_tokens = usage.get("completion_tokens") or 0
+    if prompt_tokens:
+        tokens.inc(labels + ("prompt",), prompt_tokens)
+    if completion_tokens:
+        tokens.inc(labels + ("completion",), completion_tokens)
+        # Decode rate: measured from the first token when the response streamed
+        if request_metrics is not None and request_metrics.first_token_at is not None:
+            generation_seconds = now - request_metrics.first_token_at
+        else:
+            generation_seconds = latency_ms / 1000
+        if generation_seconds > 0:
+            tokens_per_second.observe(labels, completion_tokens / generation_seconds)
+
+
+def log_payloads(log: logging.Logger) -> bool:
+    """Whether the current request was sampled for payload logging (or log is at DEBUG)"""
+    request_metrics = _current_request.get()
+    if request_metrics is not None and request_metrics.log_payloads:
+        return True
+    return log.isEnabledFor(logging.DEBUG)
+
+
+def render_metrics() -> str:
+    return registry.render()
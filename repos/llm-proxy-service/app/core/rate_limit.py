@@ -0,0 +1,316 @@
+"""
+Token-aware request/token rate limits per platform key, user, agent and model
+
+Every completion is checked against requests-per-minute and tokens-per-minute
+budgets for each scope it belongs to:
+
+- key:<platform key id>
+- user:<user id>
+- agent:<trace_id, or X-Agent-ID when there is no trace>
+- model:<admin registered model name> (protects the shared provider key)
+
+Limits use a Redis sliding-window counter: per scope, one hash per fixed
+minute holds request and token counts, and usage is the current minute plus
+the previous minute weighted by how much of it still overlaps the window. The
+check and the increment run in one Lua script, so concurrent proxies can't
+overshoot together.
+
+Token cost is reserved up front (estimated prompt tokens + max_tokens) and
+reconciled with actual usage when the LLMCall is recorded. A request that
+ends without recording one (errors, upstream non-200 on a stream, a client
+that goes away mid-stream) has its reservation refunded when the handler or
+its stream finishes. A request larger than a scope's whole TPM budget is
+still admitted into an empty window.
+
+Limits come from LLM_RATE_LIMITS (defaults per scope type) and
+LLM_RATE_LIMIT_OVERRIDES (per scope), e.g.
+    LLM_RATE_LIMITS='{"key": {"rpm": 600, "tpm": 400000}, "agent": {"tpm": 100000}}'
+    LLM_RATE_LIMIT_OVERRIDES='{"model:gpt-4o": {"tpm": 800000}, "user:7": {"rpm": 0}}'
+0 or a missing value means unlimited. If Redis is unavailable requests are
+admitted (fail open).
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import math
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from fastapi.responses import StreamingResponse
+
+from .redis_client import redis_client
+from .token_estimator import estimate_prompt_tokens
+
+logger = logging.getLogger(__name__)
+
+LLM_RATE_LIMITS: Dict[str, Dict[str, int]] = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+LLM_RATE_LIMIT_OVERRIDES: Dict[str, Dict[str, int]] = json.loads(os.getenv("LLM_RATE_LIMIT_OVERRIDES", "{}"))
+RATE_LIMIT_WINDOW = 60
+RATE_LIMIT_KEY_PREFIX = "ratelimit:"
+
+# KEYS: current and previous window hash per scope
+# ARGV: previous-window weight, token cost, key ttl, then rpm/tpm per scope
+# Returns [admitted, cur_req, cur_tok, prev_req, prev_tok, ...] (usage before this request)
+_SLIDING_WINDOW_SCRIPT = """
+local weight = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+local result = {1}
+local admitted = true
+for i = 1, #KEYS / 2 do
+    local cur = redis.call('HMGET', KEYS[2 * i - 1], 'req', 'tok')
+    local prev = redis.call('HMGET', KEYS[2 * i], 'req', 'tok')
+    local cur_req, cur_tok = tonumber(cur[1]) or 0, tonumber(cur[2]) or 0
+    local prev_req, prev_tok = tonumber(prev[1]) or 0, tonumber(prev[2]) or 0
+    local req = cur_req + weight * prev_req
+    local tok = cur_tok + weight * prev_tok
+    local rpm, tpm = tonumber(ARGV[2 + 2 * i]), tonumber(ARGV[3 + 2 * i])
+    if (rpm > 0 and req + 1 > rpm) or (tpm > 0 and tok > 0 and tok + cost > tpm) then
+        admitted = false
+    end
+    table.insert(result, cur_req)
+    table.insert(result, cur_tok)
+    table.insert(result, prev_req)
+    table.insert(result, prev_tok)
+end
+if admitted then
+    for i = 1, #KEYS / 2 do
+        redis.call('HINCRBY', KEYS[2 * i - 1], 'req', 1)
+        redis.call('HINCRBY', KEYS[2 * i - 1], 'tok', cost)
+        redis.call('EXPIRE', KEYS[2 * i - 1], ttl)
+    end
+else
+    result[1] = 0
+end
+return result
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would exceed a scope's RPM or TPM budget"""
+
+    def __init__(self, scope: str, kind: str, retry_after: int, headers: Dict[str, str]):
+        super().__init__(f"Rate limit exceeded for {scope} ({kind} per minute)")
+        self.scope = scope
+        self.kind = kind
+        self.retry_after = retry_after
+        self.headers = {**headers, "Retry-After": str(retry_after)}
+
+
+class RateLimitTicket:
+    """An admitted request's reservation, reconciled once with actual usage"""
+
+    def __init__(self, window_keys: List[str], reserved_tokens: int, headers: Dict[str, str]):
+        self.window_keys = window_keys
+        self.reserved_tokens = reserved_tokens
+        self.headers = headers
+        self.reconciled = False
+
+    def apply(self, result: Any, response: Any) -> Any:
+        """Attach x-ratelimit-* headers to a StreamingResponse or the endpoint's Response"""
+        target = result if hasattr(result, "headers") else response
+        target.headers.update(self.headers)
+        return result
+
+
+# The admitted ticket for the request being handled; read back when its LLMCall is recorded
+_current_ticket: contextvars.ContextVar[Optional[RateLimitTicket]] = contextvars.ContextVar(
+    "rate_limit_ticket", default=None
+)
+
+
+def _format_reset(seconds: float) -> str:
+    return f"{max(0, math.ceil(seconds))}s"
+
+
+class RateLimiter:
+    """Redis sliding-window RPM/TPM limiter across request scopes"""
+
+    def __init__(
+        self,
+        defaults: Dict[str, Dict[str, int]] = LLM_RATE_LIMITS,
+        overrides: Dict[str, Dict[str, int]] = LLM_RATE_LIMIT_OVERRIDES,
+        window: int = RATE_LIMIT_WINDOW
+    ):
+        self.defaults = defaults
+        self.overrides = overrides
+        self.window = window
+        self.enabled = bool(defaults or overrides)
+        self._script = None
+        self.counters: Dict[str, int] = {"admitted": 0, "limited": 0, "errors": 0, "reconciled_tokens": 0}
+        self.limited_by_scope: Dict[str, int] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+    def limits_for(self, scope: str) -> Tuple[int, int]:
+        """(rpm, tpm) for a scope like "user:7"; 0 means unlimited"""
+        limits = self.overrides.get(scope)
+        if limits is None:
+            limits = self.defaults.get(scope.split(":", 1)[0], {})
+        return int(limits.get("rpm") or 0), int(limits.get("tpm") or 0)
+
+    async def admit(
+        self,
+        request,
+        key_id: Optional[Any],
+        user_id: Optional[Any],
+        agent: Optional[str],
+        model: str,
+        prompt_tokens: Optional[int] = None
+    ) -> Optional[RateLimitTicket]:
+        """
+        Reserve one request and its estimated tokens in every applicable scope
+
+        prompt_tokens is the caller's estimate if it already has one.
+        Returns a ticket (None when limiting is off) or raises RateLimitExceeded.
+        """
+        _current_ticket.set(None)
+        if not self.enabled or redis_client.redis_client is None:
+            return None
+
+        scopes = []
+        for scope_type, value in (("key", key_id), ("user", user_id), ("agent", agent), ("model", model)):
+            if value is None or value == "unknown":
+                continue
+            scope = f"{scope_type}:{value}"
+            rpm, tpm = self.limits_for(scope)
+            if rpm or tpm:
+                scopes.append((scope, rpm, tpm))
+        if not scopes:
+            return None
+
+        if prompt_tokens is None:
+            prompt_tokens = estimate_prompt_tokens(request)
+        # Embedding requests have no completion budget
+        cost = prompt_tokens + (getattr(request, "max_tokens", None) or 0)
+        now = time.time()
+        window_index = int(now // self.window)
+        elapsed = now - window_index * self.window
+        weight = 1.0 - elapsed / self.window
+        reset_in = self.window - elapsed
+
+        keys: List[str] = []
+        args: List[Any] = [weight, cost, self.window * 2]
+        for scope, rpm, tpm in scopes:
+            keys += [
+                f"{RATE_LIMIT_KEY_PREFIX}{scope}:{window_index}",
+                f"{RATE_LIMIT_KEY_PREFIX}{scope}:{window_index - 1}"
+            ]
+            args += [rpm, tpm]
+
+        try:
+            if self._script is None:
+                self._script = redis_client.redis_client.register_script(_SLIDING_WINDOW_SCRIPT)
+            result = await self._script(keys=keys, args=args)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.error(f"[Rate Limit] Check failed, admitting request: {e}")
+            return None
+
+        admitted = bool(int(result[0]))
+        headers: Dict[str, str] = {}
+        blocked: Optional[Tuple[str, str, int]] = None
+        tightest = {"requests": None, "tokens": None}
+        for i, (scope, rpm, tpm) in enumerate(scopes):
+            cur_req, cur_tok, prev_req, prev_tok = (int(v) for v in result[1 + 4 * i:5 + 4 * i])
+            for kind, limit, cur, prev, amount in (
+                ("requests", rpm, cur_req, prev_req, 1),
+                ("tokens", tpm, cur_tok, prev_tok, cost)
+            ):
+                if not limit:
+                    continue
+                used = cur + weight * prev + (amount if admitted else 0)
+                remaining = max(0, int(limit - used))
+                if tightest[kind] is None or remaining < tightest[kind][1]:
+                    tightest[kind] = (limit, remaining)
+                over = cur + weight * prev + amount - limit
+                if not admitted and over > 0 and not (kind == "tokens" and cur + weight * prev <= 0):
+                    # The previous window's share decays linearly; past that, wait for the next window
+                    if prev and over <= weight * prev:
+                        wait = over / prev * self.window
+                    else:
+                        wait = reset_in
+                    if blocked is None or wait > blocked[2]:
+                        blocked = (scope, kind, max(1, math.ceil(wait)))
+
+        for kind, value in tightest.items():
+            if value is not None:
+                headers[f"x-ratelimit-limit-{kind}"] = str(value[0])
+                headers[f"x-ratelimit-remaining-{kind}"] = str(value[1])
+                headers[f"x-ratelimit-reset-{kind}"] = _format_reset(reset_in)
+
+        if not admitted:
+            scope, kind, retry_after = blocked or (scopes[0][0], "requests", max(1, math.ceil(reset_in)))
+            self.counters["limited"] += 1
+            scope_type = scope.split(":", 1)[0]
+            self.limited_by_scope[scope_type] = self.limited_by_scope.get(scope_type, 0) + 1
+            logger.warning(f"[Rate Limit] {scope} over its {kind}-per-minute budget, retry in {retry_after}s")
+            raise RateLimitExceeded(scope, kind, retry_after, headers)
+
+        self.counters["admitted"] += 1
+        ticket = RateLimitTicket(keys[0::2], cost, headers)
+        _current_ticket.set(ticket)
+        return ticket
+
+    def reconcile(self, actual_tokens: int):
+        """Replace the current request's reserved tokens with its actual usage"""
+        self._settle(_current_ticket.get(), actual_tokens)
+
+    def release(self, ticket: Optional[RateLimitTicket], result: Any = None):
+        """
+        Refund the ticket's reservation if its request never reconciled
+
+        Called from the handler's finally; a StreamingResponse is released
+        when its stream ends instead, since it records usage as it finishes.
+        """
+        if ticket is None or ticket.reconciled:
+            return
+        if isinstance(result, StreamingResponse):
+            result.body_iterator = self._release_at_end(ticket, result.body_iterator)
+        else:
+            self._settle(ticket, 0)
+
+    async def _release_at_end(self, ticket: RateLimitTicket, stream: AsyncIterator) -> AsyncIterator:
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            self._settle(ticket, 0)
+
+    def _settle(self, ticket: Optional[RateLimitTicket], actual_tokens: int):
+        if ticket is None or ticket.reconciled:
+            return
+        ticket.reconciled = True
+        delta = actual_tokens - ticket.reserved_tokens
+        if delta == 0:
+            return
+        task = asyncio.create_task(self._adjust(ticket.window_keys, delta))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _adjust(self, window_keys: List[str], delta: int):
+        try:
+            async with redis_client.redis_client.pipeline(transaction=False) as pipe:
+                for key in window_keys:
+                    pipe.hincrby(key, "tok", delta)
+                    # Long streams can outlive the window key; don't leave it without a TTL
+                    pipe.expire(key, self.window * 2)
+                await pipe.execute()
+            self.counters["reconciled_tokens"] += delta
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.error(f"[Rate Limit] Reconcile failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "enabled": self.enabled,
+            "limited_by_scope": self.limited_by_scope,
+            "defaults": self.defaults,
+            "overrides": self.overrides
+        }
+
+
+# Global limiter instance
+rate_limiter = RateLimiter()
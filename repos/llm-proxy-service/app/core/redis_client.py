@@ -1,12 +1,19 @@
 """
-Redis client for session trace lookup
+Redis client for session trace lookup and cross-service cache invalidation
 """
 import redis.asyncio as redis
+import asyncio
+import inspect
 import logging
 import os
+from typing import Awaitable, Callable, Dict, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+# Handler invoked with the raw pub/sub message payload
+MessageHandler = Callable[[str], Union[None, Awaitable[None]]]
+
+
 class RedisClient:
     """Redis client for looking up session → trace_id mappings"""
 
@@ -14,6 +21,9 @@ class RedisClient:
         self.redis_client: redis.Redis = None
         # Use same Redis database as Chat Service (db=2)
         self.redis_url = os.getenv("REDIS_URL", "redis://redis:6379/2")
+        # Pub/sub channel -> handler (pub/sub is not scoped to a Redis db)
+        self._handlers: Dict[str, MessageHandler] = {}
+        self._listener_task: Optional[asyncio.Task] = None
 
     async def connect(self):
         """Initialize Redis connection"""
@@ -30,6 +40,13 @@ class RedisClient:
 
     async def close(self):
         """Close Redis connection"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
         if self.redis_client:
             await self.redis_client.close()
             logger.info("Redis connection closed")
@@ -44,6 +61,41 @@ class RedisClient:
             logger.warning(f"No trace_id found for session {session_id}")
         return trace_id
 
+    def subscribe(self, channel: str, handler: MessageHandler):
+        """Register a handler for a pub/sub channel (call before start_listener)"""
+        self._handlers[channel] = handler
+
+    def start_listener(self):
+        """Start the background pub/sub listener for all registered channels"""
+        if self._handlers and self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        """Dispatch pub/sub messages to handlers, reconnecting on failure"""
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub()
+                await pubsub.subscribe(*self._handlers.keys())
+                logger.info(f"Subscribed to Redis channels: {list(self._handlers.keys())}")
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    handler = self._handlers.get(message["channel"])
+                    if handler is None:
+                        continue
+                    try:
+                        result = handler(message["data"])
+                        if inspect.isawaitable(result):
+                            await result
+                    except Exception as e:
+                        logger.error(f"Handler for channel {message['channel']} failed: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis pub/sub listener error, retrying in 5s: {e}")
+                await asyncio.sleep(5)
+
+
 # Global Redis client instance
 redis_client = RedisClient()
 
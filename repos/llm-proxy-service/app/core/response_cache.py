@@ -0,0 +1,165 @@
+"""
+Exact-match response cache for deterministic chat completions
+
+Opt-in via RESPONSE_CACHE_ENABLED. Only deterministic requests are cached
+(temperature 0, n=1). The key is a SHA-256 over a canonical JSON encoding
+of the model, messages, tools and sampling parameters, so replays of the
+same agent turn map to the same entry regardless of field order.
+
+Entries live in Redis with RESPONSE_CACHE_TTL. A sorted-set index ordered
+by insert time caps the number of entries at RESPONSE_CACHE_MAX_ENTRIES
+(oldest evicted first); entries larger than RESPONSE_CACHE_MAX_ENTRY_BYTES
+are not stored.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Set
+
+from .metrics import record_cache_miss
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", "262144"))
+
+CACHE_KEY_PREFIX = "llm_cache:"
+CACHE_INDEX_KEY = "llm_cache:index"
+
+
+def cache_key(request) -> str:
+    """Canonical hash of everything that determines a deterministic completion"""
+    canonical = {
+        "model": request.model,
+        "messages": [msg.model_dump(exclude_none=True) for msg in request.messages],
+        "tools": request.tools,
+        "tool_choice": request.tool_choice,
+        "temperature": request.temperature,
+        "top_p": request.top_p,
+        "max_tokens": request.max_tokens,
+        "stop": request.stop,
+        "presence_penalty": request.presence_penalty,
+        "frequency_penalty": request.frequency_penalty,
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Redis-backed exact-match cache of normalized completion results"""
+
+    def __init__(self, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.enabled = enabled
+        self.counters: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "skipped_too_large": 0,
+            "evictions": 0,
+            "errors": 0,
+            "tokens_saved": 0
+        }
+        # Stores run off the response path; keep references until they finish
+        self._pending: Set[asyncio.Task] = set()
+
+    def cacheable(self, request) -> bool:
+        return (
+            self.enabled
+            and redis_client.redis_client is not None
+            and request.temperature == 0
+            and (request.n or 1) == 1
+        )
+
+    async def lookup(self, request) -> Optional[Dict[str, Any]]:
+        """
+        Cached result for a request, or None
+
+        Result shape: {"content", "tool_calls", "finish_reason", "usage", "key"}
+        """
+        if not self.cacheable(request):
+            return None
+        key = cache_key(request)
+        try:
+            raw = await redis_client.redis_client.get(CACHE_KEY_PREFIX + key)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.error(f"[Response Cache] Lookup failed: {e}")
+            return None
+        if raw is None:
+            self.counters["misses"] += 1
+            record_cache_miss()
+            return None
+        self.counters["hits"] += 1
+        entry = json.loads(raw)
+        entry["key"] = key
+        self.counters["tokens_saved"] += entry.get("usage", {}).get("total_tokens", 0)
+        return entry
+
+    def store(self, request, response_data: Dict[str, Any]) -> Optional[str]:
+        """Schedule a store of an OpenAI-format response; returns the cache key"""
+        if not self.cacheable(request):
+            return None
+        choices = response_data.get("choices") or []
+        if not choices:
+            return None
+        message = choices[0].get("message", {})
+        tool_calls = message.get("tool_calls") or []
+        finish_reason = choices[0].get("finish_reason") or "stop"
+        if tool_calls and finish_reason == "stop":
+            # Streamed responses are saved with a generic "stop"
+            finish_reason = "tool_calls"
+        entry = {
+            "content": message.get("content") or "",
+            "tool_calls": tool_calls,
+            "finish_reason": finish_reason,
+            "usage": response_data.get("usage") or {}
+        }
+        key = cache_key(request)
+        task = asyncio.create_task(self._store(key, entry))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return key
+
+    async def _store(self, key: str, entry: Dict[str, Any]):
+        encoded = json.dumps(entry, separators=(",", ":"))
+        if len(encoded) > RESPONSE_CACHE_MAX_ENTRY_BYTES:
+            self.counters["skipped_too_large"] += 1
+            return
+        try:
+            redis = redis_client.redis_client
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(CACHE_KEY_PREFIX + key, encoded, ex=RESPONSE_CACHE_TTL)
+                pipe.zadd(CACHE_INDEX_KEY, {key: time.time()})
+                # Index members whose entries already expired via TTL
+                pipe.zremrangebyscore(CACHE_INDEX_KEY, "-inf", time.time() - RESPONSE_CACHE_TTL)
+                pipe.zcard(CACHE_INDEX_KEY)
+                results = await pipe.execute()
+            self.counters["stores"] += 1
+
+            overflow = results[-1] - RESPONSE_CACHE_MAX_ENTRIES
+            if overflow > 0:
+                evicted = await redis.zpopmin(CACHE_INDEX_KEY, overflow)
+                if evicted:
+                    await redis.delete(*(CACHE_KEY_PREFIX + member for member, _ in evicted))
+                    self.counters["evictions"] += len(evicted)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.error(f"[Response Cache] Store failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "enabled": self.enabled,
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0
+        }
+
+
+# Global cache instance
+response_cache = ResponseCache()
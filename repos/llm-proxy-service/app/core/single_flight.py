@@ -0,0 +1,193 @@
+"""
+Single-flight coalescing of concurrent identical completion requests
+
+The first request for a canonical request hash (see response_cache.cache_key)
+becomes the leader and goes upstream; identical requests arriving while it is
+in flight attach to it instead of issuing their own call:
+
+- non-streaming followers await the leader's chat.completion result
+- streaming followers subscribe to the leader's SSE stream, receiving every
+  chunk already sent and then the rest live. The flight is complete only if
+  the leader's stream reached [DONE] without an error event. If it stopped
+  early (its client went away, or it went idle) or carried an upstream
+  error, followers end their own streams with an error.
+
+SINGLE_FLIGHT_MODE controls which requests are coalesced:
+- deterministic (default): temperature 0 only, so no caller loses sampling diversity
+- all: any byte-identical request
+- off
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from .response_cache import cache_key
+from .sse import SSEDecoder, event_data
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_MODE = os.getenv("SINGLE_FLIGHT_MODE", "deterministic")  # deterministic | all | off
+# A leader stream that produces nothing for this long is treated as abandoned
+SINGLE_FLIGHT_IDLE_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_IDLE_TIMEOUT", "300"))
+
+
+class _LeaderCancelled(Exception):
+    """The leader's request was cancelled (client went away) before it had a result"""
+
+
+class Flight:
+    """One in-flight upstream call and the chunks it has produced so far"""
+
+    def __init__(self, key: str):
+        self.key = key
+        # Resolves to the leader's result: a dict, or the StreamingResponse for streams
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.chunks: List[bytes] = []
+        self.done = False
+        # Set when the leader's result is usable; followers of an incomplete flight end with an error
+        self.complete = False
+        # From the leader's SSE events: [DONE] was sent / the error event's message
+        self.ended = False
+        self.error: Optional[str] = None
+        self.followers = 0
+        self.updated_at = time.monotonic()
+        self._changed = asyncio.Event()
+
+    @property
+    def stale(self) -> bool:
+        return not self.done and time.monotonic() - self.updated_at > SINGLE_FLIGHT_IDLE_TIMEOUT
+
+    def publish(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self.updated_at = time.monotonic()
+        self._notify()
+
+    def observe(self, data: Optional[bytes]):
+        """Note [DONE] and error events in the leader's stream"""
+        if data is None:
+            return
+        if data.strip() == b"[DONE]":
+            self.ended = True
+        elif data.startswith(b'{"error"'):
+            try:
+                self.error = str(json.loads(data)["error"])
+            except (ValueError, KeyError):
+                self.error = "Upstream error"
+
+    def finish(self, complete: bool = False):
+        self.done = True
+        self.complete = complete
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def subscribe(self) -> AsyncIterator[bytes]:
+        """Replay the chunks sent so far, then follow the leader live"""
+        index = 0
+        while True:
+            if index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+                continue
+            if self.done:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), SINGLE_FLIGHT_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"[Single Flight] Leader stream idle for {SINGLE_FLIGHT_IDLE_TIMEOUT}s, ending follower stream")
+                return
+
+
+class SingleFlight:
+    """Registry of in-flight requests keyed by canonical request hash"""
+
+    def __init__(self, mode: str = SINGLE_FLIGHT_MODE):
+        self.mode = mode
+        self._flights: Dict[str, Flight] = {}
+        self.counters: Dict[str, int] = {"leaders": 0, "followers": 0}
+
+    def flight_key(self, request, provider: str) -> Optional[str]:
+        if self.mode == "off":
+            return None
+        if self.mode == "deterministic" and not (request.temperature == 0 and (request.n or 1) == 1):
+            return None
+        stream = "stream" if request.stream else "json"
+        return f"{provider}:{stream}:{cache_key(request)}"
+
+    async def run(
+        self,
+        request,
+        provider: str,
+        call: Callable[[], Awaitable[Any]],
+        follow: Callable[[Flight], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run call() as leader, or hand an existing flight to follow()
+
+        Exceptions raised by the leader (e.g. upstream errors, 429) are
+        re-raised to every follower.
+        """
+        key = self.flight_key(request, provider)
+        if key is None:
+            return await call()
+
+        flight = self._flights.get(key)
+        if flight is not None and not flight.stale:
+            flight.followers += 1
+            self.counters["followers"] += 1
+            logger.info(f"[Single Flight] Coalesced request onto in-flight leader ({flight.followers} followers)")
+            try:
+                await asyncio.shield(flight.result)
+            except _LeaderCancelled:
+                # Nothing to share - make the call ourselves
+                return await call()
+            return await follow(flight)
+
+        flight = self._flights[key] = Flight(key)
+        self.counters["leaders"] += 1
+        try:
+            result = await call()
+        except BaseException as e:
+            self._flights.pop(key, None)
+            flight.finish()
+            flight.result.set_exception(_LeaderCancelled() if isinstance(e, asyncio.CancelledError) else e)
+            # Mark retrieved so an exception nobody followed isn't logged as unhandled
+            flight.result.exception()
+            raise
+
+        if isinstance(result, StreamingResponse):
+            # Followers tee off the leader's stream; the flight stays joinable until it ends
+            result.body_iterator = self._tee(flight, result.body_iterator)
+        else:
+            self._flights.pop(key, None)
+            flight.finish(complete=True)
+        flight.result.set_result(result)
+        return result
+
+    async def _tee(self, flight: Flight, stream: AsyncIterator) -> AsyncIterator:
+        decoder = SSEDecoder()
+        try:
+            async for chunk in stream:
+                data = chunk if isinstance(chunk, bytes) else chunk.encode()
+                for event in decoder.feed(data):
+                    flight.observe(event_data(event))
+                flight.publish(data)
+                yield chunk
+        finally:
+            # Also reached early when the leader's client disconnects
+            self._flights.pop(flight.key, None)
+            flight.finish(flight.ended and flight.error is None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "mode": self.mode, "in_flight": len(self._flights)}
+
+
+# Global single-flight registry
+single_flight = SingleFlight()
@@ -0,0 +1,82 @@
+"""
+Byte-level Server-Sent Events framing
+
+Upstream providers deliver SSE as arbitrary byte chunks: one network read
+may carry several events, and one event may be split across reads (even in
+the middle of a multi-byte UTF-8 character). SSEDecoder reassembles complete
+events from raw bytes so the proxy can forward each event verbatim and only
+decode the few fields it actually needs.
+"""
+from typing import List, Optional
+
+_LF_BOUNDARY = b"\n\n"
+_CRLF_BOUNDARY = b"\r\n\r\n"
+
+
+class SSEDecoder:
+    """Incremental splitter turning raw byte chunks into complete SSE events"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._crlf: Optional[bool] = None
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """
+        Add bytes and return every event completed by them
+
+        Each returned event is the raw event block including its trailing
+        blank-line terminator, so it can be written to the client unchanged.
+        """
+        self._buffer += chunk
+        if self._crlf is None:
+            # Line endings are fixed per stream; detect them from the first event
+            if _CRLF_BOUNDARY in self._buffer:
+                self._crlf = True
+            elif _LF_BOUNDARY in self._buffer:
+                self._crlf = False
+            else:
+                return []
+        boundary = _CRLF_BOUNDARY if self._crlf else _LF_BOUNDARY
+
+        events = []
+        start = 0
+        buffer = self._buffer
+        while True:
+            end = buffer.find(boundary, start)
+            if end < 0:
+                break
+            end += len(boundary)
+            events.append(bytes(buffer[start:end]))
+            start = end
+        if start:
+            del buffer[:start]
+        return events
+
+    def flush(self) -> Optional[bytes]:
+        """Return a trailing event the upstream closed without terminating"""
+        if not self._buffer.strip():
+            return None
+        event = bytes(self._buffer) + (_CRLF_BOUNDARY if self._crlf else _LF_BOUNDARY)
+        self._buffer.clear()
+        return event
+
+
+def event_data(event: bytes) -> Optional[bytes]:
+    """
+    Payload of an event's data field(s), or None for comment/keep-alive events
+
+    Multiple data lines are joined with newlines, per the SSE spec.
+    """
+    if event.startswith(b"data:") and event.count(b"\n") <= 2:
+        # Fast path: single data line, which is what every provider sends
+        data = event[5:].rstrip(b"\r\n")
+        return data[1:] if data.startswith(b" ") else data
+
+    parts = []
+    for line in event.splitlines():
+        if line.startswith(b"data:"):
+            value = line[5:]
+            parts.append(value[1:] if value.startswith(b" ") else value)
+    if not parts:
+        return None
+    return b"\n".join(parts)
@@ -0,0 +1,118 @@
+"""
+Prompt token estimation for requests that have not been sent yet
+
+Counts use tiktoken BPE tables: o200k_base for the gpt-4o / o-series family,
+cl100k_base for everything else (a close proxy for Llama, Qwen, Claude and
+Gemini tokenizers, typically within 10-15%). The tables are loaded once, off
+the event loop, by preload_encodings() at startup. Until they are loaded - or
+when tiktoken is not installed or the tables can't be fetched - a ~4
+characters/token heuristic is used instead. is_exact() tells the two apart:
+only OpenAI models counted with their own table get exact counts.
+
+Per-text counts are memoized: agent loops resend the same history on every
+turn, so only the new messages of a turn are actually tokenized.
+"""
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _TIKTOKEN_AVAILABLE = True
+except ImportError:
+    _TIKTOKEN_AVAILABLE = False
+
+ENCODINGS = ("o200k_base", "cl100k_base")
+# Model-name prefixes (last path segment) tokenized with o200k_base
+O200K_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4", "chatgpt-4o", "gpt-oss")
+# Model-name prefixes whose own tokenizer is one of ENCODINGS
+EXACT_PREFIXES = O200K_PREFIXES + ("gpt-4", "gpt-3.5")
+
+CHARS_PER_TOKEN = 4
+# Role/separator tokens the chat template adds around each message
+TOKENS_PER_MESSAGE = 4
+# Priming tokens for the assistant reply
+TOKENS_PER_REPLY = 3
+# Id/type framing around each tool call's name and arguments
+TOKENS_PER_TOOL_CALL = 8
+TEXT_CACHE_SIZE = 8192
+
+_encodings: Dict[str, Any] = {}
+
+
+def encoding_name_for(model: str) -> str:
+    name = model.split("/")[-1].lower()
+    return "o200k_base" if name.startswith(O200K_PREFIXES) else "cl100k_base"
+
+
+def is_exact(model: str) -> bool:
+    """Whether counts for model come from its own tokenizer rather than a proxy table or the heuristic"""
+    name = model.split("/")[-1].lower()
+    return name.startswith(EXACT_PREFIXES) and encoding_name_for(model) in _encodings
+
+
+def load_encodings():
+    """Load the BPE tables (blocking; may download them on first use)"""
+    if not _TIKTOKEN_AVAILABLE:
+        logger.warning("[Token Estimator] tiktoken not installed, using character heuristic")
+        return
+    for name in ENCODINGS:
+        try:
+            _encodings[name] = tiktoken.get_encoding(name)
+        except Exception as e:
+            logger.warning(f"[Token Estimator] Failed to load {name}, using character heuristic: {e}")
+    # Drop counts memoized with the heuristic before the tables were available
+    _count_text.cache_clear()
+    logger.info(f"[Token Estimator] Loaded encodings: {list(_encodings)}")
+
+
+async def preload_encodings():
+    """Load the BPE tables in a worker thread so startup isn't blocked"""
+    await asyncio.to_thread(load_encodings)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _count_text(encoding_name: str, text: str) -> int:
+    encoding = _encodings.get(encoding_name)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode_ordinary(text))
+
+
+def count_text_tokens(text: str, model: str) -> int:
+    return _count_text(encoding_name_for(model), text) if text else 0
+
+
+def estimate_message_tokens(msg: Any, encoding_name: str) -> int:
+    """Tokens one ChatMessage contributes to the prompt"""
+    tokens = TOKENS_PER_MESSAGE + _count_text(encoding_name, msg.get_content_as_string())
+    if msg.name:
+        tokens += _count_text(encoding_name, msg.name)
+    for call in msg.tool_calls or ():
+        function = call.get("function") or {}
+        arguments = function.get("arguments") or ""
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments, separators=(",", ":"))
+        tokens += TOKENS_PER_TOOL_CALL + _count_text(encoding_name, function.get("name") or "")
+        tokens += _count_text(encoding_name, arguments)
+    return tokens
+
+
+def estimate_tools_tokens(request: Any) -> int:
+    if not request.tools:
+        return 0
+    return count_text_tokens(json.dumps(request.tools, separators=(",", ":")), request.model)
+
+
+def message_token_counts(request: Any) -> List[int]:
+    encoding_name = encoding_name_for(request.model)
+    return [estimate_message_tokens(msg, encoding_name) for msg in request.messages]
+
+
+def estimate_prompt_tokens(request: Any) -> int:
+    """Estimated prompt tokens for a ChatCompletionRequest"""
+    return TOKENS_PER_REPLY + estimate_tools_tokens(request) + sum(message_token_counts(request))
@@ -0,0 +1,170 @@
+"""
+Write-behind buffer for ToolCall records
+
+A row is buffered when the model's tool call completes. The agent runs the
+tool and sends the result back in its next request as a tool message with
+the same tool_call_id; add_result() then fills in tool_result, completed_at
+and latency_ms (result arrival minus call completion, i.e. tool execution
+plus agent-side overhead).
+
+Many results arrive while the call's row is still buffered (the flush
+interval is longer than a fast tool call), so the row is completed in
+place before its INSERT. Results for rows already flushed - or buffered by
+another replica - are applied as one bulk UPDATE per flush; results that
+match no row within TOOL_RESULT_MATCH_TTL seconds are dropped.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+
+from .database import ToolCall, async_session_maker
+from .llm_call_writer import RowWriter
+
+logger = logging.getLogger(__name__)
+
+TOOL_RESULT_MATCH_TTL = float(os.getenv("TOOL_RESULT_MATCH_TTL", "300"))
+# Stored tool results are cut to this many characters
+TOOL_RESULT_MAX_CHARS = int(os.getenv("TOOL_RESULT_MAX_CHARS", "16000"))
+
+
+def _as_json_object(value: Any, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Tool arguments / results for a JSON column (objects as-is, anything else wrapped)"""
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value) if value else {}
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, dict) and (limit is None or len(value) <= limit):
+            return parsed
+        return {"content": value[:limit] if limit else value}
+    if isinstance(value, dict):
+        return value
+    return {"content": value}
+
+
+class ToolCallWriter(RowWriter):
+    """Buffers ToolCall rows and matches them with the tool results that follow"""
+
+    def __init__(self, **kwargs):
+        super().__init__(ToolCall, "tool calls", **kwargs)
+        # (agent_id, tool_call_id) -> buffered row, until the row is flushed
+        self._unwritten: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # (agent_id, tool_call_id) -> (result fields, first seen) for rows already written
+        self._results: Dict[Tuple[str, str], Tuple[Dict[str, Any], float]] = {}
+        self.counters.update({"results_matched": 0, "results_unmatched": 0})
+
+    def add_call(
+        self,
+        agent_id: str,
+        trace_id: Optional[str],
+        tool_call: Dict[str, Any],
+        llm_call_id: Optional[str] = None
+    ):
+        """Buffer the row for a completed tool call (OpenAI tool_call format)"""
+        function = tool_call.get("function", {})
+        tool_call_id = tool_call.get("id") or None
+        row = {
+            "id": str(uuid.uuid4()),
+            "agent_id": agent_id,
+            "session_id": None,
+            "trace_id": trace_id,
+            "llm_call_id": llm_call_id,
+            "tool_call_id": tool_call_id,
+            "tool_name": function.get("name") or "unknown",
+            "tool_args": _as_json_object(function.get("arguments")),
+            "tool_result": None,
+            "success": True,
+            "error_message": None,
+            "called_at": datetime.utcnow(),
+            "completed_at": None,
+            "latency_ms": None
+        }
+        self.add(row)
+        if tool_call_id:
+            self._unwritten[(agent_id, tool_call_id)] = row
+
+    def add_result(self, agent_id: str, tool_call_id: Optional[str], content: Any) -> Optional[str]:
+        """
+        Record the tool message answering tool_call_id
+
+        Returns the tool name when the call is still buffered (tool messages
+        often carry no name of their own).
+        """
+        if not tool_call_id:
+            return None
+        key = (agent_id, tool_call_id)
+        completed_at = datetime.utcnow()
+        fields = {"tool_result": _as_json_object(content, TOOL_RESULT_MAX_CHARS), "completed_at": completed_at}
+
+        row = self._unwritten.get(key)
+        if row is not None:
+            if row["completed_at"] is None:
+                row.update(fields)
+                row["latency_ms"] = int((completed_at - row["called_at"]).total_seconds() * 1000)
+                self.counters["results_matched"] += 1
+            return row["tool_name"]
+
+        if key not in self._results:
+            self._results[key] = (fields, time.monotonic())
+        return None
+
+    def on_flushing(self, batch: List[Dict[str, Any]]):
+        # From here on a result must go through UPDATE; the INSERT may already be on the wire
+        for row in batch:
+            if row["tool_call_id"]:
+                self._unwritten.pop((row["agent_id"], row["tool_call_id"]), None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "pending_results": len(self._results)}
+
+    async def flush(self):
+        await super().flush()
+        if self._results:
+            await self._apply_results()
+
+    async def _apply_results(self):
+        """Bulk UPDATE written rows that have a result waiting"""
+        pending = self._results
+        self._results = {}
+        try:
+            async with async_session_maker() as session:
+                result = await session.execute(
+                    select(ToolCall.id, ToolCall.agent_id, ToolCall.tool_call_id, ToolCall.called_at)
+                    .where(ToolCall.tool_call_id.in_({tool_call_id for _, tool_call_id in pending}))
+                    .where(ToolCall.completed_at.is_(None))
+                )
+                updates = []
+                for row_id, agent_id, tool_call_id, called_at in result.all():
+                    entry = pending.pop((agent_id, tool_call_id), None)
+                    if entry is None:
+                        continue
+                    fields = entry[0]
+                    updates.append({
+                        "id": row_id,
+                        **fields,
+                        "latency_ms": int((fields["completed_at"] - called_at).total_seconds() * 1000)
+                    })
+                if updates:
+                    await session.execute(update(ToolCall), updates)
+                    await session.commit()
+                self.counters["results_matched"] += len(updates)
+        except Exception as e:
+            logger.error(f"[DB] Failed to apply {len(pending)} tool results, will retry: {e}")
+
+        # Keep unmatched results a while: the call's row may still be in another replica's buffer
+        now = time.monotonic()
+        for key, entry in pending.items():
+            if now - entry[1] < TOOL_RESULT_MATCH_TTL:
+                self._results.setdefault(key, entry)
+            else:
+                self.counters["results_unmatched"] += 1
+
+
+# Global writer instance
+tool_call_writer = ToolCallWriter()
@@ -0,0 +1,228 @@
+"""
+Incremental tool-call assembly for streamed completions
+
+Every provider streams tool calls differently:
+
+- OpenAI / OpenAI-compatible: tool_calls deltas keyed by index; the first
+  delta of a call carries id and name, later ones carry argument fragments
+- Anthropic: a tool_use content_block_start, input_json_delta fragments,
+  then content_block_stop
+- Gemini: whole functionCall parts (name + args object) in one chunk
+
+ToolCallAccumulator turns all three into OpenAI tool_calls and reports each
+call as soon as its arguments are complete, so tool_call / agent_transfer
+trace events go out while the rest of the stream (further parallel calls,
+usage) is still arriving instead of at [DONE].
+
+Per call it keeps a slotted record and a list of argument fragments that is
+joined once, when the call completes.
+"""
+import json
+import uuid
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# Tool names that hand the conversation to another agent
+TRANSFER_TOOLS = frozenset({
+    "transfer_to_agent",  # ADK
+    "transfer_task_to_member",  # Agno
+    "delegate_task_to_member"  # Agno
+})
+
+
+# Shared empty result for the common no-call-completed case (callers only read it)
+_NONE_COMPLETED: List[Dict[str, Any]] = []
+
+
+class _ToolCall:
+    __slots__ = ("index", "id", "type", "name", "parts", "arguments")
+
+    def __init__(self, index: int, call_id: str, call_type: str, name: str):
+        self.index = index
+        self.id = call_id
+        self.type = call_type
+        self.name = name
+        self.parts: List[str] = []
+        # Joined arguments once the call is complete; None while streaming
+        self.arguments: Optional[str] = None
+
+    def joined_arguments(self) -> str:
+        if self.arguments is not None:
+            return self.arguments
+        parts = self.parts
+        return parts[0] if len(parts) == 1 else "".join(parts)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "function": {"name": self.name, "arguments": self.joined_arguments()}
+        }
+
+
+class ToolCallAccumulator:
+    """
+    Assembles streamed tool calls into OpenAI format
+
+    Calls are keyed by the provider's own identifier (OpenAI delta index,
+    Anthropic content block index) and numbered 0..n in arrival order, which
+    is the OpenAI tool_calls index. The add/complete methods return the calls
+    they completed, each exactly once.
+    """
+    __slots__ = ("_calls", "_by_key", "_open")
+
+    def __init__(self):
+        self._calls: List[_ToolCall] = []
+        self._by_key: Dict[Hashable, _ToolCall] = {}
+        # Calls whose arguments may still grow, in arrival order
+        self._open: List[_ToolCall] = []
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _new(self, key: Hashable, call_id: str, call_type: str, name: str) -> _ToolCall:
+        call = _ToolCall(len(self._calls), call_id, call_type, name)
+        self._calls.append(call)
+        self._by_key[key] = call
+        self._open.append(call)
+        return call
+
+    def _close(self, call: _ToolCall) -> Dict[str, Any]:
+        call.arguments = call.joined_arguments()
+        call.parts = []
+        self._open.remove(call)
+        return call.as_dict()
+
+    def _close_parsable(self, keep: Optional[_ToolCall] = None) -> List[Dict[str, Any]]:
+        """Close open calls (other than keep) whose arguments are a complete JSON value"""
+        completed = []
+        for call in list(self._open):
+            if call is keep:
+                continue
+            try:
+                json.loads(call.joined_arguments())
+            except ValueError:
+                # Upstream interleaves calls, or this one is still mid-object
+                continue
+            completed.append(self._close(call))
+        return completed
+
+    # ----- OpenAI -----
+
+    def add_openai_delta(self, tool_calls_delta: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge one chunk's delta["tool_calls"]
+
+        A call is complete once a later call starts and its arguments parse;
+        calls still open at the end are closed by finish().
+        """
+        completed = _NONE_COMPLETED
+        by_key = self._by_key
+        for chunk in tool_calls_delta:
+            key = chunk.get("index", 0)
+            call = by_key.get(key)
+            function = chunk.get("function")
+            if call is None:
+                call = self._new(key, chunk.get("id") or "", chunk.get("type") or "function", "")
+                if len(self._open) > 1:
+                    completed = completed + self._close_parsable(keep=call)
+            elif len(chunk) > 2:
+                # Continuation chunks are usually just {"index", "function"}
+                if chunk.get("id"):
+                    call.id = chunk["id"]
+                if chunk.get("type"):
+                    call.type = chunk["type"]
+
+            if function:
+                arguments = function.get("arguments")
+                if arguments:
+                    if call.arguments is None:
+                        call.parts.append(arguments)
+                    else:
+                        # Fragment for a call already reported; keep the final record whole
+                        call.arguments += arguments
+                if len(function) > 1 or arguments is None:
+                    name = function.get("name")
+                    if name:
+                        call.name = name
+        return completed
+
+    # ----- Anthropic -----
+
+    def start(self, key: Hashable, call_id: str, name: str) -> int:
+        """Begin a call (Anthropic tool_use block); returns its tool_calls index"""
+        return self._new(key, call_id, "function", name).index
+
+    def append(self, key: Hashable, fragment: str) -> Optional[int]:
+        """Add an argument fragment to an open call; returns its index, or None for an unknown key"""
+        call = self._by_key.get(key)
+        if call is None:
+            return None
+        if fragment:
+            if call.arguments is None:
+                call.parts.append(fragment)
+            else:
+                call.arguments += fragment
+        return call.index
+
+    def complete(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Close a call (Anthropic content_block_stop); None if unknown or already complete"""
+        call = self._by_key.get(key)
+        if call is None or call.arguments is not None:
+            return None
+        return self._close(call)
+
+    # ----- Gemini -----
+
+    def add_complete(self, name: str, arguments: Any, call_id: Optional[str] = None) -> Tuple[int, Dict[str, Any]]:
+        """Add a call that arrived whole (Gemini functionCall); returns (index, tool_call)"""
+        call_id = call_id or f"call_{uuid.uuid4().hex[:24]}"
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments if arguments is not None else {}, separators=(",", ":"))
+        call = self._new(call_id, call_id, "function", name)
+        call.parts.append(arguments)
+        return call.index, self._close(call)
+
+    # ----- All providers -----
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Close every open call (finish_reason / end of stream)"""
+        return [self._close(call) for call in list(self._open)]
+
+    def tool_calls(self) -> List[Dict[str, Any]]:
+        """All calls in OpenAI tool_calls order, complete or not"""
+        return [call.as_dict() for call in self._calls]
+
+
+def tool_call_event(tool_call: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Trace event for a completed tool call: ("tool_call" | "agent_transfer", data)
+
+    Agent transfers are detected by tool name (see TRANSFER_TOOLS) and carry
+    the target agent from the arguments. Returns None for non-function calls.
+    """
+    if tool_call.get("type", "function") != "function":
+        return None
+    function = tool_call.get("function", {})
+    tool_id = tool_call.get("id", "unknown")
+    tool_name = function.get("name", "unknown")
+    arguments = function.get("arguments", "{}")
+
+    if tool_name not in TRANSFER_TOOLS:
+        return "tool_call", {"tool_id": tool_id, "tool_name": tool_name, "arguments": arguments}
+
+    try:
+        args_dict = json.loads(arguments) if isinstance(arguments, str) else arguments
+        target_agent = (
+            args_dict.get("agent_name") or
+            args_dict.get("member_id") or
+            args_dict.get("agent_id") or
+            "unknown"
+        )
+    except (ValueError, TypeError, AttributeError):
+        target_agent = "unknown"
+    return "agent_transfer", {
+        "tool_id": tool_id,
+        "tool_name": tool_name,
+        "target_agent": target_agent,
+        "arguments": arguments
+    }
@@ -0,0 +1,239 @@
+"""
+Asynchronous batched trace-event shipper
+
+emit_trace_event only enqueues into a bounded in-process queue; a background
+flusher drains it and posts batches to the Tracing Service bulk ingest
+endpoint, so completion latency never includes a tracing round trip.
+
+Back-pressure (TRACE_QUEUE_POLICY):
+- drop:  events arriving while the queue is full are dropped and counted
+- spill: overflow and failed batches are appended as NDJSON to TRACE_SPILL_PATH
+         and replayed once the queue has room again
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .http_client import get_upstream_client
+from .metrics import CallbackCounter, registry
+
+logger = logging.getLogger(__name__)
+
+# Tracing Service endpoint for trace events
+TRACING_SERVICE_URL = os.getenv("TRACING_SERVICE_URL", "http://tracing-service:8004")
+
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "200"))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "0.5"))
+TRACE_QUEUE_POLICY = os.getenv("TRACE_QUEUE_POLICY", "drop")  # drop | spill
+TRACE_SPILL_PATH = os.getenv("TRACE_SPILL_PATH", "/tmp/llm-proxy-trace-spill.ndjson")
+# Longest stop() waits for the queue to drain; what is left is spilled or dropped
+TRACE_STOP_TIMEOUT = float(os.getenv("TRACE_STOP_TIMEOUT", "10"))
+
+
+class TraceShipper:
+    """Bounded queue + background batch flusher for Tracing Service logs"""
+
+    def __init__(
+        self,
+        queue_size: int = TRACE_QUEUE_SIZE,
+        batch_size: int = TRACE_BATCH_SIZE,
+        flush_interval: float = TRACE_FLUSH_INTERVAL,
+        policy: str = TRACE_QUEUE_POLICY,
+        spill_path: str = TRACE_SPILL_PATH
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.spill_path = spill_path
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Batch taken off the queue and not yet sent, kept if stop() cancels the send
+        self._in_flight: List[Dict[str, Any]] = []
+        self._stopping = asyncio.Event()
+        self._spilled_pending = 0
+        self.counters: Dict[str, int] = {
+            "queued": 0,
+            "sent": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "failed_batches": 0
+        }
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # Created lazily so the queue binds to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        return self._queue
+
+    def enqueue(self, log: Dict[str, Any]):
+        """Queue a tracing-service log entry without waiting"""
+        try:
+            self.queue.put_nowait(log)
+            self.counters["queued"] += 1
+        except asyncio.QueueFull:
+            if self.policy == "spill":
+                self._spill([log])
+            else:
+                self.counters["dropped"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue_size,
+            "policy": self.policy,
+            "spill_pending": self._spilled_pending
+        }
+
+    # ----- Background flusher -----
+
+    def start(self):
+        """Start the background flusher"""
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the flusher once it has sent what is queued (including a batch it already took)
+
+        Sending stops after TRACE_STOP_TIMEOUT. Whatever is unsent by then,
+        including a batch that was being sent, is spilled under the spill
+        policy and counted as dropped otherwise.
+        """
+        drain = self._task
+        if drain:
+            self._stopping.set()
+            self._task = None
+        else:
+            drain = asyncio.create_task(self._drain())
+        try:
+            await asyncio.wait_for(drain, TRACE_STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+
+        left = self._in_flight + [self.queue.get_nowait() for _ in range(self.queue.qsize())]
+        self._in_flight = []
+        if left:
+            logger.error(f"[Trace] Shipping did not finish within {TRACE_STOP_TIMEOUT}s, "
+                         f"{len(left)} events not shipped")
+            if self.policy == "spill":
+                self._spill(left)
+            else:
+                self.counters["dropped"] += len(left)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                # Wake up periodically to notice stop()
+                first = await asyncio.wait_for(self.queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                continue
+            batch = self._in_flight = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._ship(self._take_batch(batch))
+            if self._spilled_pending and self.queue.qsize() < self.queue_size // 2:
+                self._replay_spill()
+        await self._drain()
+
+    async def _drain(self):
+        while not self.queue.empty():
+            await self._ship(self._take_batch([]))
+
+    async def _ship(self, batch: List[Dict[str, Any]]):
+        self._in_flight = batch
+        await self._send(batch)
+        # Not reached if stop() cancels the send; the batch stays for stop() to spill
+        self._in_flight = []
+
+    def _take_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _send(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        try:
+            client = get_upstream_client(TRACING_SERVICE_URL)
+            response = await client.post(
+                f"{TRACING_SERVICE_URL}/api/tracing/logs/batch",
+                json=batch,
+                headers={"X-Service-Name": "llm-proxy-service"}
+            )
+            if response.status_code >= 300:
+                raise RuntimeError(f"status={response.status_code}")
+            self.counters["sent"] += len(batch)
+            logger.debug(f"[Trace] Shipped {len(batch)} events to Tracing Service")
+        except Exception as e:
+            self.counters["failed_batches"] += 1
+            logger.error(f"[Trace] Failed to ship {len(batch)} events to Tracing Service: {e}")
+            if self.policy == "spill":
+                self._spill(batch)
+            else:
+                self.counters["dropped"] += len(batch)
+
+    # ----- Disk spill -----
+
+    def _spill(self, logs: List[Dict[str, Any]]):
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for log in logs:
+                    f.write(json.dumps(log, default=str) + "\n")
+            self.counters["spilled"] += len(logs)
+            self._spilled_pending += len(logs)
+        except OSError as e:
+            logger.error(f"[Trace] Failed to spill {len(logs)} events to {self.spill_path}: {e}")
+            self.counters["dropped"] += len(logs)
+
+    def _replay_spill(self):
+        """Move spilled events back into the queue while there is room"""
+        spill_path = f"{self.spill_path}.replay"
+        try:
+            os.replace(self.spill_path, spill_path)
+        except FileNotFoundError:
+            self._spilled_pending = 0
+            return
+        self._spilled_pending = 0
+        with open(spill_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    log = json.loads(line)
+                except ValueError:
+                    continue
+                try:
+                    self.queue.put_nowait(log)
+                    self.counters["replayed"] += 1
+                except asyncio.QueueFull:
+                    # Still full - goes back to disk for the next round
+                    self.counters["spilled"] -= 1
+                    self._spill([log])
+        os.remove(spill_path)
+
+
+# Global shipper instance
+trace_shipper = TraceShipper()
+
+registry.register(CallbackCounter(
+    "llm_proxy_trace_events_dropped_total",
+    "Trace events dropped because the shipper queue was full or a batch failed",
+    lambda: trace_shipper.counters["dropped"]
+))
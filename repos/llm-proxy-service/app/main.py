@@ -1,15 +1,34 @@
 """
 LLM Proxy Service with WebSocket for Trace Events
 """
+import asyncio
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from app.core.database import init_db
 from app.core.redis_client import redis_client
+from app.core.http_client import upstream_clients
+from app.core.model_registry import model_config_cache, LLM_MODELS_CHANNEL
+from app.core.key_cache import platform_key_cache, PLATFORM_KEYS_REVOKED_CHANNEL
+from app.core.endpoint_pool import endpoint_pool, LLM_ENDPOINT_HEALTH_CHANNEL
+from app.core.lookup_cache import (
+    AGENTS_CHANGED_CHANNEL,
+    CHAT_SESSIONS_DELETED_CHANNEL,
+    handle_agent_changed,
+    handle_session_deleted,
+)
+from app.core.token_estimator import preload_encodings
+from app.core.trace_shipper import trace_shipper
+from app.core.llm_call_writer import llm_call_writer, trace_event_writer
+from app.core.tool_call_writer import tool_call_writer
+from app.core.metrics import CONTENT_TYPE, render_metrics
 from app.api.trace_openai import trace_openai_router
+from app.api.embeddings import embeddings_router
+from app.api.batches import batches_router
 from app.api.internal import router as internal_router
 from app.api.v1.statistics import router as statistics_router
+from app.api.v1.traces import router as traces_router
 from app.websocket import websocket_router
 from alembic.config import Config
 from alembic import command
@@ -62,12 +81,46 @@ async def lifespan(app: FastAPI):
     try:
         await redis_client.connect()
         logger.info("Redis client initialized successfully")
+
+        # Cache invalidation events from other services
+        redis_client.subscribe(LLM_MODELS_CHANNEL, model_config_cache.handle_event)
+        redis_client.subscribe(PLATFORM_KEYS_REVOKED_CHANNEL, platform_key_cache.handle_revocation)
+        # Replica health from worker-service check_llm_health
+        redis_client.subscribe(LLM_ENDPOINT_HEALTH_CHANNEL, endpoint_pool.handle_health_event)
+        # Session -> trace and trace -> agent lookups (chat-service, agent-service)
+        redis_client.subscribe(CHAT_SESSIONS_DELETED_CHANNEL, handle_session_deleted)
+        redis_client.subscribe(AGENTS_CHANGED_CHANNEL, handle_agent_changed)
+        redis_client.start_listener()
     except Exception as e:
         logger.error(f"Failed to initialize Redis: {e}")
 
+    # Batched last_used reporting for cached platform keys
+    platform_key_cache.start()
+
+    # Tokenizer tables for prompt estimation (heuristic counts until loaded)
+    encodings_task = asyncio.create_task(preload_encodings())
+
+    # Background trace-event shipper (batches to Tracing Service)
+    trace_shipper.start()
+
+    # Write-behind buffers for LLMCall, TraceEvent and ToolCall rows
+    llm_call_writer.start()
+    trace_event_writer.start()
+    tool_call_writer.start()
+
     logger.info("LLM Proxy Service started successfully")
     yield
     logger.info("Shutting down LLM Proxy Service...")
+    await llm_call_writer.stop()
+    await trace_event_writer.stop()
+    await tool_call_writer.stop()
+    await trace_shipper.stop()
+    await platform_key_cache.stop()
+    # Still loading if the service stops right after starting
+    encodings_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await encodings_task
+    await upstream_clients.close()
     await redis_client.close()
 
 # Create FastAPI app
@@ -85,11 +138,19 @@ app.add_middleware(
 )
 
 app.include_router(trace_openai_router, prefix="/trace/{trace_id}/v1", tags=["trace-openai"])
+app.include_router(embeddings_router, prefix="/trace/{trace_id}/v1", tags=["trace-openai"])
+app.include_router(batches_router, prefix="/trace/{trace_id}/v1", tags=["trace-openai"])
 app.include_router(internal_router, prefix="/api", tags=["internal"])
 app.include_router(statistics_router, prefix="/api/v1", tags=["statistics"])
+app.include_router(traces_router, prefix="/api/v1", tags=["traces"])
 app.include_router(websocket_router, prefix="/ws", tags=["websocket"])
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "llm-proxy-service"}
\ No newline at end of file
+    return {"status": "healthy", "service": "llm-proxy-service"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for the completion hot path"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
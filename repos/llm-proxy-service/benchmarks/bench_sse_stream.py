@@ -0,0 +1,179 @@
+"""
+Micro-benchmark: replay a recorded chat-completion SSE stream through
+stream_openai_response
+
+The upstream is an httpx.MockTransport that replays the recording split into
+randomly sized network reads (events straddle reads the way they do on a
+real TCP connection), so the numbers isolate the proxy's per-chunk parsing
+and forwarding cost. The previous line-based implementation (aiter_lines +
+json.loads + str += + json.dumps for tool-call chunks) is replayed as a
+baseline.
+
+Usage:
+    uv run python benchmarks/bench_sse_stream.py --chunks 10000
+    # Record the synthetic stream once, then replay it (or a real capture)
+    uv run python benchmarks/bench_sse_stream.py --record /tmp/stream.sse
+    uv run python benchmarks/bench_sse_stream.py --fixture /tmp/stream.sse
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench_llm_proxy.db")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx  # noqa: E402
+
+from app.api.openai_compatible import stream_openai_response  # noqa: E402
+
+UPSTREAM_URL = "http://upstream.bench/v1/chat/completions"
+
+
+def synthesize_stream(chunks: int) -> bytes:
+    """OpenAI-style stream: content deltas, a parallel tool call, usage, [DONE]"""
+    base = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0, "model": "gpt-bench"}
+    events = []
+    tool_chunks = max(chunks // 20, 2)
+    for i in range(chunks - tool_chunks):
+        delta = {"role": "assistant", "content": ""} if i == 0 else {"content": f" tok{i}"}
+        events.append({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+    for i in range(tool_chunks):
+        call = {"index": i % 2, "function": {"arguments": '{"q": "x"}' if i >= 2 else ""}}
+        if i < 2:
+            call.update({"id": f"call_{i}", "type": "function", "function": {"name": f"tool_{i}", "arguments": ""}})
+        events.append({**base, "choices": [{"index": 0, "delta": {"tool_calls": [call]}, "finish_reason": None}]})
+    events.append({**base, "choices": [], "usage": {"prompt_tokens": 12, "completion_tokens": chunks, "total_tokens": chunks + 12}})
+    body = "".join(f"data: {json.dumps(event, separators=(',', ':'))}\n\n" for event in events)
+    return (body + "data: [DONE]\n\n").encode()
+
+
+def fragment(body: bytes, seed: int):
+    """Split the recording into network-sized reads of random length"""
+    rng = random.Random(seed)
+    reads, pos = [], 0
+    while pos < len(body):
+        size = rng.randint(1, 4096)
+        reads.append(body[pos:pos + size])
+        pos += size
+    return reads
+
+
+def make_client(reads) -> httpx.AsyncClient:
+    async def replay():
+        for read in reads:
+            yield read
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=replay())
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def legacy_stream(client: httpx.AsyncClient):
+    """The line-based loop stream_openai_response used before byte passthrough"""
+    logger = logging.getLogger("bench.legacy")
+    accumulated_content = ""
+    accumulated_tool_calls = {}
+    chunk_count = 0
+    async with client.stream("POST", UPSTREAM_URL, json={}) as response:
+        async for line in response.aiter_lines():
+            if not line or line.strip() == "":
+                continue
+            if not line.startswith("data: "):
+                continue
+            data_str = line[6:]
+            if data_str.strip() == "[DONE]":
+                yield "data: [DONE]\n\n"
+                return
+            chunk_data = json.loads(data_str)
+            chunk_count += 1
+            if "choices" in chunk_data and len(chunk_data["choices"]) > 0:
+                delta = chunk_data["choices"][0].get("delta", {})
+                content = delta.get("content", "")
+                if content:
+                    accumulated_content += content
+                    logger.info(f"Stream content chunk #{chunk_count}: {content[:100]}... (total: {len(accumulated_content)} chars)")
+                for tool_call_chunk in delta.get("tool_calls", []):
+                    idx = tool_call_chunk.get("index", 0)
+                    if idx not in accumulated_tool_calls:
+                        accumulated_tool_calls[idx] = {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+                    if "function" in tool_call_chunk and "arguments" in tool_call_chunk["function"]:
+                        accumulated_tool_calls[idx]["function"]["arguments"] += tool_call_chunk["function"]["arguments"]
+                if "tool_calls" in delta and "content" not in delta:
+                    delta["content"] = ""
+                    yield f"data: {json.dumps(chunk_data)}\n\n"
+                    continue
+            yield f"{line}\n\n"
+
+
+def current_stream(client: httpx.AsyncClient):
+    return stream_openai_response(
+        agent_id="bench",
+        client=client,
+        url=UPSTREAM_URL,
+        headers={},
+        payload={"model": "gpt-bench", "stream": True},
+        model="gpt-bench"
+    )
+
+
+async def run(name: str, make_stream, reads, rounds: int, chunks: int):
+    best_cpu = best_wall = best_ttfb = float("inf")
+    out_bytes = 0
+    for _ in range(rounds):
+        async with make_client(reads) as client:
+            cpu_start = time.process_time()
+            wall_start = time.perf_counter()
+            ttfb = None
+            out_bytes = 0
+            async for piece in make_stream(client):
+                if ttfb is None:
+                    ttfb = time.perf_counter() - wall_start
+                out_bytes += len(piece)
+            best_wall = min(best_wall, time.perf_counter() - wall_start)
+            best_cpu = min(best_cpu, time.process_time() - cpu_start)
+            best_ttfb = min(best_ttfb, ttfb)
+    print(
+        f"{name:<8} cpu/chunk={best_cpu / chunks * 1e6:7.2f}us  wall={best_wall * 1000:8.1f}ms  "
+        f"ttfb={best_ttfb * 1000:6.2f}ms  out={out_bytes} bytes"
+    )
+    return best_cpu
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--fixture", help="Replay a recorded SSE body instead of synthesizing one")
+    parser.add_argument("--record", help="Write the synthesized SSE body to this path and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.fixture:
+        with open(args.fixture, "rb") as f:
+            body = f.read()
+    else:
+        body = synthesize_stream(args.chunks)
+    if args.record:
+        with open(args.record, "wb") as f:
+            f.write(body)
+        print(f"Recorded {len(body)} bytes to {args.record}")
+        return
+
+    chunks = body.count(b"data:")
+    reads = fragment(body, args.seed)
+    print(f"Replaying {chunks} events / {len(body)} bytes in {len(reads)} network reads")
+    legacy = await run("legacy", legacy_stream, reads, args.rounds, chunks)
+    current = await run("current", current_stream, reads, args.rounds, chunks)
+    print(f"CPU speedup: {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
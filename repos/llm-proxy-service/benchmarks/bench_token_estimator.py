@@ -0,0 +1,105 @@
+"""
+Micro-benchmark: prompt token estimation and the context-window guard
+
+Builds an agent-style conversation (system prompt, tool schemas, N turns of
+user / assistant tool call / tool result) and times guard_context_window:
+
+- cold: every message is new text (first request of a conversation)
+- warm: the same history plus one new turn (every later agent-loop turn,
+  where memoized per-message counts make only the new turn cost anything)
+
+Run where the tiktoken tables can be loaded (e.g. inside the service image)
+to measure the BPE path; otherwise the character heuristic is measured.
+
+Usage:
+    uv run python benchmarks/bench_token_estimator.py --turns 20
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench_llm_proxy.db")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.api.openai_compatible import ChatCompletionRequest  # noqa: E402
+from app.core import token_estimator  # noqa: E402
+from app.core.context_guard import guard_context_window  # noqa: E402
+
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": f"tool_{i}",
+        "description": "Look something up in the knowledge base and return matching passages",
+        "parameters": {"type": "object", "properties": {"query": {"type": "string"}, "limit": {"type": "integer"}}}
+    }
+} for i in range(8)]
+
+
+def words(rng: random.Random, count: int) -> str:
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(count))
+
+
+def conversation(rng: random.Random, turns: int):
+    messages = [{"role": "system", "content": words(rng, 300)}]
+    for turn in range(turns):
+        messages += [
+            {"role": "user", "content": words(rng, 40)},
+            {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{turn}", "type": "function",
+                "function": {"name": "tool_1", "arguments": f'{{"query": "{words(rng, 6)}"}}'}
+            }]},
+            {"role": "tool", "tool_call_id": f"call_{turn}", "content": words(rng, 150)},
+            {"role": "assistant", "content": words(rng, 60)},
+        ]
+    return messages
+
+
+def time_guard(build, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        request = build()
+        start = time.perf_counter()
+        estimate = guard_context_window(request, 128000, "reject")
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples, estimate.prompt_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    token_estimator.load_encodings()
+    mode = "tiktoken" if token_estimator._encodings else "heuristic"
+    rng = random.Random(args.seed)
+
+    cold, tokens = time_guard(
+        lambda: ChatCompletionRequest(model="gpt-4o", messages=conversation(rng, args.turns), tools=TOOLS),
+        args.rounds
+    )
+
+    history = conversation(rng, args.turns)
+
+    def next_turn():
+        history.append({"role": "user", "content": words(rng, 40)})
+        return ChatCompletionRequest(model="gpt-4o", messages=history, tools=TOOLS)
+
+    warm, _ = time_guard(next_turn, args.rounds)
+
+    print(f"encoder={mode} turns={args.turns} messages={1 + 4 * args.turns} prompt_tokens~{tokens}")
+    for label, samples in (("cold", cold), ("warm", warm)):
+        samples.sort()
+        print(
+            f"{label:>5}: p50={statistics.median(samples):8.1f} us  "
+            f"p95={samples[int(len(samples) * 0.95)]:8.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Micro-benchmark: assembling streams with many parallel tool calls
+
+Synthesizes the parsed tool_calls deltas of an OpenAI-style stream in which
+the model calls N tools in parallel, each call's arguments streamed a few
+characters (about one token) per delta, and times:
+
+- legacy: the per-chunk dict merging stream_openai_response used before
+  ToolCallAccumulator (str += per fragment, calls reported at [DONE])
+- current: ToolCallAccumulator.add_openai_delta + finish()
+
+"first event" is how far into the stream (in deltas) the first complete
+tool call becomes available for a trace event. Large arguments (file
+contents, generated code) are where repeated str += starts to cost.
+
+Usage:
+    uv run python benchmarks/bench_tool_calls.py --calls 64 --arg-chars 200
+    uv run python benchmarks/bench_tool_calls.py --calls 8 --arg-chars 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.tool_calls import ToolCallAccumulator  # noqa: E402
+
+
+FRAGMENT_CHARS = 4
+
+
+def synthesize_deltas(calls: int, arg_chars: int):
+    """delta["tool_calls"] lists for `calls` sequential parallel calls"""
+    deltas = []
+    for index in range(calls):
+        arguments = json.dumps({"query": f"lookup {index} " + "x" * arg_chars, "limit": index})
+        pieces = [arguments[pos:pos + FRAGMENT_CHARS] for pos in range(0, len(arguments), FRAGMENT_CHARS)]
+        deltas.append([{
+            "index": index,
+            "id": f"call_{index}",
+            "type": "function",
+            "function": {"name": f"tool_{index}", "arguments": ""}
+        }])
+        deltas.extend([{"index": index, "function": {"arguments": piece}}] for piece in pieces)
+    return deltas
+
+
+def legacy(deltas):
+    accumulated_tool_calls = {}
+    for tool_calls_delta in deltas:
+        for tool_call_chunk in tool_calls_delta:
+            idx = tool_call_chunk.get("index", 0)
+            tool_call = accumulated_tool_calls.get(idx)
+            if tool_call is None:
+                tool_call = accumulated_tool_calls[idx] = {
+                    "id": tool_call_chunk.get("id", ""),
+                    "type": tool_call_chunk.get("type", "function"),
+                    "function": {"name": "", "arguments": ""}
+                }
+            if "id" in tool_call_chunk:
+                tool_call["id"] = tool_call_chunk["id"]
+            if "type" in tool_call_chunk:
+                tool_call["type"] = tool_call_chunk["type"]
+            func_chunk = tool_call_chunk.get("function")
+            if func_chunk:
+                if "name" in func_chunk:
+                    tool_call["function"]["name"] = func_chunk["name"]
+                if "arguments" in func_chunk:
+                    tool_call["function"]["arguments"] += func_chunk["arguments"]
+    # Every call is only reported at [DONE]
+    return list(accumulated_tool_calls.values()), len(deltas)
+
+
+def current(deltas):
+    accumulator = ToolCallAccumulator()
+    first_event = None
+    for position, tool_calls_delta in enumerate(deltas, start=1):
+        if accumulator.add_openai_delta(tool_calls_delta) and first_event is None:
+            first_event = position
+    if accumulator.finish() and first_event is None:
+        first_event = len(deltas)
+    return accumulator.tool_calls(), first_event
+
+
+def run(name: str, assemble, deltas, rounds: int):
+    best = float("inf")
+    result = first_event = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result, first_event = assemble(deltas)
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"{name:<8} {best / len(deltas) * 1e6:6.2f}us/delta  total={best * 1000:7.2f}ms  "
+        f"first event after {first_event}/{len(deltas)} deltas"
+    )
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=64, help="Parallel tool calls in the stream")
+    parser.add_argument("--arg-chars", type=int, default=200, help="Approximate argument JSON size per call")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    deltas = synthesize_deltas(args.calls, args.arg_chars)
+    print(f"{args.calls} parallel calls, {len(deltas)} tool_calls deltas")
+    legacy_time, legacy_calls = run("legacy", legacy, deltas, args.rounds)
+    current_time, current_calls = run("current", current, deltas, args.rounds)
+    assert legacy_calls == current_calls, "assembled tool calls differ"
+    print(f"speedup: {legacy_time / current_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Pytest configuration and fixtures for LLM Proxy Service tests
+"""
+import os
+
+# Must be set before app modules create their engines
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+import pytest_asyncio
+
+from app.core.http_client import upstream_clients
+from app.core.llm_call_writer import llm_call_writer, trace_event_writer
+from app.core.tool_call_writer import tool_call_writer
+
+
+def clear_writers():
+    for writer in (llm_call_writer, trace_event_writer, tool_call_writer):
+        writer._buffer.clear()
+    tool_call_writer._unwritten.clear()
+    tool_call_writer._results.clear()
+
+
+@pytest_asyncio.fixture
+async def proxy_state():
+    """Pooled clients are bound to the test's event loop; buffered rows are per test"""
+    clear_writers()
+    yield llm_call_writer
+    await upstream_clients.close()
+    clear_writers()
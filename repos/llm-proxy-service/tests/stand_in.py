@@ -0,0 +1,37 @@
+"""
+Local stand-in for upstream LLM providers
+
+Serves a FastAPI app with uvicorn on a background thread so proxy code is
+exercised over a real socket through the pooled upstream clients.
+"""
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI
+
+
+class StandInServer:
+    """Runs a FastAPI app on 127.0.0.1:<free port> for the duration of a test"""
+
+    def __init__(self, app: FastAPI):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "StandInServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Stand-in server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
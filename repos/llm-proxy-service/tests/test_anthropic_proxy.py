@@ -0,0 +1,248 @@
+"""
+Tests for the Anthropic provider path against a local stand-in Messages API
+"""
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.openai_compatible import (
+    ChatCompletionRequest,
+    convert_openai_to_anthropic,
+    proxy_anthropic,
+)
+from app.core.llm_call_writer import llm_call_writer
+
+from .stand_in import StandInServer
+
+
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "get_weather",
+        "description": "Current weather for a city",
+        "parameters": {"type": "object", "properties": {"city": {"type": "string"}}}
+    }
+}]
+
+MESSAGE_RESPONSE = {
+    "id": "msg_01",
+    "type": "message",
+    "role": "assistant",
+    "model": "claude-test",
+    "content": [
+        {"type": "text", "text": "Checking the weather."},
+        {"type": "tool_use", "id": "toolu_01", "name": "get_weather", "input": {"city": "Seoul"}}
+    ],
+    "stop_reason": "tool_use",
+    "usage": {"input_tokens": 20, "cache_read_input_tokens": 5, "output_tokens": 12}
+}
+
+
+def sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+STREAM_EVENTS = "".join([
+    sse({"type": "message_start", "message": {"id": "msg_02", "usage": {"input_tokens": 30, "output_tokens": 1}}}),
+    sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}),
+    sse({"type": "ping"}),
+    sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Hello"}}),
+    sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": ", 세계"}}),
+    sse({"type": "content_block_stop", "index": 0}),
+    sse({"type": "content_block_start", "index": 1, "content_block": {"type": "tool_use", "id": "toolu_02", "name": "get_weather", "input": {}}}),
+    sse({"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": "{\"city\": "}}),
+    sse({"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": "\"Busan\"}"}}),
+    sse({"type": "content_block_stop", "index": 1}),
+    sse({"type": "message_delta", "delta": {"stop_reason": "tool_use"}, "usage": {"output_tokens": 18}}),
+    sse({"type": "message_stop"}),
+]).encode()
+
+
+@pytest.fixture
+def anthropic_stand_in():
+    """Stand-in Anthropic Messages API that records the requests it receives"""
+    app = FastAPI()
+    app.state.requests = []
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        app.state.requests.append({"headers": dict(request.headers), "body": body})
+        if body["model"] == "claude-broken":
+            raise HTTPException(status_code=529, detail="overloaded")
+        if not body.get("stream"):
+            return MESSAGE_RESPONSE
+        # Upstream that hangs up before message_delta/message_stop
+        events = STREAM_EVENTS[:STREAM_EVENTS.index(b"event: message_delta")] \
+            if body["model"] == "claude-truncated" else STREAM_EVENTS
+
+        async def stream():
+            # Odd-sized writes so events straddle network reads
+            for offset in range(0, len(events), 37):
+                yield events[offset:offset + 37]
+                await asyncio.sleep(0)
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    with StandInServer(app) as server:
+        server.requests = app.state.requests
+        yield server
+
+
+def make_request(**overrides) -> ChatCompletionRequest:
+    body = {
+        "model": "claude-test",
+        "messages": [
+            {"role": "system", "content": "You are terse."},
+            {"role": "user", "content": "Weather in Seoul and Busan?"}
+        ],
+        "tools": TOOLS,
+        "temperature": 1.5
+    }
+    body.update(overrides)
+    return ChatCompletionRequest(**body)
+
+
+def parse_chunks(body: bytes) -> List[Any]:
+    chunks = []
+    for event in body.decode().split("\n\n"):
+        if event.startswith("data: "):
+            data = event[6:]
+            chunks.append(data if data == "[DONE]" else json.loads(data))
+    return chunks
+
+
+class TestAnthropicConversion:
+    """OpenAI -> Anthropic request translation"""
+
+    def test_system_tools_and_tool_results(self):
+        request = make_request(
+            messages=[
+                {"role": "system", "content": "You are terse."},
+                {"role": "user", "content": "Weather?"},
+                {"role": "assistant", "content": None, "tool_calls": [
+                    {"id": "call_a", "type": "function", "function": {"name": "get_weather", "arguments": "{\"city\": \"Seoul\"}"}},
+                    {"id": "call_b", "type": "function", "function": {"name": "get_weather", "arguments": "{\"city\": \"Busan\"}"}}
+                ]},
+                {"role": "tool", "tool_call_id": "call_a", "content": "Sunny"},
+                {"role": "tool", "tool_call_id": "call_b", "content": "Rain"}
+            ],
+            tool_choice="required",
+            stop="END"
+        )
+
+        payload = convert_openai_to_anthropic(request, "claude-test")
+
+        assert payload["system"] == "You are terse."
+        assert payload["temperature"] == 1.0
+        assert payload["max_tokens"] > 0
+        assert payload["stop_sequences"] == ["END"]
+        assert payload["tool_choice"] == {"type": "any"}
+        assert payload["tools"][0]["input_schema"]["properties"]["city"] == {"type": "string"}
+        assert [m["role"] for m in payload["messages"]] == ["user", "assistant", "user"]
+        assert payload["messages"][1]["content"][1]["input"] == {"city": "Busan"}
+        # Consecutive tool results are merged into one user turn
+        assert [b["tool_use_id"] for b in payload["messages"][2]["content"]] == ["call_a", "call_b"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+class TestAnthropicProxy:
+    """proxy_anthropic over the pooled client against the stand-in"""
+
+    async def test_non_streaming(self, anthropic_stand_in):
+        response = await proxy_anthropic(
+            agent_id="agent-1",
+            api_key="sk-ant-test",
+            request=make_request(),
+            trace_id="trace-1",
+            user_id=7,
+            base_url=f"{anthropic_stand_in.base_url}/v1"
+        )
+
+        sent = anthropic_stand_in.requests[0]
+        assert sent["headers"]["x-api-key"] == "sk-ant-test"
+        assert "anthropic-version" in sent["headers"]
+        assert sent["body"]["system"] == "You are terse."
+
+        message = response["choices"][0]["message"]
+        assert message["content"] == "Checking the weather."
+        assert message["tool_calls"][0]["function"]["name"] == "get_weather"
+        assert json.loads(message["tool_calls"][0]["function"]["arguments"]) == {"city": "Seoul"}
+        assert response["choices"][0]["finish_reason"] == "tool_calls"
+        assert response["usage"] == {"prompt_tokens": 25, "completion_tokens": 12, "total_tokens": 37}
+
+        row = llm_call_writer._buffer[-1]
+        assert row["provider"] == "anthropic"
+        assert row["user_id"] == 7
+        assert row["total_tokens"] == 37
+
+    async def test_streaming(self, anthropic_stand_in):
+        response = await proxy_anthropic(
+            agent_id="agent-1",
+            api_key="sk-ant-test",
+            request=make_request(stream=True),
+            trace_id="trace-1",
+            user_id=7,
+            base_url=f"{anthropic_stand_in.base_url}/v1"
+        )
+        body = b"".join([
+            piece if isinstance(piece, bytes) else piece.encode()
+            async for piece in response.body_iterator
+        ])
+        chunks = parse_chunks(body)
+
+        assert anthropic_stand_in.requests[0]["body"]["stream"] is True
+        assert chunks[0]["choices"][0]["delta"] == {"role": "assistant", "content": ""}
+        assert chunks[-1] == "[DONE]"
+
+        deltas = [c["choices"][0]["delta"] for c in chunks[:-1] if c["choices"]]
+        assert "".join(d.get("content", "") for d in deltas) == "Hello, 세계"
+        tool_deltas = [tc for d in deltas for tc in d.get("tool_calls", [])]
+        assert tool_deltas[0]["id"] == "toolu_02"
+        assert json.loads("".join(tc["function"]["arguments"] for tc in tool_deltas)) == {"city": "Busan"}
+        assert [c["choices"][0]["finish_reason"] for c in chunks[:-1] if c["choices"]][-1] == "tool_calls"
+
+        usage_chunk = chunks[-2]
+        assert usage_chunk["choices"] == []
+        assert usage_chunk["usage"] == {"prompt_tokens": 30, "completion_tokens": 18, "total_tokens": 48}
+
+        row = llm_call_writer._buffer[-1]
+        assert row["success"] is True
+        assert row["response_content"] == "Hello, 세계"
+        assert row["total_tokens"] == 48
+        assert row["response_metadata"]["choices"][0]["message"]["tool_calls"][0]["id"] == "toolu_02"
+
+    async def test_stream_without_message_stop_ends_with_error(self, anthropic_stand_in):
+        response = await proxy_anthropic(
+            agent_id="agent-1",
+            api_key="sk-ant-test",
+            request=make_request(model="claude-truncated", stream=True),
+            user_id=7,
+            base_url=f"{anthropic_stand_in.base_url}/v1"
+        )
+        body = b"".join([
+            piece if isinstance(piece, bytes) else piece.encode()
+            async for piece in response.body_iterator
+        ])
+        chunks = parse_chunks(body)
+
+        assert chunks[-1] == "[DONE]"
+        assert "message_stop" in chunks[-2]["error"]
+        row = llm_call_writer._buffer[-1]
+        assert row["success"] is False
+        assert row["model"] == "claude-truncated"
+
+    async def test_upstream_error(self, anthropic_stand_in):
+        with pytest.raises(HTTPException) as exc_info:
+            await proxy_anthropic(
+                agent_id="agent-1",
+                api_key="sk-ant-test",
+                request=make_request(model="claude-broken"),
+                base_url=f"{anthropic_stand_in.base_url}/v1"
+            )
+        assert exc_info.value.status_code == 529
@@ -0,0 +1,104 @@
+"""
+Tests for running batch requests: retries, idempotent results and rate limits
+"""
+import asyncio
+import uuid
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.api import batches
+from app.core.database import LLMBatch, LLMBatchResult, async_session_maker, init_db
+from app.core.rate_limit import RateLimitExceeded
+
+BODY = {"model": "gpt-test", "messages": [{"role": "user", "content": "Hi"}], "temperature": 0}
+COMPLETION = {"choices": [{"message": {"role": "assistant", "content": "Hello"}, "finish_reason": "stop"}]}
+
+
+@pytest_asyncio.fixture
+async def batch_id(monkeypatch):
+    await init_db()
+
+    async def provider_config(model):
+        return {"provider": "openai", "admin_model_name": model}
+
+    monkeypatch.setattr(batches, "get_provider_config", provider_config)
+    async with async_session_maker() as session:
+        batch = LLMBatch(
+            id=f"batch_{uuid.uuid4().hex}",
+            user_id=1,
+            agent_id="agent-1",
+            trace_id="trace-1",
+            status="in_progress",
+            input_requests=[{"custom_id": "row-1", "body": BODY}],
+            total_requests=1,
+            batch_metadata={"key_id": 3}
+        )
+        session.add(batch)
+        await session.commit()
+        return batch.id
+
+
+async def stored_results(batch_id):
+    async with async_session_maker() as session:
+        result = await session.execute(select(LLMBatchResult).where(LLMBatchResult.batch_id == batch_id))
+        return result.scalars().all()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+class TestExecuteBatchRequest:
+
+    async def test_upstream_5xx_is_retried_until_the_final_attempt(self, batch_id, monkeypatch):
+        async def failing_upstream(*args):
+            raise HTTPException(status_code=502, detail="bad gateway")
+
+        monkeypatch.setattr(batches, "route_completion", failing_upstream)
+        with pytest.raises(HTTPException) as exc_info:
+            await batches.execute_batch_request(batch_id, "row-1", BODY)
+        assert exc_info.value.status_code == 503
+        assert await stored_results(batch_id) == []
+
+        result = await batches.execute_batch_request(batch_id, "row-1", BODY, final_attempt=True)
+        assert result == {"custom_id": "row-1", "status_code": 502}
+        [row] = await stored_results(batch_id)
+        assert row.error["message"] == "bad gateway"
+
+    async def test_concurrent_attempts_store_one_result(self, batch_id, monkeypatch):
+        calls = 0
+
+        async def upstream(*args):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return COMPLETION
+
+        monkeypatch.setattr(batches, "route_completion", upstream)
+        results = await asyncio.gather(
+            batches.execute_batch_request(batch_id, "row-1", BODY),
+            batches.execute_batch_request(batch_id, "row-1", BODY)
+        )
+        assert results == [{"custom_id": "row-1", "status_code": 200}] * 2
+        assert calls == 2
+        assert len(await stored_results(batch_id)) == 1
+
+        # A retry after the result was stored doesn't go upstream again
+        assert await batches.execute_batch_request(batch_id, "row-1", BODY) == results[0]
+        assert calls == 2
+
+    async def test_rate_limited_requests_are_retried_not_stored(self, batch_id, monkeypatch):
+        admitted = []
+
+        async def admit(request, key_id, user_id, agent, model, prompt_tokens=None):
+            admitted.append((key_id, user_id, agent, model))
+            raise RateLimitExceeded(f"key:{key_id}", "requests", 7, {})
+
+        monkeypatch.setattr(batches.rate_limiter, "admit", admit)
+        with pytest.raises(HTTPException) as exc_info:
+            await batches.execute_batch_request(batch_id, "row-1", BODY)
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "7"
+        assert admitted == [(3, 1, "trace-1", "gpt-test")]
+        assert await stored_results(batch_id) == []
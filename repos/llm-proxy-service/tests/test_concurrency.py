@@ -0,0 +1,48 @@
+"""
+Tests for the per-endpoint concurrency limiter and fair queue
+"""
+import asyncio
+
+import pytest
+
+from app.core.concurrency import EndpointBusy, EndpointLimiter
+
+
+@pytest.mark.asyncio
+class TestEndpointLimiter:
+    """Slot accounting, fairness and the queue wait budget"""
+
+    async def test_flooding_flow_does_not_starve_others(self):
+        limiter = EndpointLimiter("http://vllm/v1", max_in_flight=2, max_wait=5)
+        order = []
+
+        async def call(flow: str):
+            lease = await limiter.acquire(flow)
+            order.append(flow)
+            await asyncio.sleep(0.005)
+            lease.release()
+
+        tasks = [asyncio.create_task(call("agent-a:1")) for _ in range(20)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(call("agent-b:2")) for _ in range(3)]
+        await asyncio.gather(*tasks)
+
+        # agent-b's requests are interleaved near the front, not after all 20 of agent-a's
+        assert max(i for i, flow in enumerate(order) if flow == "agent-b:2") < 10
+        assert limiter.stats()["in_flight"] == 0
+        assert limiter.stats()["queue_depth"] == 0
+
+    async def test_wait_budget_exceeded(self):
+        limiter = EndpointLimiter("http://vllm/v1", max_in_flight=1, max_wait=0.05)
+        lease = await limiter.acquire("agent-a:1")
+
+        with pytest.raises(EndpointBusy) as exc_info:
+            await limiter.acquire("agent-b:2")
+        assert exc_info.value.retry_after >= 1
+
+        lease.release()
+        lease.release()  # idempotent
+        stats = limiter.stats()
+        assert stats["rejected"] == 1
+        assert stats["in_flight"] == 0
+        assert stats["queue_depth"] == 0
@@ -0,0 +1,103 @@
+"""
+Tests for the context-window guard
+"""
+import pytest
+
+from app.api.openai_compatible import ChatCompletionRequest
+from app.core.context_guard import ContextWindowExceeded, context_window_for, guard_context_window
+from app.core.token_estimator import estimate_prompt_tokens
+
+
+def make_request(**overrides) -> ChatCompletionRequest:
+    body = {
+        "model": "hosted_vllm/qwen-test",
+        "messages": [
+            {"role": "system", "content": "You are an agent."},
+            {"role": "user", "content": "old question " * 200},
+            {"role": "assistant", "content": None, "tool_calls": [
+                {"id": "call_1", "type": "function", "function": {"name": "search", "arguments": "{}"}}
+            ]},
+            {"role": "tool", "tool_call_id": "call_1", "content": "old result " * 200},
+            {"role": "assistant", "content": "Summary of the old results."},
+            {"role": "user", "content": "And now?"}
+        ],
+        "max_tokens": 100
+    }
+    body.update(overrides)
+    return ChatCompletionRequest(**body)
+
+
+def test_context_window_lookup():
+    assert context_window_for("openai/gpt-4o-mini") == 128000
+    assert context_window_for("gemini-1.5-pro-002") == 2097152
+    assert context_window_for("gemini-2.0-flash") == 1048576
+    # Variants don't inherit their family's window
+    assert context_window_for("gpt-4-32k-0613") == 32768
+    assert context_window_for("gpt-4-0613") == 8192
+    assert context_window_for("gpt-4-1106-preview") == 128000
+    assert context_window_for("gpt-4.1-mini") == 1047576
+    assert context_window_for("gpt-4o", {"context_window": 4096}) == 4096
+    assert context_window_for("my-private-model") is None
+
+
+def test_fits():
+    request = make_request()
+    estimate = guard_context_window(request, 100000)
+    assert estimate.prompt_tokens == estimate_prompt_tokens(request)
+    assert estimate.dropped_messages == 0
+    assert len(request.messages) == 6
+
+
+def test_reject():
+    request = make_request()
+    with pytest.raises(ContextWindowExceeded) as exc_info:
+        guard_context_window(request, 500, "reject")
+    error = exc_info.value.to_openai_error()["error"]
+    assert error["code"] == "context_length_exceeded"
+    assert "500 tokens" in error["message"]
+    assert len(request.messages) == 6
+
+
+def test_truncate_drops_oldest_turns_with_their_tool_results():
+    request = make_request()
+    estimate = guard_context_window(request, 500, "truncate")
+
+    roles = [msg.role for msg in request.messages]
+    assert roles == ["system", "assistant", "user"]
+    assert estimate.dropped_messages == 3
+    assert estimate.prompt_tokens == estimate_prompt_tokens(request)
+    assert estimate.prompt_tokens + 100 <= 500
+
+
+def test_truncate_cannot_fit_latest_turn():
+    request = make_request(messages=[{"role": "user", "content": "x " * 4000}])
+    with pytest.raises(ContextWindowExceeded):
+        guard_context_window(request, 500, "truncate")
+
+
+def test_off_and_unknown_window():
+    assert guard_context_window(make_request(), 10, "off").dropped_messages == 0
+    assert guard_context_window(make_request(), None, "reject").context_window is None
+
+
+def test_heuristic_margin(monkeypatch):
+    monkeypatch.setattr("app.core.context_guard.CONTEXT_GUARD_HEURISTIC_MARGIN", 0.2)
+    prompt_tokens = estimate_prompt_tokens(make_request())
+
+    # Within the margin over the window: not rejected, the estimate may have run high
+    window = int(prompt_tokens * 0.9) + 100
+    assert guard_context_window(make_request(), window, "reject").dropped_messages == 0
+    with pytest.raises(ContextWindowExceeded):
+        guard_context_window(make_request(), int(prompt_tokens * 0.7) + 100, "reject")
+
+    # Within the window but not the margin: truncated, the estimate may have run low
+    request = make_request()
+    estimate = guard_context_window(request, int(prompt_tokens * 1.1) + 100, "truncate")
+    assert estimate.dropped_messages > 0
+    assert estimate.prompt_tokens * 1.2 + 100 <= int(prompt_tokens * 1.1) + 100
+
+    # Exact counts get no margin
+    monkeypatch.setattr("app.core.context_guard.is_exact", lambda model: True)
+    with pytest.raises(ContextWindowExceeded):
+        guard_context_window(make_request(), window, "reject")
+    assert guard_context_window(make_request(), int(prompt_tokens * 1.1) + 100, "truncate").dropped_messages == 0
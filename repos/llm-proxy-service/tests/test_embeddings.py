@@ -0,0 +1,133 @@
+"""
+Tests for embedding micro-batching and batch input validation
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+
+from app.api.batches import parse_batch_file
+from app.api.embeddings import EmbeddingRequest, send_embeddings
+from app.core.embedding_batcher import EmbeddingBatcher
+
+from .stand_in import StandInServer
+
+
+@pytest.fixture
+def embeddings_upstream():
+    app = FastAPI()
+    calls = []
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        payload = await request.json()
+        calls.append(payload["input"])
+        return {
+            "object": "list",
+            "model": payload["model"],
+            # Upstreams may return the vectors out of order
+            "data": [
+                {"object": "embedding", "index": index, "embedding": [float(len(text))]}
+                for index, text in reversed(list(enumerate(payload["input"])))
+            ],
+            "usage": {"prompt_tokens": 12, "total_tokens": 12}
+        }
+
+    with StandInServer(app) as server:
+        yield f"{server.base_url}/v1", calls
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+async def test_concurrent_requests_share_one_upstream_call(embeddings_upstream):
+    base_url, calls = embeddings_upstream
+    config = {"provider": "openai-compatible", "api_key": "sk-test", "base_url": base_url}
+    batcher = EmbeddingBatcher(window_ms=20, max_inputs=16)
+    key = (base_url, "sk-test", "embed-model", None, None)
+
+    async def embed(inputs):
+        request = EmbeddingRequest(model="embed-model", input=inputs)
+        return await batcher.embed(
+            key, request.input_list(), lambda batch: send_embeddings(config, "embed-model", request, batch)
+        )
+
+    first, second = await asyncio.gather(embed("a"), embed(["bbb", "cccccc"]))
+
+    assert calls == [["a", "bbb", "cccccc"]]
+    assert [item["embedding"] for item in first["data"]] == [[1.0]]
+    assert [(item["index"], item["embedding"]) for item in second["data"]] == [(0, [3.0]), (1, [6.0])]
+    assert first["usage"]["prompt_tokens"] + second["usage"]["prompt_tokens"] == 12
+    assert second["batch"] == {"inputs": 3, "requests": 2}
+    assert batcher.stats()["upstream_calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting_and_errors_reach_every_caller():
+    batcher = EmbeddingBatcher(window_ms=10_000, max_inputs=2)
+    sent = []
+
+    async def send(inputs):
+        sent.append(list(inputs))
+        raise HTTPException(status_code=503, detail="unavailable")
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            batcher.embed(("k",), ["x"], send),
+            batcher.embed(("k",), ["y"], send),
+            return_exceptions=True
+        ),
+        timeout=1
+    )
+
+    assert sent == [["x", "y"]]
+    assert all(isinstance(result, HTTPException) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_rejected_merged_call_is_retried_per_caller():
+    batcher = EmbeddingBatcher(window_ms=10_000, max_inputs=3)
+    sent = []
+
+    async def send(inputs):
+        sent.append(list(inputs))
+        if "" in inputs:
+            raise HTTPException(status_code=400, detail="input must not be empty")
+        return {
+            "data": [{"index": index, "embedding": [float(len(text))]} for index, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+        }
+
+    good, bad = await asyncio.wait_for(
+        asyncio.gather(
+            batcher.embed(("k",), ["ab", "c"], send),
+            batcher.embed(("k",), [""], send),
+            return_exceptions=True
+        ),
+        timeout=1
+    )
+
+    assert sent[0] == ["ab", "c", ""]
+    assert sorted(sent[1:]) == [[""], ["ab", "c"]]
+    assert [item["embedding"] for item in good["data"]] == [[2.0], [1.0]]
+    assert good["batch"] == {"inputs": 2, "requests": 1}
+    assert isinstance(bad, HTTPException) and bad.status_code == 400
+    assert batcher.stats()["split_batches"] == 1
+
+
+def test_parse_batch_file():
+    lines = [
+        {"custom_id": "r1", "method": "POST", "url": "/v1/chat/completions",
+         "body": {"model": "m", "messages": [{"role": "user", "content": "hi"}]}},
+        {"custom_id": "r2", "body": {"model": "m", "messages": [{"role": "user", "content": "yo"}]}},
+    ]
+    content = "\n".join(json.dumps(line) for line in lines).encode() + b"\n\n"
+    assert [item["custom_id"] for item in parse_batch_file(content)] == ["r1", "r2"]
+
+    duplicate = content + json.dumps(lines[0]).encode()
+    with pytest.raises(HTTPException, match="line 4: duplicate custom_id"):
+        parse_batch_file(duplicate)
+
+    streaming = dict(lines[0], body={**lines[0]["body"], "stream": True})
+    with pytest.raises(HTTPException, match="streaming"):
+        parse_batch_file(json.dumps(streaming).encode())
@@ -0,0 +1,193 @@
+"""
+Tests for replica selection, ejection and retry across a model's endpoint pool
+"""
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.api import openai_compatible
+from app.api.openai_compatible import ChatCompletionRequest, proxy_openai_compatible
+from app.core.endpoint_pool import LLM_POOL_EJECT_AFTER, EndpointPool, endpoint_pool, pool_endpoints
+
+from .stand_in import StandInServer
+
+
+def test_pool_endpoints_normalizes():
+    assert pool_endpoints("http://a:8000/v1/", ["http://b:8000/v1", "http://a:8000/v1", ""]) == [
+        "http://a:8000/v1",
+        "http://b:8000/v1",
+    ]
+
+
+class TestEndpointPool:
+    """Selection strategies and outlier ejection"""
+
+    def test_least_outstanding(self):
+        pool = EndpointPool("least_outstanding")
+        endpoints = ["http://a/v1", "http://b/v1"]
+        pool.on_start("http://a/v1")
+        assert pool.pick(endpoints) == "http://b/v1"
+
+    def test_ewma_prefers_faster_replica(self):
+        pool = EndpointPool("ewma")
+        endpoints = ["http://a/v1", "http://b/v1"]
+        pool.state("http://a/v1").observe_latency(900)
+        pool.state("http://b/v1").observe_latency(100)
+        assert all(pool.pick(endpoints) == "http://b/v1" for _ in range(10))
+
+    def test_consecutive_failures_eject(self):
+        pool = EndpointPool()
+        endpoints = ["http://a/v1", "http://b/v1"]
+        for _ in range(LLM_POOL_EJECT_AFTER):
+            pool.on_finish("http://a/v1", pool.on_start("http://a/v1"), success=False)
+
+        assert pool.state("http://a/v1").ejected
+        assert all(pool.pick(endpoints) == "http://b/v1" for _ in range(10))
+        # With every other replica excluded the ejected one is still used
+        assert pool.pick(endpoints, exclude=["http://b/v1"]) == "http://a/v1"
+        assert pool.pick(endpoints, exclude=endpoints) is None
+
+    def test_health_events(self):
+        pool = EndpointPool()
+        pool.handle_health_event(json.dumps({"endpoint": "http://a/v1/", "healthy": False, "error": "Timeout"}))
+        assert pool.state("http://a/v1").ejected
+
+        pool.handle_health_event(json.dumps({"endpoint": "http://a/v1", "healthy": True, "response_time_ms": 40}))
+        state = pool.state("http://a/v1")
+        assert not state.ejected
+        assert state.ewma_ms == 40
+
+        pool.handle_health_event("not json")
+
+
+@pytest.fixture
+def replicas():
+    """One replica that is down (503) and one that answers"""
+    down, up = FastAPI(), FastAPI()
+    up.state.requests = []
+
+    @down.post("/v1/chat/completions")
+    async def unavailable():
+        return JSONResponse({"error": "loading model"}, status_code=503)
+
+    @up.post("/v1/chat/completions")
+    async def completions(request: Request):
+        up.state.requests.append(await request.json())
+        return {
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "pooled-model",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4}
+        }
+
+    with StandInServer(down) as down_server, StandInServer(up) as up_server:
+        endpoints = [f"{down_server.base_url}/v1", f"{up_server.base_url}/v1"]
+        yield endpoints, up.state.requests
+        for url in endpoints:
+            endpoint_pool._states.pop(url, None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+class TestPooledProxy:
+    """proxy_openai_compatible over a two-replica pool"""
+
+    async def test_retries_on_other_replica(self, replicas):
+        endpoints, served = replicas
+        down_url = endpoints[0]
+        # Make the broken replica the preferred one
+        endpoint_pool.state(endpoints[1]).outstanding += 1
+
+        response = await proxy_openai_compatible(
+            agent_id="agent-1",
+            api_key="sk-test",
+            base_url=down_url,
+            request=ChatCompletionRequest(model="pooled-model", messages=[{"role": "user", "content": "hi"}]),
+            provider="openai-compatible",
+            endpoints=endpoints
+        )
+        endpoint_pool.state(endpoints[1]).outstanding -= 1
+
+        assert response["choices"][0]["message"]["content"] == "ok"
+        assert len(served) == 1
+        assert endpoint_pool.state(down_url).counters["failures"] == 1
+        assert endpoint_pool.state(endpoints[1]).ewma_ms is not None
+
+
+@pytest.fixture
+def mock_upstream(monkeypatch):
+    """Route the proxy's upstream calls to a handler instead of the network"""
+    urls = ["http://replica-a/v1", "http://replica-b/v1"]
+
+    def install(handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(openai_compatible, "get_upstream_client", lambda url, provider: client)
+        return urls
+
+    yield install
+    for url in urls:
+        endpoint_pool._states.pop(url, None)
+
+
+def pooled_call(urls, **overrides):
+    return proxy_openai_compatible(
+        agent_id="agent-1",
+        api_key="sk-test",
+        base_url=urls[0],
+        request=ChatCompletionRequest(
+            model="pooled-model", messages=[{"role": "user", "content": "hi"}], **overrides
+        ),
+        provider="openai-compatible",
+        endpoints=urls
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+class TestReplicaAccounting:
+    """Every attempt on a replica is settled, whatever way it ends"""
+
+    async def test_read_timeout_counts_as_failure(self, mock_upstream):
+        def handler(request):
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        urls = mock_upstream(handler)
+        with pytest.raises(httpx.ReadTimeout):
+            await pooled_call(urls)
+
+        states = [endpoint_pool.state(url) for url in urls]
+        # Not retried: the request may already be generating
+        assert sum(state.counters["requests"] for state in states) == 1
+        assert sum(state.counters["failures"] for state in states) == 1
+        assert all(state.outstanding == 0 for state in states)
+
+    async def test_streaming_5xx_counts_as_failure(self, mock_upstream):
+        urls = mock_upstream(lambda request: httpx.Response(500, text="boom"))
+        for _ in range(LLM_POOL_EJECT_AFTER):
+            response = await pooled_call(urls, stream=True)
+            body = b"".join([
+                piece if isinstance(piece, bytes) else piece.encode()
+                async for piece in response.body_iterator
+            ])
+            assert b"boom" in body
+
+        states = [endpoint_pool.state(url) for url in urls]
+        assert sum(state.counters["failures"] for state in states) == LLM_POOL_EJECT_AFTER
+        assert all(state.outstanding == 0 for state in states)
+
+    async def test_abandoned_stream_is_not_a_failure(self, mock_upstream):
+        events = b'data: {"choices": [{"index": 0, "delta": {"content": "hi"}}]}\n\ndata: [DONE]\n\n'
+        urls = mock_upstream(lambda request: httpx.Response(200, content=events))
+        response = await pooled_call(urls, stream=True)
+        await response.body_iterator.__anext__()
+        await response.body_iterator.aclose()
+
+        states = [endpoint_pool.state(url) for url in urls]
+        assert sum(state.counters["requests"] for state in states) == 1
+        assert sum(state.counters["failures"] for state in states) == 0
+        assert all(state.outstanding == 0 for state in states)
@@ -0,0 +1,132 @@
+"""
+Tests for the Gemini provider path against a local stand-in generateContent API
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.api import openai_compatible
+from app.api.openai_compatible import ChatCompletionRequest, convert_openai_to_gemini, proxy_gemini
+from app.core.llm_call_writer import llm_call_writer
+
+from .stand_in import StandInServer
+
+
+STREAM_CHUNKS = [
+    {"candidates": [{"content": {"role": "model", "parts": [{"text": "Hello"}]}}]},
+    {"candidates": [{"content": {"role": "model", "parts": [{"text": " there"}]}, "finishReason": "STOP"}]},
+    # Usage arrives on a trailing chunk after finishReason
+    {"usageMetadata": {"promptTokenCount": 9, "candidatesTokenCount": 3, "totalTokenCount": 12}},
+]
+STREAM_BODY = "".join(f"data: {json.dumps(chunk)}\r\n\r\n" for chunk in STREAM_CHUNKS).encode()
+
+
+@pytest.fixture
+def gemini_stand_in(monkeypatch):
+    """Stand-in Gemini API that records the requests it receives"""
+    app = FastAPI()
+    app.state.requests = []
+
+    @app.post("/v1beta/models/{model_action}")
+    async def generate(model_action: str, request: Request):
+        body = await request.json()
+        app.state.requests.append({
+            "path": model_action,
+            "query": dict(request.query_params),
+            "headers": dict(request.headers),
+            "body": body
+        })
+        if model_action.endswith(":generateContent"):
+            return {
+                "candidates": [{"content": {"parts": [{"text": "Hi"}]}, "finishReason": "MAX_TOKENS"}],
+                "usageMetadata": {"promptTokenCount": 4, "candidatesTokenCount": 1, "totalTokenCount": 5}
+            }
+
+        async def stream():
+            for offset in range(0, len(STREAM_BODY), 29):
+                yield STREAM_BODY[offset:offset + 29]
+                await asyncio.sleep(0)
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    with StandInServer(app) as server:
+        monkeypatch.setattr(openai_compatible, "GEMINI_BASE_URL", f"{server.base_url}/v1beta")
+        server.requests = app.state.requests
+        yield server
+
+
+def make_request(**overrides) -> ChatCompletionRequest:
+    body = {
+        "model": "gemini-test",
+        "messages": [
+            {"role": "system", "content": "Answer in English."},
+            {"role": "user", "content": "Hello?"}
+        ]
+    }
+    body.update(overrides)
+    return ChatCompletionRequest(**body)
+
+
+def test_zero_sampling_parameters_are_kept():
+    config = convert_openai_to_gemini(make_request(temperature=0, top_p=0))["generationConfig"]
+    assert config["temperature"] == 0
+    assert config["topP"] == 0
+
+    defaults = convert_openai_to_gemini(make_request())["generationConfig"]
+    assert defaults["temperature"] == 0.7
+    assert defaults["topP"] == 1.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+class TestGeminiProxy:
+    """proxy_gemini over the pooled client against the stand-in"""
+
+    async def test_non_streaming(self, gemini_stand_in):
+        response = await proxy_gemini(
+            agent_id="agent-1",
+            api_key="g-key",
+            request=make_request(),
+            trace_id="trace-1",
+            user_id=3
+        )
+
+        sent = gemini_stand_in.requests[0]
+        assert sent["headers"]["x-goog-api-key"] == "g-key"
+        assert "key" not in sent["query"]
+        assert sent["body"]["systemInstruction"] == {"parts": [{"text": "Answer in English."}]}
+        assert [c["role"] for c in sent["body"]["contents"]] == ["user"]
+
+        assert response["choices"][0]["message"]["content"] == "Hi"
+        assert response["choices"][0]["finish_reason"] == "length"
+        assert llm_call_writer._buffer[-1]["total_tokens"] == 5
+
+    async def test_streaming_records_usage(self, gemini_stand_in):
+        response = await proxy_gemini(
+            agent_id="agent-1",
+            api_key="g-key",
+            request=make_request(stream=True),
+            trace_id="trace-1",
+            user_id=3
+        )
+        body = "".join([
+            piece.decode() if isinstance(piece, bytes) else piece
+            async for piece in response.body_iterator
+        ])
+        events = [event[6:] for event in body.split("\n\n") if event.startswith("data: ")]
+
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(event) for event in events[:-1]]
+        assert len({chunk["id"] for chunk in chunks}) == 1
+        assert chunks[0]["choices"][0]["delta"]["role"] == "assistant"
+        assert "".join(c["choices"][0]["delta"].get("content", "") for c in chunks if c["choices"]) == "Hello there"
+        assert chunks[-1]["usage"] == {"prompt_tokens": 9, "completion_tokens": 3, "total_tokens": 12}
+
+        row = llm_call_writer._buffer[-1]
+        assert row["provider"] == "gemini"
+        assert row["user_id"] == 3
+        assert row["response_content"] == "Hello there"
+        assert row["total_tokens"] == 12
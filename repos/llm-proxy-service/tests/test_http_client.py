@@ -0,0 +1,63 @@
+"""
+Tests for pooled upstream clients: one client per origin, connection reuse stats
+"""
+import asyncio
+
+import pytest
+
+from app.core.http_client import POOL_PROFILES, UpstreamClientRegistry, _origin, normalize_provider
+
+
+async def serve_ok(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Minimal keep-alive HTTP/1.1 server"""
+    try:
+        while await reader.readuntil(b"\r\n\r\n"):
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nContent-Type: text/plain\r\n\r\nok")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def test_clients_are_shared_per_origin():
+    registry = UpstreamClientRegistry()
+    client = registry.get_client("https://api.openai.com/v1/chat/completions", "openai")
+
+    assert registry.get_client("https://api.openai.com:443/v1/embeddings", "openai") is client
+    assert registry.get_client("http://api.openai.com/v1/models", "openai") is not client
+    assert client.timeout.read == POOL_PROFILES["openai"].timeout
+    assert _origin("http://tracing-service:8004/api/logs") == "http://tracing-service:8004"
+    assert [normalize_provider(p) for p in ("openai_compatible", "gemini", "vllm", None)] == [
+        "openai-compatible", "gemini", "openai-compatible", "internal"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused_and_counted():
+    server = await asyncio.start_server(serve_ok, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    registry = UpstreamClientRegistry()
+    try:
+        client = registry.get_client(url, "openai")
+        for _ in range(3):
+            response = await client.get(f"{url}/v1/models")
+            assert response.text == "ok"
+
+        stats = registry.get_stats()[_origin(url)]
+        assert stats["requests"] == 3
+        assert (stats["new_connections"], stats["reused_connections"]) == (1, 2)
+        assert stats["reuse_ratio"] == round(2 / 3, 4)
+        assert stats["p50_handshake_ms"] == 0.0
+
+        # Closed clients are replaced on next use; stats carry on
+        await registry.close()
+        assert client.is_closed
+        replacement = registry.get_client(url, "openai")
+        assert replacement is not client
+        await replacement.get(f"{url}/v1/models")
+        assert registry.get_stats()[_origin(url)]["new_connections"] == 2
+    finally:
+        await registry.close()
+        server.close()
+        await server.wait_closed()
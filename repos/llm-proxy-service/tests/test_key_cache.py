@@ -0,0 +1,70 @@
+"""
+Tests for the platform key validation cache
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.core.key_cache import PlatformKeyCache, hash_key
+
+USER = {"user_id": 7, "key_id": 3, "key_name": "ci"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_validation_and_hits_skip_user_service():
+    cache = PlatformKeyCache()
+    calls = []
+
+    async def fetch(api_key):
+        calls.append(api_key)
+        await asyncio.sleep(0.01)
+        return dict(USER), True
+
+    cache._fetch = fetch
+    results = await asyncio.gather(*(cache.validate("a2g_hot") for _ in range(5)))
+    assert all(result["user_id"] == 7 for result in results)
+    assert await cache.validate("a2g_hot") == USER
+    assert calls == ["a2g_hot"]
+    assert cache.hits == 1
+    # Uses are coalesced per key for the batched last_used flush
+    assert list(cache._pending_last_used) == [3]
+
+
+@pytest.mark.asyncio
+async def test_rejections_are_negatively_cached_but_errors_are_not():
+    cache = PlatformKeyCache()
+    answers = [(None, True), (None, False), (None, False)]
+
+    async def fetch(api_key):
+        return answers.pop(0)
+
+    cache._fetch = fetch
+    assert await cache.validate("a2g_bad") is None
+    assert await cache.validate("a2g_bad") is None
+    assert len(answers) == 2
+
+    assert await cache.validate("a2g_flaky") is None
+    assert await cache.validate("a2g_flaky") is None
+    assert answers == []
+
+
+@pytest.mark.asyncio
+async def test_revocation_during_validation_wins():
+    cache = PlatformKeyCache()
+    release = asyncio.Event()
+
+    async def fetch(api_key):
+        await release.wait()
+        return dict(USER), True
+
+    cache._fetch = fetch
+    pending = asyncio.create_task(cache.validate("a2g_revoked"))
+    await asyncio.sleep(0)
+    cache.handle_revocation(json.dumps({"key_hash": hash_key("a2g_revoked"), "key_id": 3}))
+    release.set()
+
+    assert await pending is None
+    assert await cache.validate("a2g_revoked") is None
+    assert cache._entries[hash_key("a2g_revoked")][0] is None
+    assert cache._generations == {}
@@ -0,0 +1,68 @@
+"""
+Tests for the write-behind row buffers: requeue on failure and bad-row isolation
+"""
+import pytest
+
+from app.core.llm_call_writer import RowWriter
+
+
+def recording_writer(bad=(), database_up=True, **kwargs):
+    """Writer whose INSERT fails for any batch containing a row in `bad`"""
+    writer = RowWriter(batch_size=8, **kwargs)
+    writer.inserts = []
+    writer.written = []
+
+    async def insert(rows):
+        writer.inserts.append(len(rows))
+        if any(row["n"] in bad for row in rows):
+            raise RuntimeError("constraint violated")
+        writer.written.extend(row["n"] for row in rows)
+
+    async def probe():
+        return database_up
+
+    writer._insert = insert
+    writer._database_up = probe
+    return writer
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_requeued_in_order_until_retries_run_out():
+    writer = recording_writer(bad={3}, max_retries=3)
+    for n in range(10):
+        writer.add({"n": n})
+
+    await writer.flush()
+    await writer.flush()
+    assert [row["n"] for row in writer._buffer] == list(range(10))
+    assert writer.counters["failed_flushes"] == 2
+    assert writer.counters["dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_bad_row_is_isolated_and_dropped_after_max_retries():
+    writer = recording_writer(bad={3}, max_retries=2)
+    for n in range(10):
+        writer.add({"n": n})
+
+    await writer.flush()
+    await writer.flush()
+    assert writer._buffer == []
+    assert sorted(writer.written) == [n for n in range(10) if n != 3]
+    assert writer.counters["dropped"] == 1
+    assert writer.counters["written"] == 9
+    # Later batches go back to plain bulk inserts
+    writer.add({"n": 10})
+    await writer.flush()
+    assert writer.inserts[-1] == 1 and writer.written[-1] == 10
+
+
+@pytest.mark.asyncio
+async def test_rows_are_kept_while_the_database_is_down():
+    writer = recording_writer(bad=set(range(4)), database_up=False, max_retries=1)
+    for n in range(4):
+        writer.add({"n": n})
+
+    await writer.flush()
+    assert [row["n"] for row in writer._buffer] == list(range(4))
+    assert writer.counters["dropped"] == 0
@@ -0,0 +1,88 @@
+"""
+Tests for the session -> trace and trace -> agent lookup caches
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.core import lookup_cache
+from app.core.lookup_cache import LookupCache, handle_agent_changed, handle_session_deleted
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_lookup_and_misses_are_not_cached():
+    cache = LookupCache("test", ttl=60, max_size=2)
+    calls = []
+
+    async def load(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    assert await asyncio.gather(*(cache.get("a", lambda: load("A")) for _ in range(5))) == ["A"] * 5
+    assert calls == ["A"]
+    assert await cache.get("a", lambda: load("other")) == "A"
+
+    assert await cache.get("missing", lambda: load(None)) is None
+    assert await cache.get("missing", lambda: load(None)) is None
+    assert calls == ["A", None, None]
+
+    # Least recently used entry goes first
+    await cache.get("b", lambda: load("B"))
+    await cache.get("a", lambda: load("A"))
+    await cache.get("c", lambda: load("C"))
+    assert list(cache._entries) == ["a", "c"]
+
+
+@pytest.mark.asyncio
+async def test_entries_expire():
+    cache = LookupCache("test", ttl=0)
+
+    async def load():
+        return "value"
+
+    await cache.get("k", load)
+    await cache.get("k", load)
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_overwritten():
+    cache = LookupCache("test")
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "stale"
+
+    pending = asyncio.create_task(cache.get("k", load))
+    await asyncio.sleep(0)
+    cache.invalidate("k")
+    release.set()
+    assert await pending == "stale"
+    assert "k" not in cache._entries
+
+
+@pytest.mark.asyncio
+async def test_pubsub_events_drop_entries(monkeypatch):
+    sessions = LookupCache("session_trace")
+    agents = LookupCache("trace_agent")
+    monkeypatch.setattr(lookup_cache, "session_trace_cache", sessions)
+    monkeypatch.setattr(lookup_cache, "trace_agent_cache", agents)
+
+    async def value(result):
+        return result
+
+    await sessions.get("s1", lambda: value("trace-1"))
+    await sessions.get("s2", lambda: value("trace-2"))
+    await agents.get("trace-old", lambda: value({"id": "7", "status": "DEVELOPMENT"}))
+    await agents.get("trace-x", lambda: value({"id": "7", "status": "DEVELOPMENT"}))
+    await agents.get("trace-y", lambda: value({"id": "8", "status": "DEVELOPMENT"}))
+
+    handle_session_deleted(json.dumps({"session_id": "s1"}))
+    handle_session_deleted("not json")
+    assert list(sessions._entries) == ["s2"]
+
+    handle_agent_changed(json.dumps({"action": "trace_id", "agent_id": 7, "trace_ids": ["trace-old", "trace-new"]}))
+    assert list(agents._entries) == ["trace-y"]
@@ -0,0 +1,101 @@
+"""
+Tests for the Prometheus metrics collectors and their hot-path hooks
+"""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.api.openai_compatible import ChatCompletionRequest, proxy_openai_compatible
+from app.core import metrics
+from app.core.metrics import Counter, Histogram
+
+from .stand_in import StandInServer
+
+
+def test_histogram_exposition():
+    histogram = Histogram("test_latency_seconds", "Test latency", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(("chat",), 0.1)
+    histogram.observe(("chat",), 0.5)
+    histogram.observe(("chat",), 3.0)
+
+    lines = histogram.render()
+    assert lines[1] == "# TYPE test_latency_seconds histogram"
+    assert 'test_latency_seconds_bucket{route="chat",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{route="chat",le="1.0"} 2' in lines
+    assert 'test_latency_seconds_bucket{route="chat",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_sum{route="chat"} 3.6' in lines
+    assert 'test_latency_seconds_count{route="chat"} 3' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("test_errors_total", "Test errors", ("model",))
+    counter.inc(('my "model"\\v1',), 2)
+    assert counter.render()[-1] == 'test_errors_total{model="my \\"model\\"\\\\v1"} 2'
+
+
+def test_completion_without_request_context():
+    labels = ("openai", "direct-model", "direct")
+    before = metrics.upstream_duration.count(labels)
+    metrics.record_completion("openai", "direct-model", 1500, {"prompt_tokens": 10, "completion_tokens": 30})
+    assert metrics.upstream_duration.count(labels) == before + 1
+    assert metrics.tokens.value(labels + ("completion",)) >= 30
+
+    metrics.record_completion("openai", "direct-model", 0, {}, cache_source="response_cache")
+    assert metrics.cache_hits.value(labels + ("response_cache",)) >= 1
+
+
+@pytest.fixture
+def streaming_upstream():
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions():
+        async def events():
+            for content in ("Hel", "lo"):
+                chunk = {"choices": [{"index": 0, "delta": {"content": content}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            usage = {"choices": [], "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}}
+            yield f"data: {json.dumps(usage)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    with StandInServer(app) as server:
+        yield f"{server.base_url}/v1"
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+async def test_stream_records_request_metrics(streaming_upstream):
+    request_metrics = metrics.track_request("chat")
+    request_metrics.provider = "openai-compatible"
+    request_metrics.model = "metrics-model"
+    labels = request_metrics.labels
+
+    response = await proxy_openai_compatible(
+        agent_id="agent-1",
+        api_key="sk-test",
+        base_url=streaming_upstream,
+        request=ChatCompletionRequest(
+            model="metrics-model", messages=[{"role": "user", "content": "hi"}], stream=True
+        ),
+        provider="openai-compatible"
+    )
+    async for _ in response.body_iterator:
+        pass
+
+    assert request_metrics.first_token_at is not None
+    for histogram in (
+        metrics.time_to_first_token,
+        metrics.request_duration,
+        metrics.upstream_duration,
+        metrics.queue_wait,
+        metrics.tokens_per_second,
+    ):
+        assert histogram.count(labels) == 1, histogram.name
+    assert metrics.tokens.value(labels + ("completion",)) == 2
+
+    exposition = metrics.render_metrics()
+    assert 'llm_proxy_time_to_first_token_seconds_count{provider="openai-compatible",model="metrics-model",route="chat"} 1' in exposition
+    assert "llm_proxy_trace_events_dropped_total " in exposition
@@ -0,0 +1,142 @@
+"""
+Tests for the admin model config cache and its pub/sub invalidation
+"""
+import asyncio
+import json
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from app.core import model_registry
+from app.core.model_registry import LLM_MODELS_CHANNEL, ModelConfigCache, admin_db_engine
+from app.core.redis_client import RedisClient
+
+
+async def add_model(name, provider="openai", endpoint="http://vllm-1:8000/v1/", replicas=None, active=True):
+    async with admin_db_engine.begin() as conn:
+        await conn.execute(
+            text("""
+                INSERT INTO llm_models (name, provider, endpoint, api_key_encrypted, is_active, endpoints, model_config)
+                VALUES (:name, :provider, :endpoint, 'key', :active, :endpoints, :config)
+            """),
+            {
+                "name": name, "provider": provider, "endpoint": endpoint, "active": active,
+                "endpoints": json.dumps(replicas or []), "config": json.dumps({"context_window": 8192})
+            }
+        )
+
+
+@pytest_asyncio.fixture
+async def admin_db():
+    async with admin_db_engine.begin() as conn:
+        await conn.execute(text("""
+            CREATE TABLE llm_models (
+                name TEXT, provider TEXT, endpoint TEXT, api_key_encrypted TEXT,
+                is_active BOOLEAN, endpoints TEXT, model_config TEXT
+            )
+        """))
+    yield
+    await admin_db_engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("admin_db")
+class TestModelConfigCache:
+
+    async def test_lookup_by_last_name_segment(self):
+        await add_model("openai/gpt-oss-20b", replicas=["http://vllm-2:8000/v1", "http://vllm-1:8000/v1"])
+        await add_model("z-org/gpt-oss-20b", provider="anthropic")
+        await add_model("retired-model", active=False)
+        cache = ModelConfigCache(ttl=60)
+
+        config = await cache.get("hosted_vllm/gpt-oss-20b")
+        assert config["name"] == "openai/gpt-oss-20b"
+        assert config["endpoints"] == ["http://vllm-1:8000/v1", "http://vllm-2:8000/v1"]
+        assert config["configuration"] == {"context_window": 8192}
+        assert await cache.get("other/gpt-oss-20b") is config
+        assert await cache.get("retired-model") is None
+
+    async def test_serves_index_until_invalidated_by_event(self):
+        cache = ModelConfigCache(ttl=60)
+        assert await cache.get("gpt-new") is None
+
+        await add_model("gpt-new")
+        assert await cache.get("gpt-new") is None
+
+        cache.handle_event(json.dumps({"action": "created", "name": "gpt-new"}))
+        assert (await cache.get("gpt-new"))["provider"] == "openai"
+
+        # Unparseable payloads still invalidate
+        async with admin_db_engine.begin() as conn:
+            await conn.execute(text("UPDATE llm_models SET is_active = false"))
+        cache.handle_event("not json")
+        assert await cache.get("gpt-new") is None
+
+    async def test_expires_after_ttl(self):
+        cache = ModelConfigCache(ttl=0)
+        assert await cache.get("gpt-ttl") is None
+        await add_model("gpt-ttl")
+        assert await cache.get("gpt-ttl") is not None
+
+    async def test_db_error_keeps_previous_index(self):
+        await add_model("gpt-kept")
+        cache = ModelConfigCache(ttl=60)
+        assert await cache.get("gpt-kept") is not None
+
+        async with admin_db_engine.begin() as conn:
+            await conn.execute(text("DROP TABLE llm_models"))
+        cache.invalidate()
+        assert (await cache.get("gpt-kept"))["name"] == "gpt-kept"
+        # Still stale, so the next lookup tries again
+        assert not cache._is_fresh()
+
+    async def test_invalidation_during_refresh_leaves_index_stale(self, monkeypatch):
+        await add_model("gpt-raced")
+        cache = ModelConfigCache(ttl=60)
+        session_maker = model_registry.admin_db_session_maker
+
+        def invalidating_session():
+            # An admin change lands while the rows are being read
+            cache.invalidate()
+            return session_maker()
+
+        monkeypatch.setattr(model_registry, "admin_db_session_maker", invalidating_session)
+        assert await cache.get("gpt-raced") is not None
+        assert not cache._is_fresh()
+
+
+async def wait_for(check, expected):
+    for _ in range(100):
+        if await check() == expected:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"timed out waiting for {expected!r}")
+
+
+@pytest.mark.asyncio
+async def test_pubsub_messages_reach_channel_handlers():
+    client = RedisClient()
+    client.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    cache = ModelConfigCache(ttl=60)
+    # Fresh until something invalidates it
+    cache._loaded_at = float("inf")
+    received = []
+
+    async def on_other(message):
+        received.append(message)
+
+    client.subscribe(LLM_MODELS_CHANNEL, cache.handle_event)
+    client.subscribe("other:channel", on_other)
+    client.start_listener()
+    try:
+        await wait_for(lambda: client.redis_client.pubsub_numsub(LLM_MODELS_CHANNEL), [(LLM_MODELS_CHANNEL, 1)])
+        await client.redis_client.publish("other:channel", "hello")
+        await client.redis_client.publish(LLM_MODELS_CHANNEL, json.dumps({"action": "deleted"}))
+        await wait_for(lambda: asyncio.sleep(0, cache._is_fresh()), False)
+
+        assert received == ["hello"]
+        assert not cache._is_fresh()
+    finally:
+        await client.close()
@@ -0,0 +1,132 @@
+"""
+Tests for rate-limit configuration, headers, the fail-open path and the
+sliding-window script (run by fakeredis' embedded Lua)
+"""
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+from app.api.openai_compatible import ChatCompletionRequest
+from app.core import redis_client
+from app.core.rate_limit import RateLimiter, RateLimitExceeded, RateLimitTicket
+from app.core.token_estimator import estimate_prompt_tokens
+
+
+def make_request(content: str = "Hello", **overrides) -> ChatCompletionRequest:
+    return ChatCompletionRequest(model="m", messages=[{"role": "user", "content": content}], **overrides)
+
+
+def test_overrides_take_precedence():
+    limiter = RateLimiter(
+        defaults={"user": {"rpm": 60, "tpm": 1000}},
+        overrides={"user:7": {"rpm": 0, "tpm": 5000}, "model:big": {"tpm": 100}}
+    )
+    assert limiter.limits_for("user:1") == (60, 1000)
+    assert limiter.limits_for("user:7") == (0, 5000)
+    assert limiter.limits_for("model:big") == (0, 100)
+    assert limiter.limits_for("agent:abc") == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_disabled_or_without_redis_admits():
+    assert await RateLimiter(defaults={}, overrides={}).admit(make_request(), 1, 2, "trace", "m") is None
+    # Redis is not connected in tests: fail open
+    limiter = RateLimiter(defaults={"user": {"rpm": 1}}, overrides={})
+    assert await limiter.admit(make_request(), 1, 2, "trace", "m") is None
+
+
+def test_ticket_headers():
+    ticket = RateLimitTicket(["ratelimit:user:2:1"], 10, {"x-ratelimit-remaining-requests": "4"})
+
+    response = Response()
+    assert ticket.apply({"id": "chatcmpl-1"}, response) == {"id": "chatcmpl-1"}
+    assert response.headers["x-ratelimit-remaining-requests"] == "4"
+
+    stream = StreamingResponse(iter([b""]))
+    assert ticket.apply(stream, Response()) is stream
+    assert stream.headers["x-ratelimit-remaining-requests"] == "4"
+
+
+def test_estimate_grows_with_prompt_and_tools():
+    short = estimate_prompt_tokens(make_request("Hi"))
+    long = estimate_prompt_tokens(make_request("Hi " * 400))
+    with_tools = estimate_prompt_tokens(make_request("Hi", tools=[{"type": "function", "function": {"name": "lookup"}}]))
+    assert short < with_tools < long
+    assert 250 < long < 350
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client.redis_client, "redis_client", client)
+    return client
+
+
+async def reserved_tokens(client, ticket: RateLimitTicket) -> int:
+    return int(await client.hget(ticket.window_keys[0], "tok") or 0)
+
+
+@pytest.mark.asyncio
+async def test_script_admits_until_the_budget_then_denies_with_retry_after(fake_redis):
+    limiter = RateLimiter(defaults={"user": {"rpm": 2}}, overrides={})
+
+    first = await limiter.admit(make_request(), None, 7, None, "m")
+    second = await limiter.admit(make_request(), None, 7, None, "m")
+    assert first.headers["x-ratelimit-remaining-requests"] == "1"
+    assert second.headers["x-ratelimit-remaining-requests"] == "0"
+
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        await limiter.admit(make_request(), None, 7, None, "m")
+    assert exc_info.value.scope == "user:7"
+    assert 1 <= int(exc_info.value.headers["Retry-After"]) <= 60
+    # A denied request reserves nothing
+    assert int(await fake_redis.hget(first.window_keys[0], "req")) == 2
+    # Other users have their own budget
+    assert await limiter.admit(make_request(), None, 8, None, "m") is not None
+    assert limiter.stats()["limited_by_scope"] == {"user": 1}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_swaps_the_reservation_for_actual_usage(fake_redis):
+    limiter = RateLimiter(defaults={"key": {"tpm": 10000}}, overrides={})
+    ticket = await limiter.admit(make_request(max_tokens=500), 3, None, None, "m", prompt_tokens=100)
+    assert await reserved_tokens(fake_redis, ticket) == 600
+
+    limiter.reconcile(42)
+    limiter.reconcile(1000)  # only the first reconcile counts
+    await asyncio.gather(*limiter._pending)
+    assert await reserved_tokens(fake_redis, ticket) == 42
+    assert limiter.counters["reconciled_tokens"] == -558
+
+
+@pytest.mark.asyncio
+async def test_release_refunds_requests_that_never_reconciled(fake_redis):
+    limiter = RateLimiter(defaults={"key": {"tpm": 10000}}, overrides={})
+
+    # Handler failed before any LLMCall was recorded
+    failed = await limiter.admit(make_request(max_tokens=50), 3, None, None, "m", prompt_tokens=50)
+    limiter.release(failed)
+    await asyncio.gather(*limiter._pending)
+    assert await reserved_tokens(fake_redis, failed) == 0
+
+    # A stream is released when it ends, not when the handler returns
+    async def upstream():
+        yield b"data: {\"error\": \"upstream 503\"}\n\n"
+
+    streamed = await limiter.admit(make_request(max_tokens=50), 3, None, None, "m", prompt_tokens=50)
+    response = StreamingResponse(upstream())
+    limiter.release(streamed, response)
+    assert not streamed.reconciled
+    assert [chunk async for chunk in response.body_iterator]
+    await asyncio.gather(*limiter._pending)
+    assert await reserved_tokens(fake_redis, streamed) == 0
+
+    # Already reconciled: release leaves the recorded usage alone
+    recorded = await limiter.admit(make_request(max_tokens=50), 3, None, None, "m", prompt_tokens=50)
+    limiter.reconcile(30)
+    limiter.release(recorded)
+    await asyncio.gather(*limiter._pending)
+    assert await reserved_tokens(fake_redis, recorded) == 30
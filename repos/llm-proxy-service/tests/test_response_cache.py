@@ -0,0 +1,142 @@
+"""
+Tests for the exact-match response cache and replaying cached completions
+"""
+import asyncio
+import json
+
+import fakeredis
+import pytest
+
+from app.api.openai_compatible import ChatCompletionRequest, _entry_from_sse, serve_cached_completion
+from app.core import redis_client, response_cache as response_cache_module
+from app.core.llm_call_writer import llm_call_writer
+from app.core.response_cache import CACHE_INDEX_KEY, ResponseCache, cache_key
+
+TOOL_CALL = {"id": "call_1", "type": "function", "function": {"name": "search", "arguments": '{"q": "x"}'}}
+
+
+def make_request(content: str = "Summarize the ticket", **overrides) -> ChatCompletionRequest:
+    body = {"model": "gpt-test", "messages": [{"role": "user", "content": content}], "temperature": 0}
+    body.update(overrides)
+    return ChatCompletionRequest(**body)
+
+
+def completion(content="Done", tool_calls=None, total_tokens=7):
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return {
+        "choices": [{"message": message, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": total_tokens - 2, "completion_tokens": 2, "total_tokens": total_tokens}
+    }
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client.redis_client, "redis_client", client)
+    return client
+
+
+async def stored(cache: ResponseCache):
+    await asyncio.gather(*cache._pending)
+
+
+def test_key_covers_what_determines_the_completion():
+    key = cache_key(make_request())
+    assert cache_key(ChatCompletionRequest(
+        temperature=0, messages=[{"content": "Summarize the ticket", "role": "user"}], model="gpt-test"
+    )) == key
+    assert cache_key(make_request(stream=True)) == key
+    assert cache_key(make_request("Summarize the other ticket")) != key
+    assert cache_key(make_request(max_tokens=10)) != key
+    assert cache_key(make_request(tools=[{"type": "function", "function": {"name": "search"}}])) != key
+
+
+@pytest.mark.asyncio
+async def test_only_deterministic_requests_are_cached(fake_redis):
+    cache = ResponseCache(enabled=True)
+    for request in (make_request(temperature=0.7), make_request(n=2)):
+        assert cache.store(request, completion()) is None
+        assert await cache.lookup(request) is None
+    assert await ResponseCache(enabled=False).lookup(make_request()) is None
+    assert cache.counters["misses"] == 0
+
+
+@pytest.mark.asyncio
+async def test_store_then_hit(fake_redis):
+    cache = ResponseCache(enabled=True)
+    request = make_request()
+    assert await cache.lookup(request) is None
+
+    key = cache.store(request, completion(content=None, tool_calls=[TOOL_CALL]))
+    await stored(cache)
+    entry = await cache.lookup(make_request(stream=True))
+
+    assert entry == {
+        "content": "",
+        "tool_calls": [TOOL_CALL],
+        # Streamed responses are saved with "stop"; tool calls mean tool_calls
+        "finish_reason": "tool_calls",
+        "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+        "key": key
+    }
+    assert cache.stats() == {
+        "hits": 1, "misses": 1, "stores": 1, "skipped_too_large": 0, "evictions": 0, "errors": 0,
+        "tokens_saved": 7, "enabled": True, "hit_ratio": 0.5
+    }
+    assert 0 < await fake_redis.ttl(f"llm_cache:{key}") <= response_cache_module.RESPONSE_CACHE_TTL
+
+
+@pytest.mark.asyncio
+async def test_oldest_entries_evicted_and_large_ones_skipped(fake_redis, monkeypatch):
+    monkeypatch.setattr(response_cache_module, "RESPONSE_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(response_cache_module, "RESPONSE_CACHE_MAX_ENTRY_BYTES", 200)
+    cache = ResponseCache(enabled=True)
+    for content in ("one", "two", "three"):
+        cache.store(make_request(content), completion(content))
+        await stored(cache)
+
+    assert await cache.lookup(make_request("one")) is None
+    assert (await cache.lookup(make_request("three")))["content"] == "three"
+    assert await fake_redis.zcard(CACHE_INDEX_KEY) == 2
+    assert cache.counters["evictions"] == 1
+
+    cache.store(make_request("big"), completion("x" * 500))
+    await stored(cache)
+    assert await cache.lookup(make_request("big")) is None
+    assert cache.counters["skipped_too_large"] == 1
+
+
+@pytest.mark.asyncio
+async def test_store_failure_is_counted_not_raised(monkeypatch):
+    class Broken:
+        def pipeline(self, **kwargs):
+            raise ConnectionError("redis down")
+
+    monkeypatch.setattr(redis_client.redis_client, "redis_client", Broken())
+    cache = ResponseCache(enabled=True)
+    cache.store(make_request(), completion())
+    await stored(cache)
+    assert cache.counters["errors"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+async def test_stream_replay_rebuilds_the_cached_entry():
+    entry = {
+        "content": "Searching",
+        "tool_calls": [TOOL_CALL],
+        "finish_reason": "tool_calls",
+        "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+        "key": "abc"
+    }
+    response = await serve_cached_completion("agent-1", 7, "trace-1", "openai", make_request(stream=True), entry)
+    chunks = [piece.encode() async for piece in response.body_iterator]
+
+    assert chunks[-1] == b"data: [DONE]\n\n"
+    assert _entry_from_sse(chunks) == {key: value for key, value in entry.items() if key != "key"}
+    row = llm_call_writer._buffer[-1]
+    assert row["total_tokens"] == 0
+    assert row["response_metadata"]["cache"]["tokens_saved"] == 7
+    assert row["response_metadata"]["cache"]["source"] == "response_cache"
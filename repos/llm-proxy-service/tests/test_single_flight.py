@@ -0,0 +1,187 @@
+"""
+Tests for single-flight coalescing of identical in-flight requests
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.responses import StreamingResponse
+
+from app.api.openai_compatible import ChatCompletionRequest, follow_flight
+from app.core.llm_call_writer import llm_call_writer
+from app.core.single_flight import SingleFlight
+
+
+def make_request(stream: bool = False) -> ChatCompletionRequest:
+    return ChatCompletionRequest(
+        model="gpt-test",
+        messages=[{"role": "user", "content": "Summarize the ticket"}],
+        temperature=0,
+        stream=stream
+    )
+
+
+def sse_chunk(delta: dict, finish_reason=None, usage=None) -> str:
+    chunk = {"id": "chatcmpl-1", "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+    if usage:
+        chunk = {"id": "chatcmpl-1", "choices": [], "usage": usage}
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+async def collect(body_iterator) -> bytes:
+    return b"".join([
+        piece if isinstance(piece, bytes) else piece.encode()
+        async for piece in body_iterator
+    ])
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+class TestSingleFlight:
+    """One upstream call per burst of identical requests, one LLMCall row per caller"""
+
+    async def test_non_streaming_followers_share_leader_result(self):
+        flights = SingleFlight(mode="deterministic")
+        upstream_calls = 0
+
+        async def call():
+            nonlocal upstream_calls
+            upstream_calls += 1
+            await asyncio.sleep(0.05)
+            return {
+                "choices": [{"message": {"role": "assistant", "content": "Done"}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}
+            }
+
+        async def caller(agent_id: str):
+            request = make_request()
+            return await flights.run(
+                request, "openai", call,
+                lambda flight: follow_flight(flight, agent_id, 1, f"trace-{agent_id}", "openai", request)
+            )
+
+        results = await asyncio.gather(*(caller(f"agent-{i}") for i in range(5)))
+
+        assert upstream_calls == 1
+        assert all(r["choices"][0]["message"]["content"] == "Done" for r in results)
+        assert flights.stats() == {"leaders": 1, "followers": 4, "mode": "deterministic", "in_flight": 0}
+        rows = llm_call_writer._buffer
+        assert sorted(row["agent_id"] for row in rows) == [f"agent-{i}" for i in range(1, 5)]
+        assert all(row["total_tokens"] == 0 for row in rows)
+        assert all(row["response_metadata"]["cache"]["tokens_saved"] == 7 for row in rows)
+
+    async def test_streaming_follower_joins_mid_stream(self):
+        flights = SingleFlight(mode="deterministic")
+        upstream_calls = 0
+        chunks = [
+            sse_chunk({"role": "assistant", "content": ""}),
+            sse_chunk({"content": "Hel"}),
+            sse_chunk({"content": "lo"}),
+            sse_chunk({}, finish_reason="stop"),
+            sse_chunk({}, usage={"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}),
+            "data: [DONE]\n\n"
+        ]
+
+        async def upstream():
+            for chunk in chunks:
+                yield chunk
+                await asyncio.sleep(0.01)
+
+        async def call():
+            nonlocal upstream_calls
+            upstream_calls += 1
+            return StreamingResponse(upstream(), media_type="text/event-stream")
+
+        request = make_request(stream=True)
+        leader = await flights.run(request, "openai", call, None)
+        leader_iter = leader.body_iterator
+        first = await leader_iter.__anext__()
+
+        follower = await flights.run(
+            request, "openai", call,
+            lambda flight: follow_flight(flight, "agent-2", 2, "trace-2", "openai", request)
+        )
+        leader_rest, follower_body = await asyncio.gather(
+            collect(leader_iter),
+            collect(follower.body_iterator)
+        )
+
+        assert upstream_calls == 1
+        expected = "".join(chunks).encode()
+        assert first.encode() + leader_rest == expected
+        assert follower_body == expected
+        row = llm_call_writer._buffer[-1]
+        assert row["agent_id"] == "agent-2"
+        assert row["response_content"] == "Hello"
+        assert row["response_metadata"]["cache"]["tokens_saved"] == 5
+        assert flights.stats()["in_flight"] == 0
+
+    async def test_follower_stream_ends_with_error_when_leader_disconnects(self):
+        flights = SingleFlight(mode="deterministic")
+
+        async def upstream():
+            yield sse_chunk({"role": "assistant", "content": ""})
+            yield sse_chunk({"content": "Hel"})
+            await asyncio.sleep(10)
+            yield "data: [DONE]\n\n"
+
+        async def call():
+            return StreamingResponse(upstream(), media_type="text/event-stream")
+
+        request = make_request(stream=True)
+        leader = await flights.run(request, "openai", call, None)
+        await leader.body_iterator.__anext__()
+        follower = await flights.run(
+            request, "openai", call,
+            lambda flight: follow_flight(flight, "agent-2", 2, "trace-2", "openai", request)
+        )
+        following = asyncio.create_task(collect(follower.body_iterator))
+        await leader.body_iterator.__anext__()
+        # The leader's client goes away mid-stream
+        await leader.body_iterator.aclose()
+
+        events = [event[6:] for event in (await following).decode().split("\n\n") if event.startswith("data: ")]
+        assert events[-1] == "[DONE]"
+        assert "error" in json.loads(events[-2])
+        assert json.loads(events[1])["choices"][0]["delta"]["content"] == "Hel"
+        row = llm_call_writer._buffer[-1]
+        assert row["agent_id"] == "agent-2"
+        assert row["success"] is False
+        assert flights.stats()["in_flight"] == 0
+
+    @pytest.mark.parametrize("leader_done", [False, True])
+    async def test_follower_of_upstream_error_records_failure(self, leader_done):
+        flights = SingleFlight(mode="deterministic")
+        started = asyncio.Event()
+
+        async def upstream():
+            yield sse_chunk({"role": "assistant", "content": ""})
+            await started.wait()
+            yield f"data: {json.dumps({'error': 'upstream 500'})}\n\n"
+            if leader_done:
+                # Providers whose error path still closes with [DONE]
+                yield "data: [DONE]\n\n"
+
+        async def call():
+            return StreamingResponse(upstream(), media_type="text/event-stream")
+
+        request = make_request(stream=True)
+        leader = await flights.run(request, "openai", call, None)
+        leading = asyncio.create_task(collect(leader.body_iterator))
+        await asyncio.sleep(0)
+        follower = await flights.run(
+            request, "openai", call,
+            lambda flight: follow_flight(flight, "agent-2", 2, "trace-2", "openai", request)
+        )
+        following = asyncio.create_task(collect(follower.body_iterator))
+        await asyncio.sleep(0)
+        started.set()
+        await leading
+
+        events = [event[6:] for event in (await following).decode().split("\n\n") if event.startswith("data: ")]
+        assert events[-2:] == [json.dumps({"error": "upstream 500"}), "[DONE]"]
+        assert events.count("[DONE]") == 1
+        row = llm_call_writer._buffer[-1]
+        assert row["agent_id"] == "agent-2"
+        assert row["success"] is False
+        assert row["error_message"] == "upstream 500"
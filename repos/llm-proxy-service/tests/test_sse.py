@@ -0,0 +1,99 @@
+"""
+Tests for byte-level SSE framing and the OpenAI streaming passthrough
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.api.openai_compatible import ChatCompletionRequest, stream_openai_response
+from app.core.llm_call_writer import llm_call_writer
+from app.core.sse import SSEDecoder, event_data
+
+from .stand_in import StandInServer
+
+
+def sse(payload) -> bytes:
+    return f"data: {payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)}\n\n".encode()
+
+
+def chunk(delta, finish_reason=None):
+    return {"id": "chatcmpl-1", "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+
+class TestSSEDecoder:
+
+    def test_events_split_across_reads(self):
+        stream = sse(chunk({"content": "세계"})) + b": keep-alive\n\n" + sse("[DONE]")
+        decoder = SSEDecoder()
+        # One byte at a time, including through the multi-byte characters
+        events = [event for i in range(len(stream)) for event in decoder.feed(stream[i:i + 1])]
+
+        assert b"".join(events) == stream
+        assert json.loads(event_data(events[0]))["choices"][0]["delta"]["content"] == "세계"
+        assert event_data(events[1]) is None
+        assert event_data(events[2]) == b"[DONE]"
+        assert decoder.flush() is None
+
+    def test_crlf_and_several_events_per_read(self):
+        decoder = SSEDecoder()
+        assert decoder.feed(b"data: a\r\n\r\ndata: b\r\n\r\ndata: ") == [b"data: a\r\n\r\n", b"data: b\r\n\r\n"]
+        assert decoder.feed(b"c") == []
+        # Upstream closed mid-event: the tail is terminated for the client
+        assert decoder.flush() == b"data: c\r\n\r\n"
+
+    def test_event_data_fields(self):
+        assert event_data(b"data:no-space\n\n") == b"no-space"
+        assert event_data(b"event: delta\nid: 7\ndata: {\"a\":\ndata:  1}\n\n") == b"{\"a\":\n 1}"
+        assert event_data(b"event: ping\n\n") is None
+
+
+UPSTREAM = b"".join([
+    b": connected\n\n",
+    sse(chunk({"role": "assistant", "content": ""})),
+    sse(chunk({"content": "Hello, "})),
+    sse(chunk({"content": "세계"})),
+    sse(chunk({}, finish_reason="stop")),
+    sse({"id": "chatcmpl-1", "choices": [], "usage": {"prompt_tokens": 9, "completion_tokens": 3, "total_tokens": 12}}),
+    sse("[DONE]"),
+])
+
+
+@pytest.fixture
+def openai_stand_in():
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions():
+        async def stream():
+            # Odd-sized writes so events (and UTF-8 characters) straddle network reads
+            for offset in range(0, len(UPSTREAM), 13):
+                yield UPSTREAM[offset:offset + 13]
+                await asyncio.sleep(0)
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    with StandInServer(app) as server:
+        yield server
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+async def test_stream_is_forwarded_verbatim_and_recorded(openai_stand_in):
+    request = ChatCompletionRequest(model="gpt-test", messages=[{"role": "user", "content": "Hi"}], stream=True)
+    body = b"".join([
+        piece if isinstance(piece, bytes) else piece.encode()
+        async for piece in stream_openai_response(
+            "agent-1", None, f"{openai_stand_in.base_url}/v1/chat/completions", {},
+            {"model": "gpt-test", "stream": True}, "gpt-test", user_id=7, request=request
+        )
+    ])
+
+    # Everything but the keep-alive comment, byte for byte
+    assert body == UPSTREAM[len(b": connected\n\n"):]
+    row = llm_call_writer._buffer[-1]
+    assert row["success"] is True
+    assert row["response_content"] == "Hello, 세계"
+    assert row["total_tokens"] == 12
@@ -0,0 +1,77 @@
+"""
+Tests for ToolCall persistence: result matching, latency and the query endpoints
+"""
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from app.api.openai_compatible import ChatMessage, process_tool_calls, process_tool_responses
+from app.api.v1.traces import get_trace_tool_calls, get_trace_tool_latency, query_events
+from app.core.database import TraceEvent, async_session_maker, engine, init_db
+from app.core.llm_call_writer import trace_event_writer
+from app.core.tool_call_writer import ToolCallWriter, tool_call_writer
+
+
+def tool_call(call_id, name, arguments='{"q": "x"}'):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+def test_result_completes_buffered_row():
+    writer = ToolCallWriter()
+    writer.add_call("agent-1", "trace-1", tool_call("call_a", "search"))
+    row = writer._buffer[0]
+    row["called_at"] -= timedelta(milliseconds=250)
+
+    assert writer.add_result("agent-1", "call_a", '{"hits": 3}') == "search"
+    assert row["tool_args"] == {"q": "x"}
+    assert row["tool_result"] == {"hits": 3}
+    assert 250 <= row["latency_ms"] < 1000
+    # Same call id from another agent is not this row
+    assert writer.add_result("agent-2", "call_a", "x") is None
+    assert writer.stats()["pending_results"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+async def test_late_result_updates_written_row():
+    await init_db()
+    agent_id, trace_id = f"agent-{uuid.uuid4().hex}", f"trace-{uuid.uuid4().hex}"
+    messages = [
+        ChatMessage(role="user", content="find it"),
+        ChatMessage(role="assistant", tool_calls=[tool_call("call_old", "search")]),
+        ChatMessage(role="tool", tool_call_id="call_old", content="stale"),
+        ChatMessage(role="assistant", tool_calls=[tool_call("call_slow", "fetch_page")]),
+        ChatMessage(role="tool", tool_call_id="call_slow", content="<html>"),
+    ]
+    try:
+        await process_tool_calls(agent_id, [tool_call("call_fast", "search"), tool_call("call_slow", "fetch_page")],
+                                 trace_id=trace_id)
+        await tool_call_writer.flush()
+
+        # Only the tool messages after the last assistant turn are new
+        await process_tool_responses(agent_id, messages, trace_id=trace_id)
+        assert tool_call_writer.stats()["pending_results"] == 1
+        await tool_call_writer.flush()
+        assert tool_call_writer.stats()["pending_results"] == 0
+        await trace_event_writer.flush()
+
+        async with async_session_maker() as db:
+            page = await get_trace_tool_calls(
+                trace_id, tool_name=None, min_latency_ms=0, sort="latency", page=1, limit=10, db=db
+            )
+            assert [call["tool_call_id"] for call in page["tool_calls"]] == ["call_slow"]
+            assert page["tool_calls"][0]["tool_result"] == {"content": "<html>"}
+            assert page["total"] == 1
+
+            summary = await get_trace_tool_latency(trace_id, db=db)
+            assert {tool["tool_name"]: tool["completed_count"] for tool in summary["tools"]} == {
+                "fetch_page": 1, "search": 0
+            }
+
+            events = await query_events(db, TraceEvent.trace_id == trace_id, None, page=1, limit=2)
+            assert events["total"] == 3
+            assert [event["event_type"] for event in events["events"]] == ["tool_call", "tool_call"]
+            assert events["events"][0]["event_data"]["tool_name"] == "search"
+    finally:
+        await engine.dispose()
@@ -0,0 +1,159 @@
+"""
+Tests for streamed tool-call assembly and early tool-call trace events
+"""
+import json
+
+import httpx
+import pytest
+
+from app.api import openai_compatible
+from app.api.openai_compatible import (
+    ChatCompletionRequest,
+    convert_gemini_to_openai,
+    convert_openai_to_gemini,
+    stream_openai_response,
+)
+from app.core.tool_calls import ToolCallAccumulator, tool_call_event
+
+
+def call_delta(index, arguments, call_id=None, name=None):
+    delta = {"index": index, "function": {"arguments": arguments}}
+    if call_id:
+        delta.update({"id": call_id, "type": "function"})
+        delta["function"]["name"] = name
+    return delta
+
+
+def test_parallel_calls_complete_as_the_next_one_starts():
+    accumulator = ToolCallAccumulator()
+    assert accumulator.add_openai_delta([call_delta(0, "", "call_a", "search")]) == []
+    assert accumulator.add_openai_delta([call_delta(0, '{"q": ')]) == []
+    assert accumulator.add_openai_delta([call_delta(0, '"x"}')]) == []
+
+    completed = accumulator.add_openai_delta([call_delta(1, '{"q"', "call_b", "lookup")])
+    assert completed == [{"id": "call_a", "type": "function", "function": {"name": "search", "arguments": '{"q": "x"}'}}]
+
+    accumulator.add_openai_delta([call_delta(1, ': "y"}')])
+    assert [call["id"] for call in accumulator.finish()] == ["call_b"]
+    assert accumulator.finish() == []
+    assert [call["function"]["arguments"] for call in accumulator.tool_calls()] == ['{"q": "x"}', '{"q": "y"}']
+
+
+def test_interleaved_calls_wait_for_complete_arguments():
+    accumulator = ToolCallAccumulator()
+    accumulator.add_openai_delta([call_delta(0, '{"a": ', "call_a", "first")])
+    # Index 0 is mid-object when index 1 starts, so it stays open
+    assert accumulator.add_openai_delta([call_delta(1, '{"b": 2}', "call_b", "second")]) == []
+    completed = accumulator.add_openai_delta([call_delta(0, "1}"), call_delta(2, "{}", "call_c", "third")])
+    assert [call["id"] for call in completed] == ["call_a", "call_b"]
+    assert [call["id"] for call in accumulator.finish()] == ["call_c"]
+
+
+def test_block_and_whole_call_providers():
+    anthropic = ToolCallAccumulator()
+    assert anthropic.start(3, "toolu_1", "get_weather") == 0
+    assert anthropic.append(3, '{"city": ') == 0
+    assert anthropic.append(9, "ignored") is None
+    anthropic.append(3, '"Seoul"}')
+    assert anthropic.complete(3)["function"]["arguments"] == '{"city": "Seoul"}'
+    assert anthropic.complete(3) is None
+
+    gemini = ToolCallAccumulator()
+    index, tool_call = gemini.add_complete("get_weather", {"city": "Busan"})
+    assert index == 0
+    assert tool_call["id"].startswith("call_")
+    assert json.loads(tool_call["function"]["arguments"]) == {"city": "Busan"}
+    assert gemini.finish() == []
+
+
+def test_agent_transfer_event():
+    event_type, data = tool_call_event({
+        "id": "call_1",
+        "type": "function",
+        "function": {"name": "transfer_to_agent", "arguments": '{"agent_name": "billing"}'}
+    })
+    assert event_type == "agent_transfer"
+    assert data["target_agent"] == "billing"
+
+    event_type, data = tool_call_event({"id": "call_2", "function": {"name": "search", "arguments": "{"}})
+    assert (event_type, data["tool_name"]) == ("tool_call", "search")
+
+
+def test_gemini_function_call_round_trip():
+    request = ChatCompletionRequest(
+        model="gemini-test",
+        messages=[
+            {"role": "user", "content": "Weather in Seoul?"},
+            {"role": "assistant", "content": None, "tool_calls": [{
+                "id": "call_1", "type": "function",
+                "function": {"name": "get_weather", "arguments": '{"city": "Seoul"}'}
+            }]},
+            {"role": "tool", "tool_call_id": "call_1", "content": '{"temp": 21}'}
+        ],
+        tools=[{"type": "function", "function": {"name": "get_weather", "parameters": {"type": "object"}}}],
+        tool_choice="required"
+    )
+    payload = convert_openai_to_gemini(request)
+    assert payload["contents"][1] == {
+        "role": "model", "parts": [{"functionCall": {"name": "get_weather", "args": {"city": "Seoul"}}}]
+    }
+    assert payload["contents"][2]["parts"] == [
+        {"functionResponse": {"name": "get_weather", "response": {"temp": 21}}}
+    ]
+    assert payload["tools"][0]["functionDeclarations"][0]["name"] == "get_weather"
+    assert payload["toolConfig"] == {"functionCallingConfig": {"mode": "ANY"}}
+
+    response = convert_gemini_to_openai({
+        "candidates": [{
+            "content": {"parts": [{"functionCall": {"name": "get_weather", "args": {"city": "Busan"}}}]},
+            "finishReason": "STOP"
+        }]
+    }, "gemini-test")
+    choice = response["choices"][0]
+    assert choice["finish_reason"] == "tool_calls"
+    assert choice["message"]["tool_calls"][0]["function"]["name"] == "get_weather"
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("proxy_state")
+async def test_stream_traces_each_tool_call_before_done(monkeypatch):
+    base = {"id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": "m"}
+
+    def chunk(delta, finish_reason=None):
+        return {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+    events = [
+        chunk({"tool_calls": [call_delta(0, '{"q": "a"}', "call_a", "search")]}),
+        chunk({"tool_calls": [call_delta(1, '{"agent_name": ', "call_b", "transfer_to_agent")]}),
+        chunk({"tool_calls": [call_delta(1, '"billing"}')]}),
+        chunk({}, "tool_calls"),
+        {**base, "choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 4, "total_tokens": 7}},
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+    client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body.encode())
+    ))
+
+    timeline = []
+
+    async def record_event(agent_id, event_type, data, metadata=None, trace_id=None):
+        timeline.append(event_type)
+
+    monkeypatch.setattr(openai_compatible, "emit_trace_event", record_event)
+
+    async for piece in stream_openai_response(
+        agent_id="agent-1",
+        client=client,
+        url="http://upstream.test/v1/chat/completions",
+        headers={},
+        payload={},
+        model="m",
+        trace_id="trace-1"
+    ):
+        timeline.append("[DONE]" if b"[DONE]" in piece else "chunk")
+    await client.aclose()
+
+    # search completes when call_b starts; the transfer completes at finish_reason
+    assert timeline == [
+        "chunk", "tool_call", "chunk", "chunk", "agent_transfer", "chunk", "chunk", "llm_response", "[DONE]"
+    ]
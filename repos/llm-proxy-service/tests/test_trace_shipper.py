@@ -0,0 +1,111 @@
+"""
+Tests for the batched trace-event shipper
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.core import trace_shipper
+from app.core.trace_shipper import TraceShipper
+
+
+def recording_shipper(**kwargs):
+    shipper = TraceShipper(**kwargs)
+    shipper.sent_batches = []
+
+    async def send(batch):
+        if batch:
+            shipper.sent_batches.append([log["n"] for log in batch])
+
+    shipper._send = send
+    return shipper
+
+
+@pytest.mark.asyncio
+async def test_flusher_sends_batches_and_stop_drains_the_rest():
+    shipper = recording_shipper(batch_size=3, flush_interval=0.05)
+    shipper.start()
+    for n in range(7):
+        shipper.enqueue({"n": n})
+    await asyncio.sleep(0.01)
+    await shipper.stop()
+
+    assert [n for batch in shipper.sent_batches for n in batch] == list(range(7))
+    assert all(len(batch) <= 3 for batch in shipper.sent_batches)
+    assert shipper.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_a_batch_being_sent():
+    shipper = TraceShipper(batch_size=10, flush_interval=0.01)
+    release = asyncio.Event()
+    sent = []
+
+    async def slow_send(batch):
+        await release.wait()
+        sent.extend(batch)
+
+    shipper._send = slow_send
+    shipper.start()
+    shipper.enqueue({"n": 1})
+    await asyncio.sleep(0.05)
+    stopping = asyncio.create_task(shipper.stop())
+    await asyncio.sleep(0.01)
+    assert not stopping.done()
+    release.set()
+    await stopping
+    assert sent == [{"n": 1}]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_or_spills(tmp_path):
+    dropping = recording_shipper(queue_size=2)
+    for n in range(3):
+        dropping.enqueue({"n": n})
+    assert dropping.counters["dropped"] == 1
+
+    spill_path = tmp_path / "spill.ndjson"
+    spilling = recording_shipper(queue_size=2, policy="spill", spill_path=str(spill_path))
+    for n in range(3):
+        spilling.enqueue({"n": n})
+    assert [json.loads(line) for line in spill_path.read_text().splitlines()] == [{"n": 2}]
+
+    # Spilled events come back once the queue has room
+    spilling._take_batch([])
+    spilling._replay_spill()
+    assert spilling.queue.get_nowait() == {"n": 2}
+    assert spilling.counters["replayed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_gives_up_after_the_timeout_and_spills_what_is_left(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace_shipper, "TRACE_STOP_TIMEOUT", 0.05)
+    spill_path = tmp_path / "spill.ndjson"
+    shipper = TraceShipper(batch_size=2, flush_interval=0.01, policy="spill", spill_path=str(spill_path))
+
+    async def unreachable(batch):
+        # Tracing Service down: every send waits for its HTTP timeout
+        await asyncio.sleep(60)
+
+    shipper._send = unreachable
+    shipper.start()
+    for n in range(5):
+        shipper.enqueue({"n": n})
+    await asyncio.sleep(0.02)
+
+    started = time.monotonic()
+    await shipper.stop()
+    assert time.monotonic() - started < 1
+    # The batch being sent and the queued rest
+    assert sorted(json.loads(line)["n"] for line in spill_path.read_text().splitlines()) == list(range(5))
+    assert shipper.queue.empty()
+
+    # Without a running flusher the final drain has the same deadline; drop policy counts the rest
+    dropping = TraceShipper(batch_size=2)
+    dropping._send = unreachable
+    for n in range(3):
+        dropping.enqueue({"n": n})
+    await dropping.stop()
+    assert dropping.counters["dropped"] == 3
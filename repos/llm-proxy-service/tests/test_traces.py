@@ -0,0 +1,46 @@
+"""
+Tests for access control on the trace query endpoints
+"""
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1 import traces
+from app.core.database import LLMCall, async_session_maker, engine, init_db
+
+KEYS = {"Bearer a2g_owner": {"user_id": 1}, "Bearer a2g_other": {"user_id": 2}}
+
+
+@pytest.mark.asyncio
+async def test_trace_and_agent_queries_need_the_owners_key(monkeypatch):
+    async def validate(authorization):
+        return KEYS.get(authorization)
+
+    monkeypatch.setattr(traces, "validate_platform_key", validate)
+    await init_db()
+    agent_id, trace_id = f"agent-{uuid.uuid4().hex}", f"trace-{uuid.uuid4().hex}"
+    try:
+        async with async_session_maker() as db:
+            db.add(LLMCall(
+                user_id=1, agent_id=agent_id, trace_id=trace_id, provider="openai", model="gpt-test",
+                request_messages=[], request_params={}, response_metadata={}
+            ))
+            await db.commit()
+
+            await traces.require_trace_access(trace_id, authorization="Bearer a2g_owner", db=db)
+            await traces.require_agent_access(agent_id, authorization="Bearer a2g_owner", db=db)
+
+            with pytest.raises(HTTPException) as exc_info:
+                await traces.require_trace_access(trace_id, authorization=None, db=db)
+            assert exc_info.value.status_code == 401
+
+            # Another user's traces look like they don't exist
+            with pytest.raises(HTTPException) as exc_info:
+                await traces.require_trace_access(trace_id, authorization="Bearer a2g_other", db=db)
+            assert exc_info.value.status_code == 404
+            with pytest.raises(HTTPException) as exc_info:
+                await traces.require_agent_access(agent_id, authorization="Bearer a2g_other", db=db)
+            assert exc_info.value.status_code == 404
+    finally:
+        await engine.dispose()
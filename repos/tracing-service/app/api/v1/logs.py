@@ -1,14 +1,15 @@
 """
 Log management API endpoints - Simplified for Workbench
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
+import json
 
 from app.core.database import get_db, LogEntry
 from app.websocket.manager import trace_manager
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, insert
 
 router = APIRouter()
 
@@ -19,6 +20,7 @@ class LogCreate(BaseModel):
     message: str
     log_type: Optional[str] = None
     metadata: Dict[str, Any] = {}
+    timestamp: Optional[datetime] = None  # When the event happened; defaults to receipt time
 
 class LogResponse(BaseModel):
     log_id: int
@@ -62,7 +64,8 @@ async def create_log(
         message=request.message,
         context=metadata_with_type,
         is_transfer=is_transfer or (request.log_type == "AGENT_TRANSFER"),
-        user_id="system"  # Simplified - no user tracking
+        user_id="system",  # Simplified - no user tracking
+        timestamp=_event_time(request, datetime.utcnow())
     )
 
     db.add(log_entry)
@@ -87,6 +90,90 @@ async def create_log(
         timestamp=log_entry.timestamp
     )
 
+def _event_time(request: LogCreate, received_at: datetime) -> datetime:
+    """Client event time as naive UTC (the column's convention), or the receipt time"""
+    if request.timestamp is None:
+        return received_at
+    if request.timestamp.tzinfo is not None:
+        return request.timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return request.timestamp
+
+class LogBatchResponse(BaseModel):
+    log_ids: List[int]
+    count: int
+
+_log_batch_adapter = TypeAdapter(List[LogCreate])
+
+def _log_row(request: LogCreate, timestamp: datetime) -> Dict[str, Any]:
+    """Build LogEntry column values (same rules as create_log)"""
+    is_transfer = "Agent Transfer" in request.message or "agent transfer" in request.message.lower()
+    return {
+        "trace_id": request.trace_id,
+        "service_name": request.service_name,
+        "level": request.level,
+        "message": request.message,
+        "context": {"log_type": request.log_type, **request.metadata},
+        "is_transfer": is_transfer or (request.log_type == "AGENT_TRANSFER"),
+        "user_id": "system",
+        "timestamp": timestamp
+    }
+
+@router.post("/logs/batch", response_model=LogBatchResponse)
+async def create_logs_batch(
+    request: Request,
+    db=Depends(get_db)
+):
+    """
+    Create many log entries with a single multi-row INSERT ... RETURNING
+
+    Body is a JSON array of log objects, or NDJSON (one object per line) when
+    Content-Type is application/x-ndjson. Each trace_id gets one WebSocket
+    broadcast carrying all of its new entries.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            raw = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            raw = json.loads(body)
+        logs = _log_batch_adapter.validate_python(raw)
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+    if not logs:
+        return LogBatchResponse(log_ids=[], count=0)
+
+    # Each row keeps its own event time, so batching doesn't collapse ordering
+    received_at = datetime.utcnow()
+    rows = [_log_row(log, _event_time(log, received_at)) for log in logs]
+
+    # One statement for the whole batch; ids come back in parameter order
+    result = await db.execute(
+        insert(LogEntry).returning(LogEntry.id, sort_by_parameter_order=True),
+        rows
+    )
+    log_ids = list(result.scalars().all())
+    await db.commit()
+
+    # Fan out one broadcast per trace_id with all of its new entries
+    by_trace: Dict[str, List[Dict[str, Any]]] = {}
+    for log_id, log, row in zip(log_ids, logs, rows):
+        by_trace.setdefault(log.trace_id, []).append({
+            "log_id": log_id,
+            "timestamp": row["timestamp"].isoformat(),
+            "service_name": row["service_name"],
+            "level": row["level"],
+            "message": row["message"],
+            "log_type": log.log_type,
+            "metadata": row["context"],
+            "is_transfer": row["is_transfer"]
+        })
+    for trace_id, entries in by_trace.items():
+        await trace_manager.broadcast_logs(trace_id, entries)
+
+    return LogBatchResponse(log_ids=log_ids, count=len(log_ids))
+
 @router.get("/logs/{trace_id}", response_model=LogTraceResponse)
 async def get_logs_by_trace(
     trace_id: str,
@@ -107,6 +194,9 @@ async def get_logs_by_trace(
     if filters:
         query = query.where(and_(*filters))
 
+    # Event order; id breaks ties between events stamped in the same instant
+    query = query.order_by(LogEntry.timestamp, LogEntry.id)
+
     result = await db.execute(query)
     logs = result.scalars().all()
 
@@ -3,7 +3,7 @@ WebSocket manager for trace log streaming
 Broadcasts log entries to all connected clients subscribed to a trace_id
 """
 from fastapi import WebSocket
-from typing import Dict, Set
+from typing import Dict, List, Set
 import json
 import asyncio
 import logging
@@ -53,6 +53,32 @@ class TraceConnectionManager:
             trace_id: The trace identifier
             log_entry: Log entry dict with fields: timestamp, service, level, message, metadata, etc.
         """
+        await self._send_to_trace(trace_id, {
+            "type": "log_entry",
+            "trace_id": trace_id,
+            "log": log_entry
+        })
+
+    async def broadcast_logs(self, trace_id: str, log_entries: List[dict]):
+        """
+        Broadcast several log entries for one trace_id as a single message
+
+        Args:
+            trace_id: The trace identifier
+            log_entries: Log entry dicts in insertion order
+        """
+        if len(log_entries) == 1:
+            await self.broadcast_log(trace_id, log_entries[0])
+            return
+
+        await self._send_to_trace(trace_id, {
+            "type": "log_batch",
+            "trace_id": trace_id,
+            "logs": log_entries
+        })
+
+    async def _send_to_trace(self, trace_id: str, payload: dict):
+        """Serialize once and send to every client subscribed to trace_id"""
         async with self.lock:
             if trace_id not in self.connections:
                 return
@@ -62,11 +88,7 @@ class TraceConnectionManager:
         if not connections:
             return
 
-        message = json.dumps({
-            "type": "log_entry",
-            "trace_id": trace_id,
-            "log": log_entry
-        })
+        message = json.dumps(payload)
 
         disconnected = set()
         for websocket in connections:
@@ -0,0 +1,51 @@
+"""
+Internal API endpoints for service-to-service communication
+No authentication required - not routed by the API Gateway
+"""
+from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update, bindparam
+from pydantic import BaseModel
+
+from app.core.security import get_db
+from app.models.platform_keys import PlatformKey
+
+router = APIRouter()
+
+
+class LastUsedUpdate(BaseModel):
+    key_id: int
+    last_used: datetime
+
+
+class LastUsedBatch(BaseModel):
+    updates: List[LastUsedUpdate]
+
+
+@router.post("/internal/platform-keys/last-used")
+async def update_platform_keys_last_used(
+    batch: LastUsedBatch,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply coalesced last_used timestamps in a single batched UPDATE
+    Used by LLM Proxy, which validates hot keys from its cache
+    """
+    if not batch.updates:
+        return {"updated": 0}
+
+    stmt = (
+        update(PlatformKey)
+        .where(PlatformKey.id == bindparam("b_key_id"))
+        .values(last_used=bindparam("b_last_used"))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        stmt,
+        [{"b_key_id": u.key_id, "b_last_used": u.last_used} for u in batch.updates]
+    )
+    await db.commit()
+
+    return {"updated": len(batch.updates)}
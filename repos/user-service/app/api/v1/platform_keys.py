@@ -1,7 +1,7 @@
 """Platform API key endpoints."""
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from pydantic import BaseModel
@@ -11,6 +11,7 @@ import hashlib
 from app.core.security import get_db, get_current_user
 from app.core.database import User
 from app.models.platform_keys import PlatformKey
+from app.core.redis_client import redis_client
 
 
 router = APIRouter()
@@ -146,6 +147,9 @@ async def delete_platform_key(
     db_key.is_active = False
     await db.commit()
 
+    # Push revocation so caching validators (LLM Proxy) drop the key immediately
+    await redis_client.publish_platform_key_revoked(db_key.key, db_key.id)
+
     return {"message": "Key deleted successfully"}
 
 
@@ -184,6 +188,7 @@ async def verify_platform_key(
 @router.get("/platform-keys/validate")
 async def validate_platform_key_endpoint(
     authorization: Optional[str] = Header(None),
+    touch: bool = Query(True, description="Update last_used (LLM Proxy reports it in batches instead)"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -208,9 +213,10 @@ async def validate_platform_key_endpoint(
     if not db_key:
         raise HTTPException(status_code=401, detail="Invalid or inactive API key")
 
-    # Update last used timestamp
-    db_key.last_used = datetime.utcnow()
-    await db.commit()
+    if touch:
+        # Update last used timestamp
+        db_key.last_used = datetime.utcnow()
+        await db.commit()
 
     return {
         "valid": True,
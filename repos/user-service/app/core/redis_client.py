@@ -0,0 +1,62 @@
+"""
+Redis client for publishing platform key revocation events
+"""
+import redis.asyncio as redis
+from app.core.config import settings
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Subscribed by llm-proxy-service to drop revoked keys from its validation cache
+PLATFORM_KEYS_REVOKED_CHANNEL = "platform_keys:revoked"
+
+
+class RedisClient:
+    """Redis client for notifying other services about platform key changes"""
+
+    def __init__(self):
+        self.redis_client: redis.Redis = None
+
+    async def connect(self):
+        """Initialize Redis connection"""
+        try:
+            self.redis_client = await redis.from_url(
+                settings.REDIS_URL,
+                encoding="utf-8",
+                decode_responses=True
+            )
+            logger.info(f"Connected to Redis at {settings.REDIS_URL}")
+        except Exception as e:
+            logger.error(f"Failed to connect to Redis: {e}")
+            raise
+
+    async def close(self):
+        """Close Redis connection"""
+        if self.redis_client:
+            await self.redis_client.close()
+            logger.info("Redis connection closed")
+
+    async def publish_platform_key_revoked(self, key: str, key_id: int):
+        """
+        Publish a platform key revocation
+
+        Only the SHA-256 of the key is sent. Failures are logged and swallowed -
+        subscribers fall back to their positive cache TTL.
+        """
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.publish(
+                PLATFORM_KEYS_REVOKED_CHANNEL,
+                json.dumps({
+                    "key_hash": hashlib.sha256(key.encode()).hexdigest(),
+                    "key_id": key_id
+                })
+            )
+        except Exception as e:
+            logger.error(f"Failed to publish platform key revocation (key_id={key_id}): {e}")
+
+# Global Redis client instance
+redis_client = RedisClient()
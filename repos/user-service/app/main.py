@@ -10,8 +10,9 @@ import logging
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.api.v1 import auth, users, admin, v1_users, llm_keys, platform_keys
+from app.api.v1 import auth, users, admin, v1_users, llm_keys, platform_keys, internal
 from app.core.security import get_current_user
+from app.core.redis_client import redis_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,12 +25,20 @@ async def lifespan(app: FastAPI):
     logger.info("Starting User Service...")
     # NOTE: Database tables are created by Alembic migrations, not by ORM
     # Removed init_db() call to prevent schema conflicts with migrations
+
+    # Redis is used to publish platform key revocation events
+    try:
+        await redis_client.connect()
+    except Exception as e:
+        logger.error(f"Redis unavailable, key revocation events disabled: {e}")
+
     logger.info("User Service started successfully")
 
     yield
 
     # Shutdown
     logger.info("Shutting down User Service...")
+    await redis_client.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -55,6 +64,7 @@ app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 app.include_router(v1_users.router, prefix="/api/v1/users", tags=["v1-users"])
 app.include_router(llm_keys.router, prefix="/api/v1/users", tags=["llm-keys"])
 app.include_router(platform_keys.router, prefix="/api/v1", tags=["platform-keys"])
+app.include_router(internal.router, prefix="/api", tags=["internal"])
 
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,30 @@
+"""
+LLM batch API endpoints
+"""
+from fastapi import APIRouter, HTTPException
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/api/internal/llm-batches/{batch_id}/run")
+async def run_llm_batch_endpoint(batch_id: str):
+    """
+    Queue an LLM batch for execution (Internal API - No Auth Required)
+
+    Called by LLM Proxy Service after a /v1/batches file was validated and stored.
+    The batch itself stays in llm-proxy; the task only drives its requests.
+    """
+    from app.tasks import run_llm_batch
+
+    try:
+        result = run_llm_batch.delay(batch_id)
+        return {
+            "status": "queued",
+            "batch_id": batch_id,
+            "task_id": result.id
+        }
+    except Exception as e:
+        logger.error(f"Error queueing LLM batch {batch_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
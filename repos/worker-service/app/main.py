@@ -8,6 +8,7 @@ import logging
 from contextlib import asynccontextmanager
 
 from app.api.statistics import router as statistics_router
+from app.api.llm_batches import router as llm_batches_router
 from app.core.database import init_db
 
 # Configure logging
@@ -44,6 +45,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(statistics_router, tags=["statistics"])
+app.include_router(llm_batches_router, tags=["llm-batches"])
 
 @app.get("/health")
 async def health_check():
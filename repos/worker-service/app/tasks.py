@@ -17,7 +17,8 @@ import httpx
 import asyncio
 import json
 import os
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+import redis.asyncio as redis
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +27,117 @@ ADMIN_SERVICE_URL = os.getenv("ADMIN_SERVICE_URL", "http://admin-service:8001")
 AGENT_SERVICE_URL = os.getenv("AGENT_SERVICE_URL", "http://agent-service:8002")
 LLM_PROXY_SERVICE_URL = os.getenv("LLM_PROXY_SERVICE_URL", "http://llm-proxy-service:8006")
 USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user-service:8000")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/5")
+
+# LLM batch execution: requests in flight per batch and retry budget per request
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "8"))
+LLM_BATCH_MAX_ATTEMPTS = int(os.getenv("LLM_BATCH_MAX_ATTEMPTS", "6"))
+LLM_BATCH_RETRY_STATUSES = (429, 502, 503, 504)
+
+# Subscribed by llm-proxy-service endpoint_pool (pub/sub is not scoped to a Redis db)
+LLM_ENDPOINT_HEALTH_CHANNEL = "llm_endpoints:health"
+
+
+async def _probe_llm_endpoint(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    provider: str,
+    model_name: str,
+    api_key: str
+) -> Tuple[bool, Optional[float], Optional[str]]:
+    """Health-check one LLM endpoint; returns (is_healthy, response_time_ms, error_msg)"""
+    is_healthy = False
+    response_time = None
+    error_msg = None
+
+    try:
+        start_time = datetime.utcnow()
+
+        # Health check: Try to reach the LLM endpoint
+        if endpoint:
+            # For OpenAI-compatible APIs, send a minimal chat completion request
+            if provider == 'openai_compatible' or provider == 'openai':
+                headers = {
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                }
+
+                # Adjust model name for Gemini API
+                model_for_request = model_name
+                if 'gemini' in model_name.lower():
+                    model_for_request = f"models/{model_name}"
+
+                data = {
+                    "model": model_for_request,
+                    "messages": [{"role": "user", "content": "test"}],
+                    "max_tokens": 1
+                }
+
+                # Ensure endpoint ends with /chat/completions for OpenAI compatibility
+                check_url = endpoint
+                if not check_url.endswith('/chat/completions'):
+                    if check_url.endswith('/'):
+                        check_url += 'chat/completions'
+                    else:
+                        check_url += '/chat/completions'
+
+                check_response = await client.post(
+                    check_url,
+                    headers=headers,
+                    json=data,
+                    timeout=10.0
+                )
+            else:
+                # For other providers, try a simple GET request
+                check_response = await client.get(
+                    endpoint,
+                    timeout=10.0
+                )
+
+            response_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+            is_healthy = check_response.status_code in [200, 201]
+
+            if not is_healthy:
+                error_msg = f"HTTP {check_response.status_code}"
+        else:
+            error_msg = "No endpoint configured"
+
+    except httpx.TimeoutException:
+        error_msg = "Timeout"
+        response_time = 5000  # 5 seconds timeout
+    except Exception as e:
+        error_msg = str(e)[:200]
+
+    return is_healthy, response_time, error_msg
+
+
+async def _publish_endpoint_health(model_name: str, probes: List[Tuple[str, Tuple[bool, Optional[float], Optional[str]]]]):
+    """
+    Publish per-endpoint probe results for llm-proxy-service replica ejection
+
+    Failures are logged and swallowed - the proxy still ejects replicas on its own request failures.
+    """
+    try:
+        client = redis.from_url(REDIS_URL, decode_responses=True)
+        try:
+            for endpoint, (is_healthy, response_time, error_msg) in probes:
+                if not endpoint:
+                    continue
+                await client.publish(
+                    LLM_ENDPOINT_HEALTH_CHANNEL,
+                    json.dumps({
+                        "model": model_name,
+                        "endpoint": endpoint.rstrip("/"),
+                        "healthy": is_healthy,
+                        "response_time_ms": response_time,
+                        "error": error_msg
+                    })
+                )
+        finally:
+            await client.aclose()
+    except Exception as e:
+        logger.error(f"Failed to publish endpoint health for {model_name}: {e}")
+
 
 @celery_app.task
 def check_llm_health():
@@ -64,68 +176,17 @@ async def _check_llm_health_async():
                     provider = llm.get("provider", "")
                     model_name = llm.get("name", "")
 
-                    # Perform health check (simple HTTP check)
-                    is_healthy = False
-                    response_time = None
-                    error_msg = None
-
-                    try:
-                        start_time = datetime.utcnow()
-
-                        # Health check: Try to reach the LLM endpoint
-                        if endpoint:
-                            # For OpenAI-compatible APIs, send a minimal chat completion request
-                            if provider == 'openai_compatible' or provider == 'openai':
-                                headers = {
-                                    "Authorization": f"Bearer {llm.get('api_key', '')}",
-                                    "Content-Type": "application/json"
-                                }
-
-                                # Adjust model name for Gemini API
-                                model_for_request = model_name
-                                if 'gemini' in model_name.lower():
-                                    model_for_request = f"models/{model_name}"
-
-                                data = {
-                                    "model": model_for_request,
-                                    "messages": [{"role": "user", "content": "test"}],
-                                    "max_tokens": 1
-                                }
-
-                                # Ensure endpoint ends with /chat/completions for OpenAI compatibility
-                                check_url = endpoint
-                                if not check_url.endswith('/chat/completions'):
-                                    if check_url.endswith('/'):
-                                        check_url += 'chat/completions'
-                                    else:
-                                        check_url += '/chat/completions'
-
-                                check_response = await client.post(
-                                    check_url,
-                                    headers=headers,
-                                    json=data,
-                                    timeout=10.0
-                                )
-                            else:
-                                # For other providers, try a simple GET request
-                                check_response = await client.get(
-                                    endpoint,
-                                    timeout=10.0
-                                )
-
-                            response_time = (datetime.utcnow() - start_time).total_seconds() * 1000
-                            is_healthy = check_response.status_code in [200, 201]
-
-                            if not is_healthy:
-                                error_msg = f"HTTP {check_response.status_code}"
-                        else:
-                            error_msg = "No endpoint configured"
+                    # Probe the primary endpoint and every replica in the model's pool
+                    pool = [endpoint] + [url for url in llm.get("endpoints") or [] if url != endpoint]
+                    probes = [
+                        (url, await _probe_llm_endpoint(client, url, provider, model_name, llm.get("api_key", "")))
+                        for url in pool
+                    ]
+                    await _publish_endpoint_health(model_name, probes)
 
-                    except httpx.TimeoutException:
-                        error_msg = "Timeout"
-                        response_time = 5000  # 5 seconds timeout
-                    except Exception as e:
-                        error_msg = str(e)[:200]
+                    # The model is healthy while any replica can serve it
+                    healthy_probes = [probe for _, probe in probes if probe[0]]
+                    is_healthy, response_time, error_msg = healthy_probes[0] if healthy_probes else probes[0][1]
 
                     # Get or create health status record
                     result = await session.execute(
@@ -182,7 +243,8 @@ async def _check_llm_health_async():
                         "healthy": is_healthy,
                         "response_time_ms": response_time,
                         "consecutive_failures": consecutive_failures,
-                        "error": error_msg
+                        "error": error_msg,
+                        "endpoints": {url: probe[0] for url, probe in probes}
                     }
 
                 await session.commit()
@@ -600,6 +662,101 @@ async def _check_agent_health_async():
         logger.error(f"Error in agent health check: {e}", exc_info=True)
         return {"error": str(e)}
 
+@celery_app.task
+def run_llm_batch(batch_id: str):
+    """Run the requests of an LLM proxy /v1/batches batch"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(_run_llm_batch_async(batch_id))
+    finally:
+        loop.close()
+
+async def _run_llm_batch_request(client: httpx.AsyncClient, batch_id: str, item: Dict[str, Any]) -> Optional[int]:
+    """
+    Send one batch request to llm-proxy, retrying while the upstream is busy
+
+    Returns the stored result's status code, 409 when the batch was cancelled,
+    or None when the request could not be executed (finalize marks it failed).
+    """
+    url = f"{LLM_PROXY_SERVICE_URL}/api/internal/batches/{batch_id}/requests"
+    delay = 1.0
+    for attempt in range(1, LLM_BATCH_MAX_ATTEMPTS + 1):
+        try:
+            # On the last try llm-proxy stores an upstream 5xx instead of asking for a retry
+            response = await client.post(url, json={**item, "final_attempt": attempt == LLM_BATCH_MAX_ATTEMPTS})
+        except httpx.TransportError as e:
+            logger.warning(f"[LLM Batch] {batch_id}/{item['custom_id']} attempt {attempt}: {e}")
+            response = None
+
+        if response is not None:
+            if response.status_code == 200:
+                return response.json().get("status_code")
+            if response.status_code == 409:
+                return 409
+            if response.status_code not in LLM_BATCH_RETRY_STATUSES:
+                logger.error(f"[LLM Batch] {batch_id}/{item['custom_id']} rejected: {response.status_code} {response.text}")
+                return None
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+
+        if attempt < LLM_BATCH_MAX_ATTEMPTS:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    logger.error(f"[LLM Batch] {batch_id}/{item['custom_id']} gave up after {LLM_BATCH_MAX_ATTEMPTS} attempts")
+    return None
+
+async def _run_llm_batch_async(batch_id: str):
+    """
+    Async implementation of LLM batch execution
+
+    LLM_BATCH_CONCURRENCY coroutines pull requests from a shared queue, so at
+    most that many of the batch's requests are in flight at once; llm-proxy's
+    own concurrency limiter still applies per upstream endpoint.
+    """
+    logger.info(f"[LLM Batch] Starting {batch_id}")
+    counts = {"succeeded": 0, "failed": 0, "not_executed": 0}
+
+    # Completions can take minutes; only connecting is bounded tightly
+    async with httpx.AsyncClient(timeout=httpx.Timeout(600.0, connect=10.0)) as client:
+        response = await client.post(f"{LLM_PROXY_SERVICE_URL}/api/internal/batches/{batch_id}/start")
+        response.raise_for_status()
+        started = response.json()
+        if started["status"] != "in_progress":
+            logger.info(f"[LLM Batch] {batch_id} is {started['status']}, nothing to run")
+        else:
+            queue: asyncio.Queue = asyncio.Queue()
+            for item in started["requests"]:
+                queue.put_nowait(item)
+            cancelled = asyncio.Event()
+
+            async def worker():
+                while not cancelled.is_set():
+                    try:
+                        item = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    status_code = await _run_llm_batch_request(client, batch_id, item)
+                    if status_code == 409:
+                        cancelled.set()
+                    elif status_code is None:
+                        counts["not_executed"] += 1
+                    elif status_code == 200:
+                        counts["succeeded"] += 1
+                    else:
+                        counts["failed"] += 1
+
+            await asyncio.gather(*(worker() for _ in range(max(1, LLM_BATCH_CONCURRENCY))))
+
+        response = await client.post(f"{LLM_PROXY_SERVICE_URL}/api/internal/batches/{batch_id}/finalize")
+        response.raise_for_status()
+        status = response.json()["status"]
+
+    logger.info(f"[LLM Batch] {batch_id} {status}: {counts}")
+    return {"batch_id": batch_id, "status": status, **counts}
+
 @celery_app.task
 def send_notification(user_id: str, message: str):
     """Send notification to user"""